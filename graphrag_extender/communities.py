@@ -0,0 +1,167 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import leidenalg as la
+import networkx as nx
+
+from graphrag_extender.graph_store import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DetectedCommunity:
+    level: int
+    nodes: List[int]
+    # Index of the parent community in the same result list.
+    parent: Optional[int] = None
+
+    @property
+    def membership_hash(self) -> str:
+        return membership_hash(self.nodes, self.level)
+
+
+def membership_hash(nodes: Sequence[int], level: int) -> str:
+    """Stable identity of a community: its level and sorted member ids."""
+    members = ",".join(str(node_id) for node_id in sorted(nodes))
+    return hashlib.sha256(f"{level}:{members}".encode("utf-8")).hexdigest()
+
+
+class CommunityDetector:
+    """Partitions a weighted graph into communities."""
+
+    def partition(
+        self, graph: CSRGraph, initial_membership: Optional[List[int]] = None
+    ) -> List[List[int]]:
+        """Return communities as lists of vertex indices.
+
+        ``initial_membership`` (one label per vertex) seeds the search where
+        the engine supports it.
+        """
+        raise NotImplementedError
+
+
+class NetworkXDetector(CommunityDetector):
+    """Greedy modularity maximisation; pure Python and slow on large graphs."""
+
+    def partition(self, graph, initial_membership=None):
+        G = nx.Graph()
+        G.add_nodes_from(range(graph.node_count))
+        rows, cols, weights = graph.edge_arrays()
+        G.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights.tolist()))
+        if G.number_of_edges() == 0:
+            return [list(range(graph.node_count))]
+        return [
+            sorted(community)
+            for community in nx.algorithms.community.greedy_modularity_communities(
+                G, weight="weight"
+            )
+        ]
+
+
+class LeidenDetector(CommunityDetector):
+    """Leiden on igraph, with the resolution-parameterised modularity objective."""
+
+    def __init__(
+        self, resolution: float = 1.0, seed: Optional[int] = None, iterations: int = 2
+    ):
+        self.resolution = resolution
+        self.seed = seed
+        self.iterations = iterations
+
+    def partition(self, graph, initial_membership=None):
+        result = la.find_partition(
+            graph.to_igraph(),
+            la.RBConfigurationVertexPartition,
+            initial_membership=initial_membership,
+            weights="weight",
+            resolution_parameter=self.resolution,
+            n_iterations=self.iterations,
+            seed=self.seed,
+        )
+        return [sorted(community) for community in result if community]
+
+
+def make_detector(settings: dict, level: int = 0) -> CommunityDetector:
+    engine = settings.get("engine", "leiden")
+    if engine == "leiden":
+        resolution = settings.get("resolution", 1.0)
+        if isinstance(resolution, (list, tuple)):
+            resolution = resolution[min(level, len(resolution) - 1)]
+        return LeidenDetector(
+            resolution=resolution,
+            seed=settings.get("seed"),
+            iterations=settings.get("iterations", 2),
+        )
+    if engine == "networkx":
+        return NetworkXDetector()
+    raise ValueError(f"Unknown community detection engine: {engine}")
+
+
+def detect_communities(
+    graph: CSRGraph,
+    settings: dict,
+    initial_membership: Optional[Dict[int, int]] = None,
+) -> List[DetectedCommunity]:
+    """Detect communities in a graph.
+
+    Level 0 partitions the whole graph. With ``levels`` > 1, every community
+    of at least ``min_split_size`` nodes is re-partitioned on its own subgraph
+    to form the next level; ``resolution`` may be a list with one value per
+    level. ``initial_membership`` maps node ids to previous community labels
+    and seeds the level 0 partition.
+
+    Returned communities hold sorted node ids and are ordered by level, so
+    parents always precede their children.
+    """
+    detector = make_detector(settings)
+    levels = settings.get("levels", 1)
+    min_split_size = settings.get("min_split_size", 10)
+    node_ids = graph.node_ids.tolist()
+
+    membership = None
+    if initial_membership is not None:
+        membership = _relabel(node_ids, initial_membership)
+    elif graph.edge_count == 0:
+        logger.info("No edges found, creating single community")
+        return [DetectedCommunity(0, node_ids)]
+
+    result = [
+        DetectedCommunity(0, [node_ids[v] for v in community])
+        for community in detector.partition(graph, membership)
+    ]
+    frontier = list(range(len(result)))
+    for level in range(1, levels):
+        detector = make_detector(settings, level)
+        next_frontier = []
+        for parent in frontier:
+            if len(result[parent].nodes) < min_split_size:
+                continue
+            subgraph = graph.subgraph(result[parent].nodes)
+            children = detector.partition(subgraph)
+            if len(children) < 2:
+                continue
+            members = subgraph.node_ids.tolist()
+            for child in children:
+                next_frontier.append(len(result))
+                result.append(
+                    DetectedCommunity(level, [members[v] for v in child], parent)
+                )
+        frontier = next_frontier
+        if not frontier:
+            break
+    logger.debug(f"Detected {len(result)} communities with {type(detector).__name__}")
+    return result
+
+
+def _relabel(node_ids: List[int], labels: Dict[int, int]) -> List[int]:
+    """Consecutive labels per vertex; unlabelled nodes start on their own."""
+    mapping: Dict[tuple, int] = {}
+    membership = []
+    for node_id in node_ids:
+        label = labels.get(node_id)
+        key = ("node", node_id) if label is None else ("label", label)
+        membership.append(mapping.setdefault(key, len(mapping)))
+    return membership
@@ -1,20 +1,47 @@
 import logging
-from typing import List, Tuple
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import asyncpg
 
+from graphrag_extender.graph_store import CSRGraph
+from graphrag_extender.pgvector import register_vector
+from graphrag_extender.storage import Storage
+from graphrag_extender.vector_index import EMBEDDING_COLUMNS
+
 logger = logging.getLogger(__name__)
 
+# Serializes co-occurrence edge rebuilds so concurrent documents never count
+# against each other's uncommitted links or delete each other's fresh edges.
+_EDGE_REBUILD_LOCK = 0x6772_6564
+
+
+class Database(Storage):
+    """Storage backend on PostgreSQL with pgvector, through an asyncpg pool."""
 
-class Database:
     def __init__(self, conn_string: str):
         self.conn_string = conn_string
         self.pool = None
 
     async def initialize(self):
-        self.pool = await asyncpg.create_pool(self.conn_string)
+        self.pool = await asyncpg.create_pool(self.conn_string, init=register_vector)
         logger.info("Database pool initialized")
 
+    @asynccontextmanager
+    async def transaction(self):
+        """Acquire a connection and run everything on it in one transaction."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+
+    @asynccontextmanager
+    async def _connection(self, conn: Optional[asyncpg.Connection] = None):
+        if conn is not None:
+            yield conn
+        else:
+            async with self.pool.acquire() as conn:
+                yield conn
+
     async def add_document(self, path: str) -> int:
         async with self.pool.acquire() as conn:
             doc_id = await conn.fetchval(
@@ -22,6 +49,71 @@ class Database:
             )
         return doc_id
 
+    async def get_document(self, path: str) -> Optional[asyncpg.Record]:
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(
+                "SELECT id, content_hash, size, mtime, processed FROM documents WHERE path = $1",
+                path,
+            )
+
+    async def upsert_document(
+        self, path: str, content_hash: str, size: int, mtime: float
+    ) -> int:
+        """Record a new or changed document as unprocessed and return its id."""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                """
+                INSERT INTO documents (path, content_hash, size, mtime, processed)
+                VALUES ($1, $2, $3, $4, FALSE)
+                ON CONFLICT (path) DO UPDATE SET
+                    content_hash = EXCLUDED.content_hash,
+                    size = EXCLUDED.size,
+                    mtime = EXCLUDED.mtime,
+                    processed = FALSE
+                RETURNING id
+                """,
+                path,
+                content_hash,
+                size,
+                mtime,
+            )
+
+    async def touch_document(self, doc_id: int, size: int, mtime: float):
+        """Refresh the stat fingerprint of a document whose content is unchanged."""
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE documents SET size = $2, mtime = $3 WHERE id = $1",
+                doc_id,
+                size,
+                mtime,
+            )
+
+    async def clear_document_chunks(
+        self, doc_id: int, conn: Optional[asyncpg.Connection] = None
+    ) -> List[int]:
+        """Delete a document's chunks and links, returning the unlinked entity ids."""
+        async with self._connection(conn) as conn:
+            records = await conn.fetch(
+                """
+                WITH removed AS (
+                    DELETE FROM chunk_entities ce USING chunks c
+                    WHERE ce.chunk_id = c.id AND c.document_id = $1
+                    RETURNING ce.entity_id
+                )
+                SELECT DISTINCT entity_id FROM removed
+                """,
+                doc_id,
+            )
+            await conn.execute(
+                """
+                DELETE FROM chunk_relationships cr USING chunks c
+                WHERE cr.chunk_id = c.id AND c.document_id = $1
+                """,
+                doc_id,
+            )
+            await conn.execute("DELETE FROM chunks WHERE document_id = $1", doc_id)
+        return [r["entity_id"] for r in records]
+
     async def get_unprocessed_documents(self) -> List[Tuple[int, str]]:
         async with self.pool.acquire() as conn:
             return await conn.fetch(
@@ -31,16 +123,38 @@ class Database:
     async def add_chunk(
         self, text: str, embedding: List[float], document_id: int
     ) -> int:
-        embedding_str = f"[{', '.join(map(str, embedding))}]"
         async with self.pool.acquire() as conn:
             chunk_id = await conn.fetchval(
-                "INSERT INTO chunks (text, embedding, document_id) VALUES ($1, $2::vector, $3) RETURNING id",
+                "INSERT INTO chunks (text, embedding, document_id) VALUES ($1, $2, $3) RETURNING id",
                 text,
-                embedding_str,
+                embedding,
                 document_id,
             )
         return chunk_id
 
+    async def add_chunks(
+        self,
+        rows: List[Tuple[str, List[float], int]],
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> List[int]:
+        """COPY (text, embedding, document_id) rows, returning ids in row order."""
+        if not rows:
+            return []
+        async with self._connection(conn) as conn:
+            ids = [
+                r[0]
+                for r in await conn.fetch(
+                    "SELECT nextval(pg_get_serial_sequence('chunks', 'id')) FROM generate_series(1, $1)",
+                    len(rows),
+                )
+            ]
+            await conn.copy_records_to_table(
+                "chunks",
+                records=[(chunk_id, *row) for chunk_id, row in zip(ids, rows)],
+                columns=["id", "text", "embedding", "document_id"],
+            )
+        return ids
+
     async def add_node(self, name: str, type: str) -> int:
         async with self.pool.acquire() as conn:
             node_id = await conn.fetchval(
@@ -50,6 +164,105 @@ class Database:
             )
         return node_id
 
+    async def add_nodes(
+        self,
+        entities: Iterable[Tuple[str, str]],
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> Dict[str, int]:
+        """Upsert (name, type) pairs in one statement and return a name -> id map."""
+        # Later duplicates win, matching repeated add_node calls. Rows are sorted
+        # so concurrent upserts lock overlapping names in the same order.
+        types = dict(entities)
+        if not types:
+            return {}
+        names = sorted(types)
+        async with self._connection(conn) as conn:
+            records = await conn.fetch(
+                """
+                INSERT INTO nodes (name, type)
+                SELECT * FROM unnest($1::text[], $2::text[])
+                ON CONFLICT (name) DO UPDATE SET type = EXCLUDED.type
+                RETURNING id, name
+                """,
+                names,
+                [types[name] for name in names],
+            )
+        return {r["name"]: r["id"] for r in records}
+
+    async def get_nodes(self) -> List[asyncpg.Record]:
+        async with self.pool.acquire() as conn:
+            return await conn.fetch("SELECT id, name, type FROM nodes")
+
+    async def get_node_names(self, node_ids: List[int]) -> Dict[int, str]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                "SELECT id, name FROM nodes WHERE id = ANY($1::int[])", node_ids
+            )
+        return {r["id"]: r["name"] for r in records}
+
+    async def get_node_ids(self, names: List[str]) -> Dict[str, int]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                "SELECT id, name FROM nodes WHERE name = ANY($1::text[])", names
+            )
+        return {r["name"]: r["id"] for r in records}
+
+    async def get_adjacency(
+        self, node_ids: List[int], limit: int
+    ) -> List[asyncpg.Record]:
+        """Up to limit heaviest edges leaving and entering each node.
+
+        Rows are (node_id, source_id, target_id, relationship, weight). Each
+        side is a top-N scan of the (endpoint, weight) index, so hub nodes
+        cost no more than ordinary ones.
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                """
+                SELECT n.id AS node_id, e.source_id, e.target_id, e.relationship, e.weight
+                FROM unnest($1::int[]) AS n(id)
+                CROSS JOIN LATERAL (
+                    (SELECT source_id, target_id, relationship, weight FROM edges
+                     WHERE source_id = n.id AND weight IS NOT NULL
+                     ORDER BY weight DESC NULLS LAST LIMIT $2)
+                    UNION ALL
+                    (SELECT source_id, target_id, relationship, weight FROM edges
+                     WHERE target_id = n.id AND weight IS NOT NULL
+                     ORDER BY weight DESC NULLS LAST LIMIT $2)
+                ) e
+                """,
+                node_ids,
+                limit,
+            )
+
+    async def get_entity_chunks(
+        self, entity_ids: List[int], limit: int
+    ) -> List[asyncpg.Record]:
+        """The chunks mentioning the most of entity_ids, as (id, text, mentions)."""
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                """
+                SELECT c.id, c.text, m.mentions
+                FROM (
+                    SELECT chunk_id, COUNT(*) AS mentions
+                    FROM chunk_entities
+                    WHERE entity_id = ANY($1::int[])
+                    GROUP BY chunk_id
+                    ORDER BY mentions DESC, chunk_id
+                    LIMIT $2
+                ) m
+                JOIN chunks c ON c.id = m.chunk_id
+                ORDER BY m.mentions DESC, c.id
+                """,
+                entity_ids,
+                limit,
+            )
+
+    async def get_graph_versions(self) -> Dict[str, int]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch("SELECT name, version FROM graph_versions")
+        return {r["name"]: r["version"] for r in records}
+
     async def link_chunk_entity(self, chunk_id: int, entity_id: int):
         async with self.pool.acquire() as conn:
             await conn.execute(
@@ -58,6 +271,45 @@ class Database:
                 entity_id,
             )
 
+    async def link_chunk_entities(
+        self,
+        links: Iterable[Tuple[int, int]],
+        conn: Optional[asyncpg.Connection] = None,
+    ):
+        """Link many (chunk_id, entity_id) pairs, ignoring existing links."""
+        links = sorted(set(links))
+        if not links:
+            return
+        async with self._connection(conn) as conn:
+            await conn.execute(
+                """
+                INSERT INTO chunk_entities (chunk_id, entity_id)
+                SELECT * FROM unnest($1::int[], $2::int[])
+                ON CONFLICT DO NOTHING
+                """,
+                [chunk_id for chunk_id, _ in links],
+                [entity_id for _, entity_id in links],
+            )
+
+    async def link_chunk_relationships(
+        self,
+        links: Iterable[Tuple[int, int, int, str]],
+        conn: Optional[asyncpg.Connection] = None,
+    ):
+        """Record many (chunk_id, source_id, target_id, relationship) mentions."""
+        links = sorted(set(links))
+        if not links:
+            return
+        async with self._connection(conn) as conn:
+            await conn.execute(
+                """
+                INSERT INTO chunk_relationships (chunk_id, source_id, target_id, relationship)
+                SELECT * FROM unnest($1::int[], $2::int[], $3::int[], $4::text[])
+                ON CONFLICT DO NOTHING
+                """,
+                *(list(column) for column in zip(*links)),
+            )
+
     async def add_edge(
         self, source_id: int, target_id: int, relationship: str, weight: float
     ):
@@ -70,8 +322,27 @@ class Database:
                 weight,
             )
 
-    async def get_document_entities(self, doc_id: int) -> List[Tuple[int, str]]:
-        async with self.pool.acquire() as conn:
+    async def add_edges(
+        self,
+        rows: List[Tuple[int, int, str, float]],
+        conn: Optional[asyncpg.Connection] = None,
+    ):
+        """COPY (source_id, target_id, relationship, weight) rows into edges."""
+        if not rows:
+            return
+        async with self._connection(conn) as conn:
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    "edges",
+                    records=rows,
+                    columns=["source_id", "target_id", "relationship", "weight"],
+                )
+                await _bump_version(conn, "edges")
+
+    async def get_document_entities(
+        self, doc_id: int, conn: Optional[asyncpg.Connection] = None
+    ) -> List[Tuple[int, str]]:
+        async with self._connection(conn) as conn:
             return await conn.fetch(
                 """
                 SELECT DISTINCT n.id, n.name
@@ -97,20 +368,223 @@ class Database:
             )
         return count or 0
 
-    async def mark_document_processed(self, doc_id: int):
-        async with self.pool.acquire() as conn:
+    async def rebuild_edges(
+        self, entity_ids: List[int], conn: Optional[asyncpg.Connection] = None
+    ) -> int:
+        """Recompute edges among entity_ids from their chunk mentions.
+
+        'related' pair counts come from one self-join aggregate over
+        chunk_entities and are written back, in both directions, by the same
+        statement. Returns the number of edges written.
+        """
+        if len(entity_ids) < 2:
+            return 0
+        async with self._connection(conn) as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "SELECT pg_advisory_xact_lock($1)", _EDGE_REBUILD_LOCK
+                )
+                await conn.execute(
+                    """
+                    DELETE FROM edges
+                    WHERE relationship = 'related'
+                      AND source_id = ANY($1::int[]) AND target_id = ANY($1::int[])
+                    """,
+                    entity_ids,
+                )
+                status = await conn.execute(
+                    """
+                    INSERT INTO edges (source_id, target_id, relationship, weight)
+                    SELECT d.source_id, d.target_id, 'related', p.shared / 2.0
+                    FROM (
+                        SELECT ce1.entity_id AS a, ce2.entity_id AS b, COUNT(*) AS shared
+                        FROM chunk_entities ce1
+                        JOIN chunk_entities ce2
+                          ON ce1.chunk_id = ce2.chunk_id AND ce1.entity_id < ce2.entity_id
+                        WHERE ce1.entity_id = ANY($1::int[])
+                          AND ce2.entity_id = ANY($1::int[])
+                        GROUP BY ce1.entity_id, ce2.entity_id
+                    ) p
+                    CROSS JOIN LATERAL (VALUES (p.a, p.b), (p.b, p.a)) AS d(source_id, target_id)
+                    """,
+                    entity_ids,
+                )
+                # Typed relationships extracted by the LLM are rebuilt from
+                # their chunk mentions the same way, weighted by mention count.
+                await conn.execute(
+                    """
+                    DELETE FROM edges
+                    WHERE relationship <> 'related'
+                      AND source_id = ANY($1::int[]) AND target_id = ANY($1::int[])
+                    """,
+                    entity_ids,
+                )
+                typed = await conn.execute(
+                    """
+                    INSERT INTO edges (source_id, target_id, relationship, weight)
+                    SELECT source_id, target_id, relationship, COUNT(*)
+                    FROM chunk_relationships
+                    WHERE source_id = ANY($1::int[]) AND target_id = ANY($1::int[])
+                    GROUP BY source_id, target_id, relationship
+                    """,
+                    entity_ids,
+                )
+                await _bump_version(conn, "edges")
+        return int(status.split()[-1]) + int(typed.split()[-1])
+
+    async def mark_document_processed(
+        self, doc_id: int, conn: Optional[asyncpg.Connection] = None
+    ):
+        async with self._connection(conn) as conn:
             await conn.execute(
                 "UPDATE documents SET processed = TRUE WHERE id = $1", doc_id
             )
 
     async def load_graph(self) -> Tuple[List[dict], List[dict]]:
         async with self.pool.acquire() as conn:
-            nodes = await conn.fetch("SELECT id, name FROM nodes")
+            nodes = await conn.fetch("SELECT id, name, type FROM nodes")
+            edges = await conn.fetch(
+                "SELECT source_id, target_id, relationship, weight FROM edges WHERE weight IS NOT NULL"
+            )
+        return nodes, edges
+
+    async def load_graph_store(self, node_ids: Optional[List[int]] = None) -> CSRGraph:
+        """The graph, or the subgraph on node_ids, as a compact CSRGraph."""
+        async with self.pool.acquire() as conn:
+            return await CSRGraph.load(conn, node_ids)
+
+    async def load_subgraph(
+        self, node_ids: List[int]
+    ) -> Tuple[List[asyncpg.Record], List[asyncpg.Record]]:
+        """Nodes in node_ids and the edges between them."""
+        async with self.pool.acquire() as conn:
+            nodes = await conn.fetch(
+                "SELECT id, name, type FROM nodes WHERE id = ANY($1::int[]) ORDER BY id",
+                node_ids,
+            )
             edges = await conn.fetch(
-                "SELECT source_id, target_id, weight FROM edges WHERE weight IS NOT NULL"
+                """
+                SELECT source_id, target_id, relationship, weight FROM edges
+                WHERE weight IS NOT NULL
+                  AND source_id = ANY($1::int[]) AND target_id = ANY($1::int[])
+                """,
+                node_ids,
             )
         return nodes, edges
 
+    async def get_neighbours(self, node_ids: List[int]) -> List[int]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                """
+                SELECT target_id AS id FROM edges WHERE source_id = ANY($1::int[])
+                UNION
+                SELECT source_id FROM edges WHERE target_id = ANY($1::int[])
+                """,
+                node_ids,
+            )
+        return [r["id"] for r in records]
+
+    async def mark_nodes_dirty(
+        self, node_ids: List[int], conn: Optional[asyncpg.Connection] = None
+    ):
+        """Queue nodes whose edges changed for the next community update."""
+        if not node_ids:
+            return
+        async with self._connection(conn) as conn:
+            await conn.execute(
+                """
+                INSERT INTO dirty_nodes (node_id)
+                SELECT unnest($1::int[]) ON CONFLICT DO NOTHING
+                """,
+                sorted(node_ids),
+            )
+
+    async def get_dirty_nodes(self) -> List[int]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch("SELECT node_id FROM dirty_nodes")
+        return [r["node_id"] for r in records]
+
+    async def clear_dirty_nodes(
+        self, node_ids: List[int], conn: Optional[asyncpg.Connection] = None
+    ):
+        async with self._connection(conn) as conn:
+            await conn.execute(
+                "DELETE FROM dirty_nodes WHERE node_id = ANY($1::int[])", node_ids
+            )
+
+    async def get_communities(self) -> List[asyncpg.Record]:
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                """
+                SELECT id, nodes, level, parent_id, membership_hash
+                FROM communities ORDER BY level, id
+                """
+            )
+
+    async def get_community_hashes(self, hashes: List[str]) -> Set[str]:
+        """The subset of membership hashes that already have a community."""
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                "SELECT membership_hash FROM communities WHERE membership_hash = ANY($1::text[])",
+                hashes,
+            )
+        return {r["membership_hash"] for r in records}
+
+    async def search_communities(
+        self,
+        embedding: List[float],
+        limit: int = 3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[asyncpg.Record]:
+        """Communities nearest to embedding by cosine distance.
+
+        Served by the ANN index on summary_embedding; ef_search (HNSW) and
+        probes (IVFFlat) trade recall for latency for this query only.
+        """
+        async with self.transaction() as conn:
+            await _tune_vector_search(conn, ef_search, probes)
+            return await conn.fetch(
+                """
+                SELECT id, summary, summary_embedding <=> $1 AS distance
+                FROM communities
+                WHERE summary_embedding IS NOT NULL
+                ORDER BY summary_embedding <=> $1
+                LIMIT $2
+                """,
+                embedding,
+                limit,
+            )
+
+    async def get_embedding_ids(self, table: str) -> List[int]:
+        """Ids of the rows of table ('chunks' or 'communities') with an embedding."""
+        column = EMBEDDING_COLUMNS[table]
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                f"SELECT id FROM {table} WHERE {column} IS NOT NULL"
+            )
+        return [r["id"] for r in records]
+
+    async def get_embeddings(self, table: str, ids: List[int]) -> List[asyncpg.Record]:
+        """(id, embedding) rows of table for ids."""
+        column = EMBEDDING_COLUMNS[table]
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                f"""
+                SELECT id, {column} AS embedding FROM {table}
+                WHERE id = ANY($1::int[]) AND {column} IS NOT NULL
+                """,
+                ids,
+            )
+
+    async def get_community_summaries(self, community_ids: List[int]) -> Dict[int, str]:
+        async with self.pool.acquire() as conn:
+            records = await conn.fetch(
+                "SELECT id, summary FROM communities WHERE id = ANY($1::int[])",
+                community_ids,
+            )
+        return {r["id"]: r["summary"] for r in records}
+
     async def add_community(
         self,
         comm_id: int,
@@ -118,17 +592,111 @@ class Database:
         summary: str,
         summary_embedding: List[float],
     ):
-        summary_embedding_str = f"[{', '.join(map(str, summary_embedding))}]"
         async with self.pool.acquire() as conn:
             await conn.execute(
-                "INSERT INTO communities (id, nodes, summary, summary_embedding) VALUES ($1, $2, $3, $4::vector)",
+                "INSERT INTO communities (id, nodes, summary, summary_embedding) VALUES ($1, $2, $3, $4)",
                 comm_id,
                 nodes,
                 summary,
-                summary_embedding_str,
+                summary_embedding,
             )
 
+    async def upsert_communities(
+        self,
+        rows: List[
+            Tuple[str, List[int], int, Optional[str], Optional[str], Optional[list]]
+        ],
+        replaced_ids: Optional[List[int]] = None,
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> Tuple[int, int]:
+        """Write a run's communities in one bulk upsert keyed by membership hash.
+
+        Rows are (membership_hash, nodes, level, parent_hash, summary,
+        summary_embedding); existing communities may pass None for summary and
+        embedding to keep theirs. Afterwards every community in replaced_ids
+        (all communities when None) that is not among the rows is deleted.
+        Returns the number of rows inserted and deleted.
+        """
+        async with self._connection(conn) as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE community_staging (
+                        membership_hash TEXT PRIMARY KEY,
+                        nodes INTEGER[],
+                        level INTEGER,
+                        parent_hash TEXT,
+                        summary TEXT,
+                        summary_embedding VECTOR(1536)
+                    ) ON COMMIT DROP
+                    """
+                )
+                await conn.copy_records_to_table(
+                    "community_staging",
+                    records=rows,
+                    columns=[
+                        "membership_hash",
+                        "nodes",
+                        "level",
+                        "parent_hash",
+                        "summary",
+                        "summary_embedding",
+                    ],
+                )
+                inserted = await conn.execute(
+                    """
+                    INSERT INTO communities (membership_hash, nodes, level, summary, summary_embedding)
+                    SELECT membership_hash, nodes, level, summary, summary_embedding
+                    FROM community_staging
+                    ORDER BY level
+                    ON CONFLICT (membership_hash) DO UPDATE
+                    SET summary = EXCLUDED.summary,
+                        summary_embedding = EXCLUDED.summary_embedding
+                    WHERE EXCLUDED.summary IS NOT NULL
+                    """
+                )
+                await conn.execute(
+                    """
+                    UPDATE communities c SET parent_id = p.id
+                    FROM community_staging s
+                    LEFT JOIN communities p ON p.membership_hash = s.parent_hash
+                    WHERE c.membership_hash = s.membership_hash
+                      AND c.parent_id IS DISTINCT FROM p.id
+                    """
+                )
+                deleted = await conn.execute(
+                    """
+                    DELETE FROM communities c
+                    WHERE ($1::int[] IS NULL OR c.id = ANY($1::int[]))
+                      AND NOT EXISTS (
+                          SELECT 1 FROM community_staging s
+                          WHERE s.membership_hash = c.membership_hash
+                      )
+                    """,
+                    replaced_ids,
+                )
+                await _bump_version(conn, "communities")
+        return int(inserted.split()[-1]), int(deleted.split()[-1])
+
     async def close(self):
         if self.pool:
             await self.pool.close()
             logger.info("Database pool closed")
+
+
+async def _bump_version(conn: asyncpg.Connection, name: str):
+    """Advance a graph_versions counter so in-process caches reload."""
+    await conn.execute(
+        "UPDATE graph_versions SET version = version + 1 WHERE name = $1", name
+    )
+
+
+async def _tune_vector_search(
+    conn: asyncpg.Connection, ef_search: Optional[int], probes: Optional[int]
+):
+    """Set ANN search parameters for the current transaction only."""
+    # SET takes no bind parameters; int() keeps the values literal.
+    if ef_search is not None:
+        await conn.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+    if probes is not None:
+        await conn.execute(f"SET LOCAL ivfflat.probes = {int(probes)}")
@@ -0,0 +1,182 @@
+import array
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"memory hits {self.memory_hits}, disk hits {self.disk_hits}, "
+            f"misses {self.misses}, evictions {self.evictions} "
+            f"(hit rate {self.hit_rate:.1%})"
+        )
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: in-memory LRU over a SQLite file.
+
+    Entries are keyed by (model, sha256(text)) and stored as float32 blobs. The
+    file is trimmed, least recently used first, once it exceeds ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        memory_items: int = 10_000,
+        max_bytes: int = 1 << 30,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._memory: "OrderedDict[tuple, array.array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                key TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        logger.info(f"Opened embedding cache {path} ({self._size} bytes)")
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up texts; returns a vector or None per text, in order."""
+        keys = [self.key(text) for text in texts]
+        results: List[Optional[array.array]] = [None] * len(keys)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                vector = self._memory.get((model, key))
+                if vector is None:
+                    missing.append(i)
+                else:
+                    self._memory.move_to_end((model, key))
+                    results[i] = vector
+            self.stats.memory_hits += len(keys) - len(missing)
+
+            found = self._fetch(model, sorted({keys[i] for i in missing}))
+            now = time.time()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                    [(now, model, key) for key in found],
+                )
+                self._conn.commit()
+            for i in missing:
+                vector = found.get(keys[i])
+                if vector is None:
+                    self.stats.misses += 1
+                else:
+                    self.stats.disk_hits += 1
+                    results[i] = vector
+                    self._remember((model, keys[i]), vector)
+        return [None if v is None else v.tolist() for v in results]
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ):
+        """Store vectors for texts and trim the file if it grew past max_bytes."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                packed = array.array("f", vector)
+                self._remember((model, key), packed)
+                rows.append((model, key, packed.tobytes(), now))
+            for row in rows:
+                # Keys are content hashes, so an existing row already holds
+                # the same vector.
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                if cursor.rowcount:
+                    self._size += len(row[2])
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        logger.info(f"Embedding cache closed: {self.stats}")
+
+    def _fetch(self, model: str, keys: List[str]) -> dict:
+        found = {}
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                (model, *batch),
+            ):
+                vector = array.array("f")
+                vector.frombytes(blob)
+                found[key] = vector
+        return found
+
+    def _remember(self, memory_key: tuple, vector: array.array):
+        self._memory[memory_key] = vector
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Delete least recently used rows until the file is at 90% of max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for model, key, size in self._conn.execute(
+            "SELECT model, key, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        ):
+            if self._size <= target:
+                break
+            victims.append((model, key))
+            self._size -= size
+        self._conn.executemany(
+            "DELETE FROM embeddings WHERE model = ? AND key = ?", victims
+        )
+        for victim in victims:
+            self._memory.pop(victim, None)
+        self.stats.evictions += len(victims)
+        logger.debug(f"Evicted {len(victims)} cached embeddings")
@@ -1,28 +1,157 @@
+import asyncio
 import logging
-from typing import List
+import time
+from typing import Dict, List, Tuple
 
-from openai import AsyncOpenAI
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, RateLimitError
+from src.rate_limiter import Priority, RateLimiter
+from src.utils import estimate_tokens
+
+from graphrag_extender.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUSES = {408, 409, 500, 502, 503, 504}
+
+
+def _is_transient(error: BaseException) -> bool:
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUSES
+    # Includes APITimeoutError.
+    return isinstance(error, APIConnectionError)
+
 
 class Embeddings:
     def __init__(self, config: dict):
-        self.client = AsyncOpenAI(api_key=config["embeddings"]["api_key"])
-        self.model = config["embeddings"].get(
-            "embedding_model", "text-embedding-ada-002"
+        settings = config["embeddings"]
+        self.rate_limiter = RateLimiter.shared(
+            "embeddings", config.get("rate_limits", {}).get("embeddings")
         )
+        self.max_retries = settings.get("max_retries", 6)
+        self.rate_limit_timeout = settings.get("rate_limit_timeout", 600.0)
+        # With a rate limiter the SDK must not retry 429s behind its back, so
+        # _embed_batch retries everything itself.
+        self.client = AsyncOpenAI(
+            api_key=settings["api_key"],
+            **({"max_retries": 0} if self.rate_limiter is not None else {}),
+        )
+        self.model = settings.get("embedding_model", "text-embedding-ada-002")
+        self.batch_size = settings.get("batch_size", 256)
+        self.max_batch_tokens = settings.get("max_batch_tokens", 200_000)
+        self.semaphore = asyncio.Semaphore(settings.get("max_concurrency", 4))
+        self.cache = None
+        if settings.get("cache"):
+            self.cache = EmbeddingCache(**settings["cache"])
         logger.info("Initialized Embeddings with OpenAI API")
 
-    async def generate_embedding(self, text: str) -> List[float]:
+    async def generate_embedding(
+        self, text: str, priority: Priority = Priority.INTERACTIVE
+    ) -> List[float]:
         """Generate embedding for text."""
-        try:
-            response = await self.client.embeddings.create(
-                input=text, model=self.model, encoding_format="float"
-            )
-            embedding = response.data[0].embedding
-            logger.debug(f"Generated embedding for text: {text[:50]}...")
-            return embedding
-        except Exception as e:
-            logger.error(f"Embedding generation failed: {str(e)}")
-            raise
+        return (await self.generate_embeddings([text], priority=priority))[0]
+
+    async def generate_embeddings(
+        self, texts: List[str], priority: Priority = Priority.BACKGROUND
+    ) -> List[List[float]]:
+        """Generate embeddings for many texts, preserving input order.
+
+        Cached texts and duplicates within the call are only sent once.
+        """
+        embeddings: List[List[float]] = [None] * len(texts)
+        if self.cache is not None and texts:
+            cached = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+            for index, vector in enumerate(cached):
+                embeddings[index] = vector
+
+        pending: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            if embeddings[index] is None:
+                pending.setdefault(text, []).append(index)
+        if not pending:
+            return embeddings
+
+        unique = list(pending)
+        batches = self._pack(unique)
+        results = await asyncio.gather(
+            *(self._embed_batch(b, priority) for b in batches)
+        )
+        vectors: List[List[float]] = [None] * len(unique)
+        for batch, batch_vectors in zip(batches, results):
+            for (position, text), vector in zip(batch, batch_vectors):
+                vectors[position] = vector
+                for index in pending[text]:
+                    embeddings[index] = vector
+        logger.debug(f"Generated {len(unique)} embeddings in {len(batches)} requests")
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_many, self.model, unique, vectors)
+        return embeddings
+
+    def _pack(self, texts: List[str]) -> List[List[Tuple[int, str]]]:
+        """Group texts into batches bounded by count and token budget."""
+        batches, batch, batch_tokens = [], [], 0
+        for index, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append((index, text))
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _embed_batch(
+        self, batch: List[Tuple[int, str]], priority: Priority
+    ) -> List[List[float]]:
+        tokens = sum(estimate_tokens(text) for _, text in batch)
+        async with self.semaphore:
+            attempt = 0
+            throttled_since = None
+            while True:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire(tokens, priority)
+                try:
+                    response = await self.client.embeddings.create(
+                        input=[text for _, text in batch],
+                        model=self.model,
+                        encoding_format="float",
+                    )
+                    break
+                except RateLimitError as e:
+                    # Throttling is waited out for up to rate_limit_timeout
+                    # seconds instead of counting against max_retries.
+                    throttled_since = throttled_since or time.monotonic()
+                    if (
+                        self.rate_limiter is None
+                        or time.monotonic() - throttled_since >= self.rate_limit_timeout
+                    ):
+                        logger.error(f"Embedding rate limit exceeded: {str(e)}")
+                        raise
+                    self.rate_limiter.on_rate_limited(e.response.headers)
+                except Exception as e:
+                    attempt += 1
+                    if (
+                        self.rate_limiter is None
+                        or not _is_transient(e)
+                        or attempt >= self.max_retries
+                    ):
+                        logger.error(
+                            f"Batch embedding of {len(batch)} texts failed: {str(e)}"
+                        )
+                        raise
+                    logger.warning(
+                        f"Batch embedding failed (attempt {attempt}), retrying: {str(e)}"
+                    )
+                    await asyncio.sleep(min(2.0**attempt, 10.0))
+            if self.rate_limiter is not None:
+                self.rate_limiter.on_success()
+        data = sorted(response.data, key=lambda d: d.index)
+        return [d.embedding for d in data]
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
@@ -1,16 +1,19 @@
 import logging
 import os
 import sys
-
-import networkx as nx
+from typing import Iterable, List, Optional, Set, Tuple
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.entity_extractor import EntityExtractor
+from src.llm_client import LLMClient
+from src.summarizer import Summarizer
 from src.text_chunker import TextChunker
 
-from graphrag_extender.db import Database
+from graphrag_extender.communities import DetectedCommunity, detect_communities
 from graphrag_extender.embeddings import Embeddings
+from graphrag_extender.pipeline import IndexingPipeline
+from graphrag_extender.storage import Row, create_storage
 
 logger = logging.getLogger(__name__)
 
@@ -18,151 +21,261 @@ logger = logging.getLogger(__name__)
 class GraphExtender:
     def __init__(self, config: dict):
         self.config = config
-        self.db = Database(config["db"]["conn_string"])
+        self.db = create_storage(config)
         self.chunker = TextChunker(config)
-        self.extractor = EntityExtractor(config)
+        self.llm_client = None
+        summarize = config.get("summarization", {}).get("mode") == "llm"
+        if config.get("extraction", {}).get("mode") == "llm" or summarize:
+            self.llm_client = LLMClient.from_config(config)
+        self.extractor = EntityExtractor(config, llm_client=self.llm_client)
+        self.summarizer = Summarizer(self.llm_client, config) if summarize else None
         self.embeddings = Embeddings(config)
         self.chunk_size = config.get("chunk_size", 512)
 
     async def initialize(self):
         await self.db.initialize()
+        await self.extractor.load_known_entities(self.db)
         logger.info("GraphExtender initialized")
 
+    async def close(self):
+        if self.llm_client is not None:
+            await self.llm_client.close()
+        self.embeddings.close()
+        await self.db.close()
+
     async def extend_graph(self, input_dir: str):
         logger.info("Starting to process documents")
-        for filename in os.listdir(input_dir):
-            file_path = os.path.join(input_dir, filename)
-            if os.path.isfile(file_path):
-                doc_id = await self.db.add_document(file_path)
-                logger.info(f"Added document to database: {file_path}")
-                await self.process_document(file_path, doc_id)
-                await self.db.mark_document_processed(doc_id)
-        await self.update_communities()
-
-    async def process_document(self, file_path: str, doc_id: int):
-        logger.info(f"Processing document: {file_path}")
+        paths = [
+            os.path.join(input_dir, filename)
+            for filename in sorted(os.listdir(input_dir))
+        ]
+        pipeline = IndexingPipeline(self, self.config)
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-            logger.debug(f"Document preview: {text[:100]}")
-
-            chunks = self.chunker.chunk_text(text)
-            logger.info(f"Total chunks created: {len(chunks)}")
-
-            for i, chunk in enumerate(chunks, 1):
-                logger.info(f"Processing chunk {i}/{len(chunks)} in {file_path}")
-                await self.process_chunk(chunk, doc_id)
-
-            await self.calculate_edge_weights(doc_id)
+            await pipeline.run(p for p in paths if os.path.isfile(p))
         except Exception as e:
-            logger.error(f"Error processing document {file_path}: {str(e)}")
+            logger.error(f"Error processing documents in {input_dir}: {str(e)}")
             raise
+        if self.embeddings.cache is not None:
+            logger.info(f"Embedding cache: {self.embeddings.cache.stats}")
+        await self.update_communities()
 
-    async def process_chunk(self, chunk: str, doc_id: int):
-        logger.debug(f"Chunk text: {chunk[:100]}...")
-        try:
-            embedding = await self.embeddings.generate_embedding(chunk)
-            chunk_id = await self.db.add_chunk(chunk, embedding, doc_id)
-            entities = await self.extractor.extract_entities(chunk)
-            logger.debug(f"Extracted entities: {entities}")
-            for entity in entities:
-                entity_id = await self.db.add_node(entity["name"], entity["type"])
-                await self.db.link_chunk_entity(chunk_id, entity_id)
-        except Exception as e:
-            logger.error(f"Failed to process chunk: {str(e)}")
-            raise
+    async def calculate_edge_weights(
+        self, doc_id: int, conn=None, extra_entity_ids: Iterable[int] = ()
+    ):
+        """Rebuild edges among the document's entities.
 
-    async def calculate_edge_weights(self, doc_id: int):
+        ``extra_entity_ids`` adds entities the document used to mention, so
+        edges that only existed through replaced chunks are dropped too.
+        """
         logger.info(f"Calculating edge weights for document ID: {doc_id}")
         try:
-            entities = await self.db.get_document_entities(doc_id)
+            entities = await self.db.get_document_entities(doc_id, conn=conn)
             logger.debug(f"Entities for doc {doc_id}: {entities}")
-            for i, (source_id, source_name) in enumerate(entities):
-                for target_id, target_name in entities[i + 1 :]:
-                    shared_chunks = await self.db.get_shared_chunks(
-                        source_id, target_id
-                    )
-                    if shared_chunks > 0:
-                        weight = shared_chunks / 2.0
-                        await self.db.add_edge(source_id, target_id, "related", weight)
-                        await self.db.add_edge(target_id, source_id, "related", weight)
-            logger.info(f"Edge weights calculated for document ID: {doc_id}")
+            entity_ids = {entity["id"] for entity in entities}
+            entity_ids.update(extra_entity_ids)
+            edge_count = await self.db.rebuild_edges(sorted(entity_ids), conn=conn)
+            await self.db.mark_nodes_dirty(sorted(entity_ids), conn=conn)
+            logger.info(
+                f"Edge weights calculated for document ID: {doc_id} ({edge_count} edges)"
+            )
         except Exception as e:
             logger.error(f"Error calculating edge weights: {str(e)}")
             raise
 
     async def update_communities(self):
+        """Bring communities up to date with the graph.
+
+        Only communities containing nodes whose edges changed since the last
+        update, or their neighbours, are re-clustered, seeded with the previous
+        partition; all other rows and embeddings are left alone. Falls back to
+        a full rebuild when there are no communities yet, incremental updates
+        are disabled, or the change touches too much of the graph.
+        """
         logger.info("Updating communities")
+        settings = self.config.get("communities", {})
         try:
-            nodes, edges = await self.db.load_graph()
-            logger.debug(f"Loaded {len(nodes)} nodes and {len(edges)} edges")
-            if not nodes:
-                logger.info("No nodes found for community detection")
+            dirty = await self.db.get_dirty_nodes()
+            existing = await self.db.get_communities()
+            top = [c for c in existing if c["level"] == 0]
+            # Communities written before membership hashes cannot be matched
+            # or updated incrementally, so they are replaced by a full rebuild.
+            legacy = any(c["membership_hash"] is None for c in existing)
+            if legacy:
+                logger.info("Rebuilding communities created by an older version")
+            elif top and not dirty:
+                logger.info("Graph unchanged since last community update")
                 return
 
-            G = nx.Graph()
-            node_map = {node["id"]: i for i, node in enumerate(nodes)}
-            for node in nodes:
-                G.add_node(node_map[node["id"]], name=node["name"])
-            for edge in edges:
-                G.add_edge(
-                    node_map[edge["source_id"]],
-                    node_map[edge["target_id"]],
-                    weight=edge["weight"],
-                )
+            affected = None
+            if top and not legacy and settings.get("incremental", True):
+                affected = await self._affected_communities(top, dirty, settings)
 
-            communities = []
-            if not edges:
-                logger.info("No edges found, creating single community")
-                communities = [[i for i in range(len(nodes))]]
+            if affected is None:
+                graph = await self.db.load_graph_store()
+                membership = None
+                replaced = None
             else:
-                communities = list(
-                    nx.algorithms.community.greedy_modularity_communities(
-                        G, weight="weight"
-                    )
+                community_ids, node_ids = affected
+                graph = await self.db.load_graph_store(node_ids)
+                membership = {
+                    node_id: c["id"]
+                    for c in top
+                    if c["id"] in community_ids
+                    for node_id in c["nodes"]
+                }
+                replaced = _with_descendants(existing, community_ids)
+                logger.info(
+                    f"Re-clustering {len(community_ids)} affected communities "
+                    f"({graph.node_count} nodes, {graph.edge_count} edges)"
                 )
-                logger.debug(f"Detected {len(communities)} communities")
-
-            if not communities:
-                logger.info("No communities detected, creating default community")
-                communities = [[i for i in range(len(nodes))]]
-
-            async with self.db.pool.acquire() as conn:
-                max_id = await conn.fetchval(
-                    "SELECT COALESCE(MAX(id), -1) FROM communities"
-                )
-                start_id = max_id + 1
-
-                for idx, community in enumerate(communities, start=start_id):
-                    community_nodes = [nodes[node]["id"] for node in community]
-                    node_names = [nodes[node]["name"] for node in community]
-                    summary = f"Community {idx} with nodes: {', '.join(node_names)}"
-                    summary_embedding = await self.embeddings.generate_embedding(
-                        summary
-                    )
+            logger.debug(
+                f"Loaded {graph.node_count} nodes and {graph.edge_count} edges "
+                f"({graph.nbytes} bytes)"
+            )
+            if not graph.node_count:
+                logger.info("No nodes found for community detection")
+                return
 
-                    # Check if community with same nodes exists
-                    existing_id = await conn.fetchval(
-                        "SELECT id FROM communities WHERE nodes = $1", community_nodes
-                    )
-                    if existing_id is not None:
-                        await conn.execute(
-                            "UPDATE communities SET summary = $1, summary_embedding = $2 WHERE id = $3",
-                            summary,
-                            summary_embedding,
-                            existing_id,
-                        )
-                        logger.debug(
-                            f"Updated community {existing_id} with {len(community_nodes)} nodes"
-                        )
-                    else:
-                        await self.db.add_community(
-                            idx, community_nodes, summary, summary_embedding
-                        )
-                        logger.debug(
-                            f"Added community {idx} with {len(community_nodes)} nodes"
-                        )
+            communities = detect_communities(graph, settings, membership)
+            logger.debug(f"Detected {len(communities)} communities")
+            await self._store_communities(communities, replaced, dirty)
             logger.info("Communities updated successfully")
         except Exception as e:
             logger.error(f"Error updating communities: {str(e)}")
             raise
+
+    async def _affected_communities(
+        self, top: List[Row], dirty: List[int], settings: dict
+    ) -> Optional[Tuple[Set[int], List[int]]]:
+        """Top-level communities to re-cluster and the nodes they cover.
+
+        Returns None when a full rebuild is the better choice.
+        """
+        touched = set(dirty)
+        touched.update(await self.db.get_neighbours(dirty))
+        community_ids = {c["id"] for c in top if touched.intersection(c["nodes"])}
+        node_ids = set(touched)
+        for c in top:
+            if c["id"] in community_ids:
+                node_ids.update(c["nodes"])
+        covered = set(touched)
+        for c in top:
+            covered.update(c["nodes"])
+        if len(node_ids) > settings.get("max_incremental_fraction", 0.5) * len(covered):
+            logger.info("Change touches most of the graph, rebuilding communities")
+            return None
+        return community_ids, sorted(node_ids)
+
+    async def _store_communities(
+        self,
+        communities: List[DetectedCommunity],
+        replaced: Optional[List[Row]],
+        dirty: List[int],
+    ):
+        """Replace the ``replaced`` rows (all rows when None) with ``communities``.
+
+        Rows are matched by membership hash: communities whose members did not
+        change keep their row, summary and embedding; only new ones are
+        summarised and embedded. Everything is written in one transaction.
+        """
+        known = await self.db.get_community_hashes(
+            [community.membership_hash for community in communities]
+        )
+        new = [c for c in communities if c.membership_hash not in known]
+        summaries = await self._summarize(new)
+        summary_embeddings = await self.embeddings.generate_embeddings(summaries)
+        generated = {
+            community.membership_hash: (summary, embedding)
+            for community, summary, embedding in zip(new, summaries, summary_embeddings)
+        }
+
+        rows = []
+        for community in communities:
+            parent_hash = (
+                communities[community.parent].membership_hash
+                if community.parent is not None
+                else None
+            )
+            summary, embedding = generated.get(community.membership_hash, (None, None))
+            rows.append(
+                (
+                    community.membership_hash,
+                    community.nodes,
+                    community.level,
+                    parent_hash,
+                    summary,
+                    embedding,
+                )
+            )
+        replaced_ids = None if replaced is None else [c["id"] for c in replaced]
+        async with self.db.transaction() as conn:
+            written, deleted = await self.db.upsert_communities(
+                rows, replaced_ids, conn=conn
+            )
+            await self.db.clear_dirty_nodes(dirty, conn=conn)
+        logger.info(
+            f"Communities: {written} written, {len(communities) - len(new)} "
+            f"unchanged, {deleted} removed"
+        )
+
+    async def _summarize(self, communities: List[DetectedCommunity]) -> List[str]:
+        if not communities:
+            return []
+        node_ids = sorted({node_id for c in communities for node_id in c.nodes})
+        if self.summarizer is None:
+            names = await self.db.get_node_names(node_ids)
+            return [
+                "Community with nodes: "
+                + ", ".join(names[node_id] for node_id in community.nodes)
+                for community in communities
+            ]
+
+        nodes, edges = await self.db.load_subgraph(node_ids)
+        names = {node["id"]: node["name"] for node in nodes}
+
+        types = {node["id"]: node["type"] or "Entity" for node in nodes}
+        relationships = [[] for _ in communities]
+        by_level = {}
+        for i, community in enumerate(communities):
+            for node_id in community.nodes:
+                by_level.setdefault(community.level, {})[node_id] = i
+        seen = set()
+        for edge in edges:
+            source, target = edge["source_id"], edge["target_id"]
+            # 'related' edges are stored once per direction.
+            key = (min(source, target), max(source, target), edge["relationship"])
+            if edge["relationship"] == "related" and key in seen:
+                continue
+            seen.add(key)
+            for members in by_level.values():
+                i = members.get(source)
+                if i is not None and members.get(target) == i:
+                    relationships[i].append(
+                        (
+                            names[source],
+                            names[target],
+                            edge["relationship"],
+                            edge["weight"],
+                        )
+                    )
+        logger.info(f"Summarising {len(communities)} communities")
+        return await self.summarizer.summarize_many(
+            [
+                (
+                    [(names[node_id], types[node_id]) for node_id in community.nodes],
+                    relationships[i],
+                )
+                for i, community in enumerate(communities)
+            ]
+        )
+
+
+def _with_descendants(communities: List[Row], root_ids: Set[int]) -> List[Row]:
+    """Rows in root_ids plus every row below them (input is ordered by level)."""
+    selected = set(root_ids)
+    result = []
+    for community in communities:
+        if community["id"] in selected or community["parent_id"] in selected:
+            selected.add(community["id"])
+            result.append(community)
+    return result
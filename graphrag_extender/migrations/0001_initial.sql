@@ -0,0 +1,39 @@
+-- Baseline schema. Statements are idempotent so databases created from an
+-- older schema.sql are brought up to date rather than rebuilt.
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS documents ( id SERIAL PRIMARY KEY, path TEXT NOT NULL UNIQUE, content_hash TEXT, size BIGINT, mtime DOUBLE PRECISION, processed BOOLEAN DEFAULT FALSE );
+
+CREATE TABLE IF NOT EXISTS chunks ( id SERIAL PRIMARY KEY, text TEXT NOT NULL, embedding VECTOR(1536), document_id INTEGER REFERENCES documents(id) );
+
+CREATE TABLE IF NOT EXISTS nodes ( id SERIAL PRIMARY KEY, name TEXT NOT NULL UNIQUE, type TEXT );
+
+CREATE TABLE IF NOT EXISTS edges ( id SERIAL PRIMARY KEY, source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT, weight FLOAT );
+
+CREATE TABLE IF NOT EXISTS chunk_entities ( chunk_id INTEGER REFERENCES chunks(id), entity_id INTEGER REFERENCES nodes(id), PRIMARY KEY (chunk_id, entity_id) );
+
+CREATE TABLE IF NOT EXISTS chunk_relationships ( chunk_id INTEGER REFERENCES chunks(id), source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT NOT NULL, PRIMARY KEY (chunk_id, source_id, target_id, relationship) );
+
+CREATE TABLE IF NOT EXISTS communities ( id SERIAL PRIMARY KEY, nodes INTEGER[], summary TEXT, summary_embedding VECTOR(1536), level INTEGER NOT NULL DEFAULT 0, parent_id INTEGER REFERENCES communities(id), membership_hash TEXT UNIQUE );
+
+CREATE TABLE IF NOT EXISTS dirty_nodes ( node_id INTEGER PRIMARY KEY REFERENCES nodes(id) );
+
+-- Columns added after the first release.
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT, ADD COLUMN IF NOT EXISTS size BIGINT, ADD COLUMN IF NOT EXISTS mtime DOUBLE PRECISION;
+
+-- Older releases added a documents row, with its own chunks, on every run.
+-- Keep the newest processed copy of each path (else the newest) and drop the
+-- rest with their chunks, so the path can become unique.
+CREATE TEMPORARY TABLE duplicate_documents ON COMMIT DROP AS SELECT id FROM ( SELECT id, row_number() OVER (PARTITION BY path ORDER BY processed IS TRUE DESC, id DESC) AS copy FROM documents ) ranked WHERE copy > 1;
+DELETE FROM chunk_entities WHERE chunk_id IN (SELECT c.id FROM chunks c JOIN duplicate_documents d ON c.document_id = d.id);
+DELETE FROM chunk_relationships WHERE chunk_id IN (SELECT c.id FROM chunks c JOIN duplicate_documents d ON c.document_id = d.id);
+DELETE FROM chunks WHERE document_id IN (SELECT id FROM duplicate_documents);
+DELETE FROM documents WHERE id IN (SELECT id FROM duplicate_documents);
+CREATE UNIQUE INDEX IF NOT EXISTS documents_path_key ON documents (path);
+
+ALTER TABLE communities ADD COLUMN IF NOT EXISTS level INTEGER NOT NULL DEFAULT 0, ADD COLUMN IF NOT EXISTS parent_id INTEGER REFERENCES communities(id), ADD COLUMN IF NOT EXISTS membership_hash TEXT UNIQUE;
+
+-- Older releases inserted community ids explicitly and reset the sequence, so
+-- move it past them before ids are generated. Their communities have no
+-- membership_hash; update_communities rebuilds them once.
+SELECT setval(pg_get_serial_sequence('communities', 'id'), COALESCE(max(id), 0) + 1, false) FROM communities;
@@ -0,0 +1,23 @@
+-- migrate: no-transaction
+-- Indexes for the query and indexing hot paths, built CONCURRENTLY so a
+-- populated database keeps taking writes. Each statement runs on its own.
+
+-- Approximate nearest neighbour search for ORDER BY embedding <=> $1.
+-- Recall/latency is tuned per query with hnsw.ef_search.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chunks_embedding_hnsw ON chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS communities_summary_embedding_hnsw ON communities USING hnsw (summary_embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Neighbour lookups (source_id = $1 OR target_id = $1) become a bitmap OR.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS edges_source_id_idx ON edges (source_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS edges_target_id_idx ON edges (target_id);
+
+-- Link tables are keyed by chunk first; these serve lookups by entity.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chunk_entities_entity_id_idx ON chunk_entities (entity_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chunk_relationships_source_id_idx ON chunk_relationships (source_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS chunks_document_id_idx ON chunks (document_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS communities_parent_id_idx ON communities (parent_id);
@@ -0,0 +1,6 @@
+-- Counters bumped in the same transaction as every write to edges or
+-- communities, so query processes know when their in-process caches of the
+-- graph are stale.
+CREATE TABLE IF NOT EXISTS graph_versions ( name TEXT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0 );
+
+INSERT INTO graph_versions (name) VALUES ('edges'), ('communities') ON CONFLICT DO NOTHING;
@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+-- Heaviest-first neighbour scans for local search: ORDER BY weight DESC
+-- LIMIT n per node reads n index entries even for hub entities.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS edges_source_id_weight_idx ON edges (source_id, weight DESC NULLS LAST);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS edges_target_id_weight_idx ON edges (target_id, weight DESC NULLS LAST);
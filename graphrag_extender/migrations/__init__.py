@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Held for the whole run so concurrent indexers never apply the same migration.
+_MIGRATION_LOCK = 0x6772_6D67
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+# First-line marker for migrations that cannot run inside a transaction, such
+# as CREATE INDEX CONCURRENTLY. Their statements are executed one by one.
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION)
+
+    def statements(self) -> List[str]:
+        """Statements separated by ';' at line end, without comment lines."""
+        statements = []
+        for part in re.split(r";\s*$", self.sql, flags=re.MULTILINE):
+            lines = [
+                line
+                for line in part.splitlines()
+                if line.strip() and not line.lstrip().startswith("--")
+            ]
+            if lines:
+                statements.append("\n".join(lines))
+        return statements
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Read NNNN_name.sql files from a directory, ordered by version."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+            migrations[version] = Migration(version, match.group(2), f.read())
+    return [migrations[version] for version in sorted(migrations)]
+
+
+class Migrator:
+    """Applies pending SQL migrations and records them in schema_migrations.
+
+    Migrations never drop data: each file moves the schema forward and is
+    applied at most once, in its own transaction unless it is marked
+    ``-- migrate: no-transaction``.
+    """
+
+    def __init__(self, directory: str = MIGRATIONS_DIR):
+        self.migrations = load_migrations(directory)
+
+    async def applied(self, conn: asyncpg.Connection) -> Set[int]:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        records = await conn.fetch("SELECT version FROM schema_migrations")
+        return {r["version"] for r in records}
+
+    async def pending(self, conn: asyncpg.Connection) -> List[Migration]:
+        applied = await self.applied(conn)
+        return [m for m in self.migrations if m.version not in applied]
+
+    async def migrate(
+        self, conn: asyncpg.Connection, target: Optional[int] = None
+    ) -> List[Migration]:
+        """Apply pending migrations up to target (default: all) and return them."""
+        await conn.execute("SELECT pg_advisory_lock($1)", _MIGRATION_LOCK)
+        try:
+            done = []
+            for migration in await self.pending(conn):
+                if target is not None and migration.version > target:
+                    break
+                await self._apply(conn, migration)
+                done.append(migration)
+            if done:
+                logger.info(
+                    f"Applied migrations: {', '.join(f'{m.version:04d}_{m.name}' for m in done)}"
+                )
+            else:
+                logger.info("Database schema is up to date")
+            return done
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", _MIGRATION_LOCK)
+
+    async def _apply(self, conn: asyncpg.Connection, migration: Migration):
+        logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+        try:
+            if migration.transactional:
+                async with conn.transaction():
+                    await conn.execute(migration.sql)
+                    await self._record(conn, migration)
+                return
+            for statement in migration.statements():
+                await conn.execute(statement)
+            # A failed concurrent build leaves an invalid index behind that
+            # IF NOT EXISTS would silently keep.
+            invalid = await conn.fetch(
+                """
+                SELECT c.relname FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE NOT i.indisvalid
+                """
+            )
+            if invalid:
+                names = ", ".join(r["relname"] for r in invalid)
+                raise RuntimeError(f"Invalid indexes must be dropped first: {names}")
+            await self._record(conn, migration)
+        except Exception as e:
+            logger.error(
+                f"Migration {migration.version:04d}_{migration.name} failed: {str(e)}"
+            )
+            raise
+
+    async def _record(self, conn: asyncpg.Connection, migration: Migration):
+        await conn.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+            migration.version,
+            migration.name,
+        )
+
+
+async def migrate(conn_string: str, directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Bring the database at conn_string up to date.
+
+    Uses a plain connection, since pooled connections register the pgvector
+    codec and need the extension to exist already.
+    """
+    conn = await asyncpg.connect(conn_string)
+    try:
+        return await Migrator(directory).migrate(conn)
+    finally:
+        await conn.close()
@@ -3,6 +3,8 @@ from typing import List
 
 import asyncpg
 
+from graphrag_extender.communities import membership_hash
+
 
 @dataclass
 class Node:
@@ -101,31 +103,23 @@ class Community:
         nodes: List[int],
         summary: str,
         summary_embedding: List[float],
+        level: int = 0,
     ) -> "Community":
-        existing_id = await conn.fetchval(
-            "SELECT id FROM communities WHERE nodes = $1", nodes
+        record = await conn.fetchrow(
+            """
+            INSERT INTO communities (nodes, summary, summary_embedding, level, membership_hash)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (membership_hash) DO UPDATE
+            SET summary = EXCLUDED.summary, summary_embedding = EXCLUDED.summary_embedding
+            RETURNING id
+            """,
+            nodes,
+            summary,
+            summary_embedding,
+            level,
+            membership_hash(nodes, level),
         )
-        if existing_id is not None:
-            await conn.execute(
-                "UPDATE communities SET summary = $1, summary_embedding = $2 WHERE id = $3",
-                summary,
-                summary_embedding,
-                existing_id,
-            )
-            return cls(existing_id, nodes, summary, summary_embedding)
-        else:
-            max_id = await conn.fetchval(
-                "SELECT COALESCE(MAX(id), -1) FROM communities"
-            )
-            new_id = max_id + 1
-            await conn.execute(
-                "INSERT INTO communities (id, nodes, summary, summary_embedding) VALUES ($1, $2, $3, $4)",
-                new_id,
-                nodes,
-                summary,
-                summary_embedding,
-            )
-            return cls(new_id, nodes, summary, summary_embedding)
+        return cls(record["id"], nodes, summary, summary_embedding)
 
 
 @dataclass
@@ -0,0 +1,43 @@
+import array
+import struct
+import sys
+
+import asyncpg
+
+# pgvector's binary wire format: uint16 dimensions, uint16 reserved, then the
+# components as big-endian float32.
+_HEADER = struct.Struct(">HH")
+_SWAP = sys.byteorder == "little"
+
+
+def encode_vector(value) -> bytes:
+    """Encode a sequence, array.array or NumPy array as a binary pgvector."""
+    if hasattr(value, "astype"):
+        return _HEADER.pack(len(value), 0) + value.astype(">f4", copy=False).tobytes()
+    if not (isinstance(value, array.array) and value.typecode == "f"):
+        value = array.array("f", value)
+    if _SWAP:
+        value = array.array("f", value)
+        value.byteswap()
+    return _HEADER.pack(len(value), 0) + value.tobytes()
+
+
+def decode_vector(data: bytes) -> array.array:
+    """Decode a binary pgvector into a float32 array.array."""
+    dim, _ = _HEADER.unpack_from(data)
+    value = array.array("f")
+    value.frombytes(data[_HEADER.size : _HEADER.size + 4 * dim])
+    if _SWAP:
+        value.byteswap()
+    return value
+
+
+async def register_vector(conn: asyncpg.Connection, schema: str = "public"):
+    """Register the binary pgvector codec on a connection (usable as pool init)."""
+    await conn.set_type_codec(
+        "vector",
+        schema=schema,
+        encoder=encode_vector,
+        decoder=decode_vector,
+        format="binary",
+    )
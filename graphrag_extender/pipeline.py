@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's contents, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def throughput(self) -> float:
+        """Items per second over the wall-clock lifetime of the stage."""
+        return self.items / self.elapsed
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.items} items in {self.elapsed:.2f}s "
+            f"({self.throughput:.1f}/s, busy {self.busy_seconds:.2f}s)"
+        )
+
+
+@dataclass
+class DocumentState:
+    doc_id: int
+    path: str
+    replaces: bool = False
+    total: Optional[int] = None
+    completed: int = 0
+    jobs: List["ChunkJob"] = field(default_factory=list)
+    previous_entity_ids: List[int] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def done(self) -> bool:
+        return self.total is not None and self.completed == self.total
+
+
+@dataclass
+class ChunkJob:
+    document: DocumentState
+    index: int
+    text: str
+    embedding: Optional[List[float]] = None
+    entities: Optional[List[dict]] = None
+    relationships: List[dict] = field(default_factory=list)
+
+
+async def _next_batch(queue: asyncio.Queue, size: int):
+    """Wait for one item, then take whatever else is ready, up to ``size``.
+
+    Returns the batch and whether the stop sentinel was reached.
+    """
+    item = await queue.get()
+    if item is _STOP:
+        return [], True
+    batch = [item]
+    while len(batch) < size and not queue.empty():
+        item = queue.get_nowait()
+        if item is _STOP:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+class IndexingPipeline:
+    """Bounded, concurrent read -> embed -> extract -> persist indexing pipeline.
+
+    Every stage runs its own pool of workers connected by bounded queues, so a
+    slow stage applies backpressure upstream instead of letting chunks pile up.
+    """
+
+    def __init__(self, extender, config: dict):
+        self.extender = extender
+        settings = config.get("indexing", {})
+        self.concurrency = {
+            "read": settings.get("read_concurrency", 4),
+            "embed": settings.get("embed_concurrency", 8),
+            "extract": settings.get("extract_concurrency", 8),
+            "persist": settings.get("persist_concurrency", 4),
+        }
+        self.queue_size = settings.get("queue_size", 1000)
+        self.embed_batch_size = settings.get("embed_batch_size", 64)
+        self.extract_batch_size = settings.get("extract_batch_size", 32)
+        self.persist_batch_size = settings.get("persist_batch_size", 256)
+        self.read_buffer_size = settings.get("read_buffer_size", 1 << 20)
+        self.stats: Dict[str, StageStats] = {}
+        self.skipped = 0
+
+    async def run(self, paths: Iterable[str]) -> Dict[str, StageStats]:
+        """Index every path and return per-stage statistics."""
+        read_q = asyncio.Queue(self.queue_size)
+        embed_q = asyncio.Queue(self.queue_size)
+        extract_q = asyncio.Queue(self.queue_size)
+        persist_q = asyncio.Queue(self.queue_size)
+
+        stages = [
+            ("read", self._read, read_q, (embed_q, persist_q)),
+            ("embed", self._embed, embed_q, (extract_q,)),
+            ("extract", self._extract, extract_q, (persist_q,)),
+            ("persist", self._persist, persist_q, ()),
+        ]
+        self.stats = {name: StageStats(name) for name, *_ in stages}
+        workers = {
+            name: [
+                asyncio.create_task(handler(in_q, *out_qs, self.stats[name]))
+                for _ in range(self.concurrency[name])
+            ]
+            for name, handler, in_q, out_qs in stages
+        }
+
+        async def coordinate():
+            for path in paths:
+                await read_q.put(path)
+            for name, _, in_q, _ in stages:
+                for _ in workers[name]:
+                    await in_q.put(_STOP)
+                await asyncio.gather(*workers[name])
+                self.stats[name].finished_at = time.perf_counter()
+
+        coordinator = asyncio.create_task(coordinate())
+        all_tasks = [coordinator] + [t for ts in workers.values() for t in ts]
+        try:
+            done, _ = await asyncio.wait(all_tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            await coordinator
+        finally:
+            for task in all_tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*all_tasks, return_exceptions=True)
+
+        logger.info(f"Skipped {self.skipped} unchanged documents")
+        for stage in self.stats.values():
+            logger.info(f"Pipeline stage {stage}")
+        return self.stats
+
+    async def _read(self, in_q, embed_q, persist_q, stats: StageStats):
+        while (path := await in_q.get()) is not _STOP:
+            started = time.perf_counter()
+            state = await self._register(path)
+            stats.busy_seconds += time.perf_counter() - started
+            if state is None:
+                self.skipped += 1
+                continue
+
+            # Chunks are streamed straight into the embed queue, so large files
+            # are never held in memory and embedding starts immediately. The
+            # file reads run in a thread, a read buffer's worth of chunks at a
+            # time, so they never stall the embed and persist workers.
+            chunker = self.extender.chunker
+            chunks = chunker.iter_file_chunks(path, self.read_buffer_size)
+            per_read = max(
+                1, self.read_buffer_size // max(chunker.chunk_size - chunker.overlap, 1)
+            )
+            count = 0
+            try:
+                while batch := await asyncio.to_thread(
+                    list, itertools.islice(chunks, per_read)
+                ):
+                    for chunk in batch:
+                        await embed_q.put(ChunkJob(state, count, chunk.text))
+                        count += 1
+            finally:
+                chunks.close()
+            logger.info(f"Total chunks created for {path}: {count}")
+            state.total = count
+            stats.items += 1
+            # The last chunk may already have been persisted; if so, nobody
+            # downstream will notice the document is complete.
+            if state.done:
+                await persist_q.put(state)
+
+    async def _register(self, path: str) -> Optional[DocumentState]:
+        """Register a new or changed document; return None if it is unchanged.
+
+        Size and mtime are checked first so unchanged files are skipped without
+        being read; otherwise the content hash decides.
+        """
+        db = self.extender.db
+        # A stat on a large or network-mounted directory can block.
+        stat = await asyncio.to_thread(os.stat, path)
+        existing = await db.get_document(path)
+        if (
+            existing is not None
+            and existing["processed"]
+            and existing["size"] == stat.st_size
+            and existing["mtime"] == stat.st_mtime
+        ):
+            logger.debug(f"Skipping unchanged document: {path}")
+            return None
+        content_hash = await asyncio.to_thread(hash_file, path)
+        if (
+            existing is not None
+            and existing["processed"]
+            and existing["content_hash"] == content_hash
+        ):
+            await db.touch_document(existing["id"], stat.st_size, stat.st_mtime)
+            logger.debug(f"Skipping document with unchanged content: {path}")
+            return None
+        doc_id = await db.upsert_document(
+            path, content_hash, stat.st_size, stat.st_mtime
+        )
+        if existing is None:
+            logger.info(f"Added document to database: {path}")
+        else:
+            logger.info(f"Re-indexing changed document: {path}")
+        return DocumentState(doc_id, path, replaces=existing is not None)
+
+    async def _embed(self, in_q, extract_q, stats: StageStats):
+        stopped = False
+        while not stopped:
+            jobs, stopped = await _next_batch(in_q, self.embed_batch_size)
+            if not jobs:
+                continue
+            started = time.perf_counter()
+            embeddings = await self.extender.embeddings.generate_embeddings(
+                [job.text for job in jobs]
+            )
+            stats.busy_seconds += time.perf_counter() - started
+            stats.items += len(jobs)
+            for job, embedding in zip(jobs, embeddings):
+                job.embedding = embedding
+                await extract_q.put(job)
+
+    async def _extract(self, in_q, persist_q, stats: StageStats):
+        stopped = False
+        while not stopped:
+            jobs, stopped = await _next_batch(in_q, self.extract_batch_size)
+            if not jobs:
+                continue
+            started = time.perf_counter()
+            results = await self.extender.extractor.extract_batch(
+                [job.text for job in jobs]
+            )
+            stats.busy_seconds += time.perf_counter() - started
+            stats.items += len(jobs)
+            for job, result in zip(jobs, results):
+                job.entities = result["entities"]
+                job.relationships = result["relationships"]
+                logger.debug(f"Extracted entities: {job.entities}")
+                await persist_q.put(job)
+
+    async def _persist(self, in_q, stats: StageStats):
+        while (item := await in_q.get()) is not _STOP:
+            started = time.perf_counter()
+            if isinstance(item, ChunkJob):
+                stats.items += 1
+                state = item.document
+                state.jobs.append(item)
+                state.completed += 1
+                if state.done:
+                    await self._finish_document(state)
+                elif len(state.jobs) >= self.persist_batch_size:
+                    await self._flush(state)
+            else:
+                await self._finish_document(item)
+            stats.busy_seconds += time.perf_counter() - started
+
+    async def _flush(self, state: DocumentState):
+        """Write a document's buffered chunks in their own transaction."""
+        async with state.lock:
+            if not state.jobs:
+                return
+            async with self.extender.db.transaction() as conn:
+                await self._write_chunks(state, conn)
+
+    async def _finish_document(self, state: DocumentState):
+        """Write the remaining chunks, rebuild edges and mark the document done.
+
+        For documents that fit in one persist batch this makes the whole
+        (re)indexing of the document a single transaction.
+        """
+        async with state.lock:
+            async with self.extender.db.transaction() as conn:
+                await self._write_chunks(state, conn)
+                await self.extender.calculate_edge_weights(
+                    state.doc_id, conn=conn, extra_entity_ids=state.previous_entity_ids
+                )
+                await self.extender.db.mark_document_processed(state.doc_id, conn=conn)
+        logger.info(f"Finished document: {state.path}")
+
+    async def _write_chunks(self, state: DocumentState, conn):
+        db = self.extender.db
+        jobs = sorted(state.jobs, key=lambda job: job.index)
+        state.jobs = []
+        if state.replaces:
+            # Old chunks go away in the same transaction as the first new ones.
+            state.previous_entity_ids = await db.clear_document_chunks(
+                state.doc_id, conn=conn
+            )
+            state.replaces = False
+        chunk_ids = await db.add_chunks(
+            [(job.text, job.embedding, state.doc_id) for job in jobs], conn=conn
+        )
+        entities = [(e["name"], e["type"]) for job in jobs for e in job.entities]
+        node_ids = await db.add_nodes(entities, conn=conn)
+        self.extender.extractor.add_known_entities(entities)
+        await db.link_chunk_entities(
+            (
+                (chunk_id, node_ids[e["name"]])
+                for chunk_id, job in zip(chunk_ids, jobs)
+                for e in job.entities
+            ),
+            conn=conn,
+        )
+        await db.link_chunk_relationships(
+            (
+                (chunk_id, node_ids[r["source"]], node_ids[r["target"]], r["type"])
+                for chunk_id, job in zip(chunk_ids, jobs)
+                for r in job.relationships
+            ),
+            conn=conn,
+        )
@@ -0,0 +1,818 @@
+import array
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+import numpy as np
+
+from graphrag_extender.graph_store import CSRGraph
+from graphrag_extender.storage import CommunityRow, Storage
+from graphrag_extender.vector_index import EMBEDDING_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# The Postgres schema with INTEGER[] stored as JSON text and vectors as
+# float32 blobs. AUTOINCREMENT keeps ids from being reused after deletes, as
+# serial columns do.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents ( id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL UNIQUE, content_hash TEXT, size INTEGER, mtime REAL, processed INTEGER DEFAULT 0 );
+CREATE TABLE IF NOT EXISTS chunks ( id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT NOT NULL, embedding BLOB, document_id INTEGER REFERENCES documents(id) );
+CREATE TABLE IF NOT EXISTS nodes ( id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, type TEXT );
+CREATE TABLE IF NOT EXISTS edges ( id INTEGER PRIMARY KEY AUTOINCREMENT, source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT, weight REAL );
+CREATE TABLE IF NOT EXISTS chunk_entities ( chunk_id INTEGER REFERENCES chunks(id), entity_id INTEGER REFERENCES nodes(id), PRIMARY KEY (chunk_id, entity_id) ) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS chunk_relationships ( chunk_id INTEGER REFERENCES chunks(id), source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT NOT NULL, PRIMARY KEY (chunk_id, source_id, target_id, relationship) ) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS communities ( id INTEGER PRIMARY KEY AUTOINCREMENT, nodes TEXT, summary TEXT, summary_embedding BLOB, level INTEGER NOT NULL DEFAULT 0, parent_id INTEGER REFERENCES communities(id), membership_hash TEXT UNIQUE );
+CREATE TABLE IF NOT EXISTS dirty_nodes ( node_id INTEGER PRIMARY KEY REFERENCES nodes(id) );
+CREATE TABLE IF NOT EXISTS graph_versions ( name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0 );
+INSERT OR IGNORE INTO graph_versions (name) VALUES ('edges'), ('communities');
+CREATE INDEX IF NOT EXISTS edges_source_id_idx ON edges (source_id);
+CREATE INDEX IF NOT EXISTS edges_target_id_idx ON edges (target_id);
+CREATE INDEX IF NOT EXISTS edges_source_id_weight_idx ON edges (source_id, weight DESC);
+CREATE INDEX IF NOT EXISTS edges_target_id_weight_idx ON edges (target_id, weight DESC);
+CREATE INDEX IF NOT EXISTS chunk_entities_entity_id_idx ON chunk_entities (entity_id);
+CREATE INDEX IF NOT EXISTS chunk_relationships_source_id_idx ON chunk_relationships (source_id);
+CREATE INDEX IF NOT EXISTS chunks_document_id_idx ON chunks (document_id);
+CREATE INDEX IF NOT EXISTS communities_parent_id_idx ON communities (parent_id);
+"""
+
+# Binds a JSON array parameter as a set of values, like = ANY($1) does.
+_IN = "IN (SELECT value FROM json_each(?1))"
+
+
+class SQLiteStorage(Storage):
+    """Embedded storage backend in one SQLite file (or ``:memory:``).
+
+    A single connection is shared behind an asyncio lock and used only from
+    one dedicated thread, so queries never block the event loop. Every call
+    runs in a transaction of its own unless it is handed the connection from
+    ``transaction()``, so bulk writes commit once per batch. Vector search is
+    an exact NumPy scan over a community matrix cached until the
+    'communities' version moves.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # (communities version, ids, unit-normalised embedding matrix)
+        self._community_matrix: Optional[Tuple[int, List[int], np.ndarray]] = None
+
+    async def initialize(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite-storage"
+        )
+        self.conn = await self._call(self._open)
+        self._lock = asyncio.Lock()
+        logger.info(f"SQLite storage opened at {self.path}")
+
+    def _open(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = _dict_row
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        return conn
+
+    async def close(self):
+        if self.conn is not None:
+            await self._call(self.conn.close)
+            self.conn = None
+            logger.info("SQLite storage closed")
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _call(self, fn: Callable[..., T], *args) -> T:
+        """Run fn on the storage thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._lock:
+            await self._call(self.conn.execute, "BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                await self._call(self.conn.execute, "ROLLBACK")
+                raise
+            await self._call(self.conn.execute, "COMMIT")
+
+    async def _run(
+        self,
+        work: Callable[[sqlite3.Connection], T],
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> T:
+        """Run work(conn) on the storage thread.
+
+        Inside ``transaction()`` (conn given) the lock is already held;
+        otherwise work runs in a transaction of its own.
+        """
+        if conn is not None:
+            return await self._call(work, conn)
+
+        def atomic() -> T:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+        async with self._lock:
+            return await self._call(atomic)
+
+    async def get_document(self, path: str) -> Optional[dict]:
+        def work(conn):
+            return conn.execute(
+                "SELECT id, content_hash, size, mtime, processed FROM documents WHERE path = ?",
+                (path,),
+            ).fetchone()
+
+        return await self._run(work)
+
+    async def upsert_document(
+        self, path: str, content_hash: str, size: int, mtime: float
+    ) -> int:
+        def work(conn):
+            return conn.execute(
+                """
+                INSERT INTO documents (path, content_hash, size, mtime, processed)
+                VALUES (?, ?, ?, ?, 0)
+                ON CONFLICT (path) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    size = excluded.size,
+                    mtime = excluded.mtime,
+                    processed = 0
+                RETURNING id
+                """,
+                (path, content_hash, size, mtime),
+            ).fetchone()["id"]
+
+        return await self._run(work)
+
+    async def touch_document(self, doc_id: int, size: int, mtime: float):
+        def work(conn):
+            conn.execute(
+                "UPDATE documents SET size = ?, mtime = ? WHERE id = ?",
+                (size, mtime, doc_id),
+            )
+
+        await self._run(work)
+
+    async def clear_document_chunks(
+        self, doc_id: int, conn: Optional[sqlite3.Connection] = None
+    ) -> List[int]:
+        chunks = "SELECT id FROM chunks WHERE document_id = ?"
+
+        def work(conn):
+            records = conn.execute(
+                f"SELECT DISTINCT entity_id FROM chunk_entities WHERE chunk_id IN ({chunks})",
+                (doc_id,),
+            ).fetchall()
+            conn.execute(
+                f"DELETE FROM chunk_entities WHERE chunk_id IN ({chunks})", (doc_id,)
+            )
+            conn.execute(
+                f"DELETE FROM chunk_relationships WHERE chunk_id IN ({chunks})",
+                (doc_id,),
+            )
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (doc_id,))
+            return [r["entity_id"] for r in records]
+
+        return await self._run(work, conn)
+
+    async def get_unprocessed_documents(self) -> List[dict]:
+        def work(conn):
+            return conn.execute(
+                "SELECT id, path FROM documents WHERE processed = 0"
+            ).fetchall()
+
+        return await self._run(work)
+
+    async def mark_document_processed(
+        self, doc_id: int, conn: Optional[sqlite3.Connection] = None
+    ):
+        def work(conn):
+            conn.execute("UPDATE documents SET processed = 1 WHERE id = ?", (doc_id,))
+
+        await self._run(work, conn)
+
+    async def add_chunks(
+        self,
+        rows: List[Tuple[str, List[float], int]],
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> List[int]:
+        """Insert (text, embedding, document_id) rows, returning ids in row order."""
+        if not rows:
+            return []
+
+        def work(conn):
+            # The write lock is held, so the next ids can be reserved up front.
+            start = _next_id(conn, "chunks")
+            ids = list(range(start, start + len(rows)))
+            conn.executemany(
+                "INSERT INTO chunks (id, text, embedding, document_id) VALUES (?, ?, ?, ?)",
+                (
+                    (chunk_id, text, _to_blob(embedding), doc_id)
+                    for chunk_id, (text, embedding, doc_id) in zip(ids, rows)
+                ),
+            )
+            return ids
+
+        return await self._run(work, conn)
+
+    async def add_nodes(
+        self,
+        entities: Iterable[Tuple[str, str]],
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> Dict[str, int]:
+        types = dict(entities)
+        if not types:
+            return {}
+
+        def work(conn):
+            conn.executemany(
+                """
+                INSERT INTO nodes (name, type) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE SET type = excluded.type
+                """,
+                sorted(types.items()),
+            )
+            return conn.execute(
+                f"SELECT id, name FROM nodes WHERE name {_IN}",
+                (json.dumps(list(types)),),
+            ).fetchall()
+
+        records = await self._run(work, conn)
+        return {r["name"]: r["id"] for r in records}
+
+    async def get_nodes(self) -> List[dict]:
+        def work(conn):
+            return conn.execute("SELECT id, name, type FROM nodes").fetchall()
+
+        return await self._run(work)
+
+    async def get_node_names(self, node_ids: List[int]) -> Dict[int, str]:
+        def work(conn):
+            return conn.execute(
+                f"SELECT id, name FROM nodes WHERE id {_IN}", (json.dumps(node_ids),)
+            ).fetchall()
+
+        records = await self._run(work)
+        return {r["id"]: r["name"] for r in records}
+
+    async def get_node_ids(self, names: List[str]) -> Dict[str, int]:
+        def work(conn):
+            return conn.execute(
+                f"SELECT id, name FROM nodes WHERE name {_IN}", (json.dumps(names),)
+            ).fetchall()
+
+        records = await self._run(work)
+        return {r["name"]: r["id"] for r in records}
+
+    async def get_adjacency(self, node_ids: List[int], limit: int) -> List[dict]:
+        # SQLite has no LATERAL join; per-node index scans are cheap in-process.
+        def work(conn):
+            records = []
+            for node_id in node_ids:
+                for column in ("source_id", "target_id"):
+                    records += conn.execute(
+                        f"""
+                        SELECT ?1 AS node_id, source_id, target_id, relationship, weight
+                        FROM edges
+                        WHERE {column} = ?1 AND weight IS NOT NULL
+                        ORDER BY weight DESC LIMIT ?2
+                        """,
+                        (node_id, limit),
+                    ).fetchall()
+            return records
+
+        return await self._run(work)
+
+    async def get_entity_chunks(self, entity_ids: List[int], limit: int) -> List[dict]:
+        def work(conn):
+            return conn.execute(
+                f"""
+                SELECT c.id, c.text, m.mentions
+                FROM (
+                    SELECT chunk_id, COUNT(*) AS mentions
+                    FROM chunk_entities
+                    WHERE entity_id {_IN}
+                    GROUP BY chunk_id
+                    ORDER BY mentions DESC, chunk_id
+                    LIMIT ?2
+                ) m
+                JOIN chunks c ON c.id = m.chunk_id
+                ORDER BY m.mentions DESC, c.id
+                """,
+                (json.dumps(entity_ids), limit),
+            ).fetchall()
+
+        return await self._run(work)
+
+    async def get_graph_versions(self) -> Dict[str, int]:
+        return await self._run(_graph_versions)
+
+    async def link_chunk_entities(
+        self,
+        links: Iterable[Tuple[int, int]],
+        conn: Optional[sqlite3.Connection] = None,
+    ):
+        links = sorted(set(links))
+        if not links:
+            return
+
+        def work(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_entities (chunk_id, entity_id) VALUES (?, ?)",
+                links,
+            )
+
+        await self._run(work, conn)
+
+    async def link_chunk_relationships(
+        self,
+        links: Iterable[Tuple[int, int, int, str]],
+        conn: Optional[sqlite3.Connection] = None,
+    ):
+        links = sorted(set(links))
+        if not links:
+            return
+
+        def work(conn):
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO chunk_relationships (chunk_id, source_id, target_id, relationship)
+                VALUES (?, ?, ?, ?)
+                """,
+                links,
+            )
+
+        await self._run(work, conn)
+
+    async def get_document_entities(
+        self, doc_id: int, conn: Optional[sqlite3.Connection] = None
+    ) -> List[dict]:
+        def work(conn):
+            return conn.execute(
+                """
+                SELECT DISTINCT n.id, n.name
+                FROM nodes n
+                JOIN chunk_entities ce ON n.id = ce.entity_id
+                JOIN chunks c ON ce.chunk_id = c.id
+                WHERE c.document_id = ?
+                """,
+                (doc_id,),
+            ).fetchall()
+
+        return await self._run(work, conn)
+
+    async def get_shared_chunks(self, source_id: int, target_id: int) -> int:
+        def work(conn):
+            return conn.execute(
+                """
+                SELECT COUNT(DISTINCT ce1.chunk_id) AS shared
+                FROM chunk_entities ce1
+                JOIN chunk_entities ce2 ON ce1.chunk_id = ce2.chunk_id
+                WHERE ce1.entity_id = ? AND ce2.entity_id = ?
+                """,
+                (source_id, target_id),
+            ).fetchone()["shared"]
+
+        return await self._run(work)
+
+    async def add_edges(
+        self,
+        rows: List[Tuple[int, int, str, float]],
+        conn: Optional[sqlite3.Connection] = None,
+    ):
+        if not rows:
+            return
+
+        def work(conn):
+            conn.executemany(
+                "INSERT INTO edges (source_id, target_id, relationship, weight) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            _bump_version(conn, "edges")
+
+        await self._run(work, conn)
+
+    async def rebuild_edges(
+        self, entity_ids: List[int], conn: Optional[sqlite3.Connection] = None
+    ) -> int:
+        """Recompute edges among entity_ids from their chunk mentions.
+
+        Same semantics as the Postgres backend; writes are already serialised
+        by the connection lock.
+        """
+        if len(entity_ids) < 2:
+            return 0
+        ids = (json.dumps(entity_ids),)
+
+        def work(conn):
+            conn.execute(
+                f"""
+                DELETE FROM edges
+                WHERE source_id {_IN} AND target_id {_IN}
+                """,
+                ids,
+            )
+            related = conn.execute(
+                f"""
+                WITH pairs AS (
+                    SELECT ce1.entity_id AS a, ce2.entity_id AS b, COUNT(*) AS shared
+                    FROM chunk_entities ce1
+                    JOIN chunk_entities ce2
+                      ON ce1.chunk_id = ce2.chunk_id AND ce1.entity_id < ce2.entity_id
+                    WHERE ce1.entity_id {_IN}
+                      AND ce2.entity_id {_IN}
+                    GROUP BY ce1.entity_id, ce2.entity_id
+                )
+                INSERT INTO edges (source_id, target_id, relationship, weight)
+                SELECT a, b, 'related', shared / 2.0 FROM pairs
+                UNION ALL
+                SELECT b, a, 'related', shared / 2.0 FROM pairs
+                """,
+                ids,
+            ).rowcount
+            typed = conn.execute(
+                f"""
+                INSERT INTO edges (source_id, target_id, relationship, weight)
+                SELECT source_id, target_id, relationship, COUNT(*)
+                FROM chunk_relationships
+                WHERE source_id {_IN}
+                  AND target_id {_IN}
+                GROUP BY source_id, target_id, relationship
+                """,
+                ids,
+            ).rowcount
+            _bump_version(conn, "edges")
+            return related + typed
+
+        return await self._run(work, conn)
+
+    async def get_neighbours(self, node_ids: List[int]) -> List[int]:
+        def work(conn):
+            return conn.execute(
+                f"""
+                SELECT target_id AS id FROM edges WHERE source_id {_IN}
+                UNION
+                SELECT source_id FROM edges WHERE target_id {_IN}
+                """,
+                (json.dumps(node_ids),),
+            ).fetchall()
+
+        records = await self._run(work)
+        return [r["id"] for r in records]
+
+    async def load_graph(self) -> Tuple[List[dict], List[dict]]:
+        def work(conn):
+            nodes = conn.execute("SELECT id, name, type FROM nodes").fetchall()
+            edges = conn.execute(
+                "SELECT source_id, target_id, relationship, weight FROM edges WHERE weight IS NOT NULL"
+            ).fetchall()
+            return nodes, edges
+
+        return await self._run(work)
+
+    async def load_graph_store(self, node_ids: Optional[List[int]] = None) -> CSRGraph:
+        """The graph, or the subgraph on node_ids, as a compact CSRGraph."""
+        node_query = "SELECT id FROM nodes"
+        edge_query = (
+            "SELECT source_id, target_id, weight FROM edges WHERE weight IS NOT NULL"
+        )
+        args = ()
+        if node_ids is not None:
+            node_query += f" WHERE id {_IN}"
+            edge_query += f" AND source_id {_IN} AND target_id {_IN}"
+            args = (json.dumps(list(node_ids)),)
+
+        def work(conn):
+            # Plain tuples rather than dict rows keep the edge scan cheap.
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            nodes = cursor.execute(node_query, args).fetchall()
+            edges = cursor.execute(edge_query, args).fetchall()
+            edges = np.array(edges, dtype=np.float64).reshape(-1, 3)
+            return CSRGraph.from_edges(
+                [row[0] for row in nodes], edges[:, 0], edges[:, 1], edges[:, 2]
+            )
+
+        return await self._run(work)
+
+    async def load_subgraph(self, node_ids: List[int]) -> Tuple[List[dict], List[dict]]:
+        ids = (json.dumps(node_ids),)
+
+        def work(conn):
+            nodes = conn.execute(
+                f"SELECT id, name, type FROM nodes WHERE id {_IN} ORDER BY id", ids
+            ).fetchall()
+            edges = conn.execute(
+                f"""
+                SELECT source_id, target_id, relationship, weight FROM edges
+                WHERE weight IS NOT NULL
+                  AND source_id {_IN} AND target_id {_IN}
+                """,
+                ids,
+            ).fetchall()
+            return nodes, edges
+
+        return await self._run(work)
+
+    async def mark_nodes_dirty(
+        self, node_ids: List[int], conn: Optional[sqlite3.Connection] = None
+    ):
+        if not node_ids:
+            return
+
+        def work(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO dirty_nodes (node_id) VALUES (?)",
+                ((node_id,) for node_id in sorted(node_ids)),
+            )
+
+        await self._run(work, conn)
+
+    async def get_dirty_nodes(self) -> List[int]:
+        def work(conn):
+            return conn.execute("SELECT node_id FROM dirty_nodes").fetchall()
+
+        records = await self._run(work)
+        return [r["node_id"] for r in records]
+
+    async def clear_dirty_nodes(
+        self, node_ids: List[int], conn: Optional[sqlite3.Connection] = None
+    ):
+        def work(conn):
+            conn.execute(
+                f"DELETE FROM dirty_nodes WHERE node_id {_IN}", (json.dumps(node_ids),)
+            )
+
+        await self._run(work, conn)
+
+    async def get_communities(self) -> List[dict]:
+        def work(conn):
+            return conn.execute(
+                """
+                SELECT id, nodes, level, parent_id, membership_hash
+                FROM communities ORDER BY level, id
+                """
+            ).fetchall()
+
+        records = await self._run(work)
+        for record in records:
+            record["nodes"] = json.loads(record["nodes"])
+        return records
+
+    async def get_community_hashes(self, hashes: List[str]) -> Set[str]:
+        def work(conn):
+            return conn.execute(
+                f"SELECT membership_hash FROM communities WHERE membership_hash {_IN}",
+                (json.dumps(hashes),),
+            ).fetchall()
+
+        records = await self._run(work)
+        return {r["membership_hash"] for r in records}
+
+    async def get_community_summaries(self, community_ids: List[int]) -> Dict[int, str]:
+        def work(conn):
+            return conn.execute(
+                f"SELECT id, summary FROM communities WHERE id {_IN}",
+                (json.dumps(community_ids),),
+            ).fetchall()
+
+        records = await self._run(work)
+        return {r["id"]: r["summary"] for r in records}
+
+    async def upsert_communities(
+        self,
+        rows: List[CommunityRow],
+        replaced_ids: Optional[List[int]] = None,
+        conn: Optional[sqlite3.Connection] = None,
+    ) -> Tuple[int, int]:
+        """Write a run's communities keyed by membership hash.
+
+        Same contract as ``Database.upsert_communities``.
+        """
+
+        def work(conn):
+            conn.execute(
+                """
+                CREATE TEMP TABLE IF NOT EXISTS community_staging (
+                    membership_hash TEXT PRIMARY KEY,
+                    nodes TEXT,
+                    level INTEGER,
+                    parent_hash TEXT,
+                    summary TEXT,
+                    summary_embedding BLOB
+                )
+                """
+            )
+            conn.execute("DELETE FROM community_staging")
+            conn.executemany(
+                "INSERT INTO community_staging VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        membership_hash,
+                        json.dumps(nodes),
+                        level,
+                        parent_hash,
+                        summary,
+                        _to_blob(embedding),
+                    )
+                    for membership_hash, nodes, level, parent_hash, summary, embedding in rows
+                ),
+            )
+            # "WHERE true" lets SQLite parse ON CONFLICT after a SELECT.
+            inserted = conn.execute(
+                """
+                INSERT INTO communities (membership_hash, nodes, level, summary, summary_embedding)
+                SELECT membership_hash, nodes, level, summary, summary_embedding
+                FROM community_staging WHERE true
+                ORDER BY level
+                ON CONFLICT (membership_hash) DO UPDATE
+                SET summary = excluded.summary,
+                    summary_embedding = excluded.summary_embedding
+                WHERE excluded.summary IS NOT NULL
+                """
+            ).rowcount
+            conn.execute(
+                """
+                UPDATE communities SET parent_id = (
+                    SELECT p.id FROM community_staging s
+                    LEFT JOIN communities p ON p.membership_hash = s.parent_hash
+                    WHERE s.membership_hash = communities.membership_hash
+                )
+                WHERE membership_hash IN (SELECT membership_hash FROM community_staging)
+                """
+            )
+            deleted = conn.execute(
+                f"""
+                DELETE FROM communities
+                WHERE (?1 IS NULL OR id {_IN})
+                  AND NOT EXISTS (
+                      SELECT 1 FROM community_staging s
+                      WHERE s.membership_hash = communities.membership_hash
+                  )
+                """,
+                (None if replaced_ids is None else json.dumps(replaced_ids),),
+            ).rowcount
+            _bump_version(conn, "communities")
+            return inserted, deleted
+
+        return await self._run(work, conn)
+
+    async def search_communities(
+        self,
+        embedding: List[float],
+        limit: int = 3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[dict]:
+        """Communities nearest to embedding by cosine distance (exact scan).
+
+        ef_search and probes only apply to Postgres ANN indexes.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+
+        def work(conn):
+            ids, matrix = self._load_community_matrix(conn)
+            if not ids:
+                return []
+            similarity = (matrix @ query) / max(
+                float(np.linalg.norm(query)), np.finfo(np.float32).tiny
+            )
+            order = np.argsort(-similarity, kind="stable")[:limit]
+            nearest = [ids[i] for i in order]
+            summaries = {
+                r["id"]: r["summary"]
+                for r in conn.execute(
+                    f"SELECT id, summary FROM communities WHERE id {_IN}",
+                    (json.dumps(nearest),),
+                ).fetchall()
+            }
+            return [
+                {
+                    "id": ids[i],
+                    "summary": summaries[ids[i]],
+                    "distance": 1.0 - float(similarity[i]),
+                }
+                for i in order
+            ]
+
+        return await self._run(work)
+
+    def _load_community_matrix(
+        self, conn: sqlite3.Connection
+    ) -> Tuple[List[int], np.ndarray]:
+        """Ids and unit rows of every community embedding.
+
+        Decoded once and reloaded only when the 'communities' version moves.
+        Runs on the storage thread, like every other use of the connection.
+        """
+        version = _graph_versions(conn)["communities"]
+        if self._community_matrix is None or self._community_matrix[0] != version:
+            records = conn.execute(
+                """
+                SELECT id, summary_embedding FROM communities
+                WHERE summary_embedding IS NOT NULL
+                """
+            ).fetchall()
+            ids = [r["id"] for r in records]
+            matrix = np.frombuffer(
+                b"".join(r["summary_embedding"] for r in records), dtype=np.float32
+            ).reshape(len(records), -1)
+            matrix = matrix / np.maximum(
+                np.linalg.norm(matrix, axis=1, keepdims=True),
+                np.finfo(np.float32).tiny,
+            )
+            self._community_matrix = (version, ids, matrix)
+        return self._community_matrix[1], self._community_matrix[2]
+
+    async def get_embedding_ids(self, table: str) -> List[int]:
+        column = EMBEDDING_COLUMNS[table]
+
+        def work(conn):
+            return conn.execute(
+                f"SELECT id FROM {table} WHERE {column} IS NOT NULL"
+            ).fetchall()
+
+        records = await self._run(work)
+        return [r["id"] for r in records]
+
+    async def get_embeddings(self, table: str, ids: List[int]) -> List[dict]:
+        column = EMBEDDING_COLUMNS[table]
+
+        def work(conn):
+            return conn.execute(
+                f"""
+                SELECT id, {column} AS embedding FROM {table}
+                WHERE id {_IN} AND {column} IS NOT NULL
+                """,
+                (json.dumps(ids),),
+            ).fetchall()
+
+        records = await self._run(work)
+        for record in records:
+            record["embedding"] = _from_blob(record["embedding"])
+        return records
+
+
+def _graph_versions(conn: sqlite3.Connection) -> Dict[str, int]:
+    records = conn.execute("SELECT name, version FROM graph_versions").fetchall()
+    return {r["name"]: r["version"] for r in records}
+
+
+def _bump_version(conn: sqlite3.Connection, name: str):
+    conn.execute(
+        "UPDATE graph_versions SET version = version + 1 WHERE name = ?", (name,)
+    )
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _next_id(conn: sqlite3.Connection, table: str) -> int:
+    """The id AUTOINCREMENT would assign next."""
+    row = conn.execute(
+        f"""
+        SELECT MAX(
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+            COALESCE((SELECT MAX(id) FROM {table}), 0)
+        ) + 1 AS next_id
+        """,
+        (table,),
+    ).fetchone()
+    return row["next_id"]
+
+
+def _to_blob(embedding) -> Optional[bytes]:
+    if embedding is None:
+        return None
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _from_blob(data: Optional[bytes]) -> Optional[array.array]:
+    """Decode a float32 blob the way the pgvector codec does."""
+    if data is None:
+        return None
+    value = array.array("f")
+    value.frombytes(data)
+    return value
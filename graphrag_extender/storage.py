@@ -0,0 +1,200 @@
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from graphrag_extender.graph_store import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+# Rows come back as asyncpg records or dicts; both support row["column"].
+Row = Mapping[str, Any]
+
+# (membership_hash, nodes, level, parent_hash, summary, summary_embedding)
+CommunityRow = Tuple[str, List[int], int, Optional[str], Optional[str], Optional[list]]
+
+
+class Storage(ABC):
+    """Persistence for documents, chunks, the entity graph and communities.
+
+    Methods that take ``conn`` join the transaction opened by
+    ``transaction()`` when given its handle, and otherwise run on their own.
+    """
+
+    @abstractmethod
+    async def initialize(self): ...
+
+    @abstractmethod
+    async def close(self): ...
+
+    @abstractmethod
+    @asynccontextmanager
+    async def transaction(self):
+        """Yield a connection handle whose work commits or rolls back as one."""
+        yield
+
+    # Documents
+
+    @abstractmethod
+    async def get_document(self, path: str) -> Optional[Row]: ...
+
+    @abstractmethod
+    async def upsert_document(
+        self, path: str, content_hash: str, size: int, mtime: float
+    ) -> int: ...
+
+    @abstractmethod
+    async def touch_document(self, doc_id: int, size: int, mtime: float): ...
+
+    @abstractmethod
+    async def clear_document_chunks(self, doc_id: int, conn=None) -> List[int]: ...
+
+    @abstractmethod
+    async def get_unprocessed_documents(self) -> List[Row]: ...
+
+    @abstractmethod
+    async def mark_document_processed(self, doc_id: int, conn=None): ...
+
+    # Chunks and nodes
+
+    @abstractmethod
+    async def add_chunks(
+        self, rows: List[Tuple[str, List[float], int]], conn=None
+    ) -> List[int]: ...
+
+    @abstractmethod
+    async def add_nodes(
+        self, entities: Iterable[Tuple[str, str]], conn=None
+    ) -> Dict[str, int]: ...
+
+    @abstractmethod
+    async def get_nodes(self) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_node_names(self, node_ids: List[int]) -> Dict[int, str]: ...
+
+    @abstractmethod
+    async def get_node_ids(self, names: List[str]) -> Dict[str, int]: ...
+
+    # Links and edges
+
+    @abstractmethod
+    async def link_chunk_entities(
+        self, links: Iterable[Tuple[int, int]], conn=None
+    ): ...
+
+    @abstractmethod
+    async def link_chunk_relationships(
+        self, links: Iterable[Tuple[int, int, int, str]], conn=None
+    ): ...
+
+    @abstractmethod
+    async def get_document_entities(self, doc_id: int, conn=None) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_shared_chunks(self, source_id: int, target_id: int) -> int: ...
+
+    @abstractmethod
+    async def add_edges(self, rows: List[Tuple[int, int, str, float]], conn=None): ...
+
+    @abstractmethod
+    async def rebuild_edges(self, entity_ids: List[int], conn=None) -> int: ...
+
+    @abstractmethod
+    async def get_neighbours(self, node_ids: List[int]) -> List[int]: ...
+
+    @abstractmethod
+    async def get_adjacency(self, node_ids: List[int], limit: int) -> List[Row]:
+        """(node_id, source_id, target_id, relationship, weight) rows holding
+        up to limit heaviest edges leaving, and as many entering, each node."""
+
+    @abstractmethod
+    async def get_entity_chunks(self, entity_ids: List[int], limit: int) -> List[Row]:
+        """(id, text, mentions) of the chunks mentioning the most of
+        entity_ids, most mentions first."""
+
+    @abstractmethod
+    async def get_graph_versions(self) -> Dict[str, int]:
+        """Counters advanced by every write to 'edges' and 'communities'."""
+
+    # Graph loading
+
+    @abstractmethod
+    async def load_graph(self) -> Tuple[List[Row], List[Row]]: ...
+
+    @abstractmethod
+    async def load_graph_store(
+        self, node_ids: Optional[List[int]] = None
+    ) -> CSRGraph: ...
+
+    @abstractmethod
+    async def load_subgraph(
+        self, node_ids: List[int]
+    ) -> Tuple[List[Row], List[Row]]: ...
+
+    # Community maintenance
+
+    @abstractmethod
+    async def mark_nodes_dirty(self, node_ids: List[int], conn=None): ...
+
+    @abstractmethod
+    async def get_dirty_nodes(self) -> List[int]: ...
+
+    @abstractmethod
+    async def clear_dirty_nodes(self, node_ids: List[int], conn=None): ...
+
+    @abstractmethod
+    async def get_communities(self) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_community_hashes(self, hashes: List[str]) -> Set[str]: ...
+
+    @abstractmethod
+    async def get_community_summaries(
+        self, community_ids: List[int]
+    ) -> Dict[int, str]: ...
+
+    @abstractmethod
+    async def upsert_communities(
+        self,
+        rows: List[CommunityRow],
+        replaced_ids: Optional[List[int]] = None,
+        conn=None,
+    ) -> Tuple[int, int]: ...
+
+    # Vector search
+
+    @abstractmethod
+    async def search_communities(
+        self,
+        embedding: List[float],
+        limit: int = 3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Row]: ...
+
+    @abstractmethod
+    async def get_embedding_ids(self, table: str) -> List[int]: ...
+
+    @abstractmethod
+    async def get_embeddings(self, table: str, ids: List[int]) -> List[Row]: ...
+
+
+def create_storage(config: dict) -> Storage:
+    """Build the storage backend selected by ``storage.backend``.
+
+    ``postgres`` (the default) connects to ``db.conn_string``; ``sqlite``
+    keeps everything in the single file at ``storage.path``, or in memory
+    when the path is ``:memory:``.
+    """
+    settings = config.get("storage", {})
+    backend = settings.get("backend", "postgres")
+    if backend == "postgres":
+        from graphrag_extender.db import Database
+
+        return Database(config["db"]["conn_string"])
+    if backend == "sqlite":
+        from graphrag_extender.sqlite_storage import SQLiteStorage
+
+        return SQLiteStorage(settings.get("path", "data/graphrag.sqlite"))
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,345 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Embedding column of each table that can be mirrored locally.
+EMBEDDING_COLUMNS = {"chunks": "embedding", "communities": "summary_embedding"}
+
+_DELETED = -1
+
+
+class VectorIndex:
+    """Cosine similarity index over float32 vectors in memory-mapped files.
+
+    A directory holds ``vectors.f32`` (one unit-normalised row per vector),
+    ``ids.i64`` (the row's external id, -1 once deleted), ``lists.i32`` (the
+    row's IVF list) and ``meta.json``. Files grow by doubling, deletes leave
+    tombstones that ``compact`` squeezes out, and only ``meta.json`` is
+    rewritten (atomically) to commit a change.
+
+    Below ``ivf_threshold`` live vectors every search is an exact, blocked
+    matrix product. Above it, ``train`` clusters the vectors with spherical
+    k-means and reorders the rows by cluster, so searches read the
+    ``nprobe`` nearest clusters as contiguous slices. Rows appended after
+    training sit in an unsorted tail that is filtered by cluster instead.
+
+    The index is a cache of Postgres: if it is lost or damaged, delete the
+    directory and ``sync_index`` rebuilds it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        ivf_threshold: int = 50_000,
+        nprobe: int = 8,
+        block_rows: int = 65_536,
+    ):
+        self.path = path
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.block_rows = block_rows
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta()
+        if meta and meta["dim"] != dim:
+            raise ValueError(f"Index {path} has dimension {meta['dim']}, not {dim}")
+        self.dim = dim
+        self.count = meta.get("count", 0)
+        # Rows [0, trained_rows) are sorted by IVF list.
+        self.trained_rows = meta.get("trained_rows", 0)
+        self._open(max(meta.get("capacity", 0), 1024))
+        centroids = os.path.join(path, "centroids.npy")
+        self.centroids = np.load(centroids) if meta.get("trained") else None
+        self._rows: Dict[int, int] = {
+            int(node_id): row
+            for row, node_id in enumerate(self.ids[: self.count].tolist())
+            if node_id != _DELETED
+        }
+        self._offsets: Optional[np.ndarray] = None
+        logger.info(f"Opened vector index {path} ({len(self)} vectors)")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, vector_id: int) -> bool:
+        return vector_id in self._rows
+
+    def id_set(self) -> set:
+        return set(self._rows)
+
+    def add(self, ids: Sequence[int], vectors) -> int:
+        """Append or replace vectors; returns the number written."""
+        vectors = _normalise(
+            np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        )
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors differ in length")
+        with self._lock:
+            self._delete(ids.tolist())
+            start = self.count
+            self._reserve(start + len(ids))
+            self.vectors[start : start + len(ids)] = vectors
+            self.ids[start : start + len(ids)] = ids
+            if self.centroids is not None:
+                self.lists[start : start + len(ids)] = self._assign(vectors)
+            for offset, vector_id in enumerate(ids.tolist()):
+                self._rows[vector_id] = start + offset
+            self.count += len(ids)
+            self._commit()
+        return len(ids)
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """Tombstone vectors by id; returns how many were present."""
+        with self._lock:
+            deleted = self._delete(ids)
+            if deleted:
+                self._commit()
+            if self.count and self.count - len(self) > self.count // 4:
+                self.compact()
+        return deleted
+
+    def compact(self):
+        """Move live rows to the front so tombstones stop costing scan time."""
+        with self._lock:
+            live = np.flatnonzero(self.ids[: self.count] != _DELETED)
+            self._move(live)
+            # Removing rows keeps the trained prefix sorted by list.
+            self.trained_rows = int(np.searchsorted(live, self.trained_rows))
+            self._commit()
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """Cluster the live vectors into IVF lists with spherical k-means.
+
+        Also compacts the index, since every live row is rewritten in list
+        order.
+        """
+        with self._lock:
+            live = np.flatnonzero(self.ids[: self.count] != _DELETED)
+            nlist = min(nlist or max(int(np.sqrt(len(live))), 1), len(live))
+            if nlist < 1:
+                return
+            rng = np.random.default_rng(seed)
+            sample = self.vectors[
+                rng.choice(live, min(len(live), 256 * nlist), replace=False)
+            ]
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = ~sums.any(axis=1)
+                sums[empty] = centroids[empty]
+                centroids = _normalise(sums)
+            self.centroids = centroids
+            labels = np.concatenate(
+                [
+                    self._assign(self.vectors[live[start : start + self.block_rows]])
+                    for start in range(0, len(live), self.block_rows)
+                ]
+            )
+            order = np.argsort(labels, kind="stable")
+            self.lists[live] = labels
+            self._move(live[order])
+            self.trained_rows = self.count
+            np.save(os.path.join(self.path, "centroids.npy"), centroids)
+            self._commit()
+        logger.info(f"Trained vector index {self.path} with {nlist} lists")
+
+    def search(
+        self, query, k: int = 10, nprobe: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """The k most similar (id, cosine similarity) pairs, best first."""
+        return self.search_batch(
+            np.asarray(query, dtype=np.float32)[None, :], k, nprobe
+        )[0]
+
+    def search_batch(
+        self, queries, k: int = 10, nprobe: Optional[int] = None
+    ) -> List[List[Tuple[int, float]]]:
+        queries = _normalise(
+            np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        )
+        with self._lock:
+            if self.centroids is not None and len(self) >= self.ivf_threshold:
+                return [self._search_ivf(q, k, nprobe or self.nprobe) for q in queries]
+            return self._search_exact(queries, k)
+
+    def flush(self):
+        with self._lock:
+            for mapped in self._maps:
+                mapped.flush()
+
+    def _search_exact(
+        self, queries: np.ndarray, k: int
+    ) -> List[List[Tuple[int, float]]]:
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.count, self.block_rows):
+            end = min(start + self.block_rows, self.count)
+            scores = queries @ self.vectors[start:end].T
+            scores[:, self.ids[start:end] == _DELETED] = -np.inf
+            rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        return [
+            self._results(rows, scores, k)
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    def _search_ivf(
+        self, query: np.ndarray, k: int, nprobe: int
+    ) -> List[Tuple[int, float]]:
+        if self._offsets is None:
+            self._offsets = np.searchsorted(
+                self.lists[: self.trained_rows], np.arange(len(self.centroids) + 1)
+            )
+        probes = _top(self.centroids @ query, nprobe)
+        bounds = list(zip(self._offsets[probes], self._offsets[probes + 1]))
+        rows = [np.arange(start, end) for start, end in bounds]
+        scores = [self.vectors[start:end] @ query for start, end in bounds]
+        if self.count > self.trained_rows:
+            tail = self.trained_rows + np.flatnonzero(
+                np.isin(self.lists[self.trained_rows : self.count], probes)
+            )
+            rows.append(tail)
+            scores.append(self.vectors[tail] @ query)
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        scores[self.ids[rows] == _DELETED] = -np.inf
+        return self._results(rows, scores, k)
+
+    def _results(
+        self, rows: np.ndarray, scores: np.ndarray, k: int
+    ) -> List[Tuple[int, float]]:
+        finite = np.isfinite(scores)
+        rows, scores = rows[finite], scores[finite]
+        top = _top(scores, k)
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top]
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _move(self, rows: np.ndarray):
+        """Rewrite the given rows, in order, as the first rows of the index."""
+        self.vectors[: len(rows)] = self.vectors[rows]
+        self.ids[: len(rows)] = self.ids[rows]
+        self.lists[: len(rows)] = self.lists[rows]
+        self.count = len(rows)
+        self._rows = {
+            vector_id: row
+            for row, vector_id in enumerate(self.ids[: self.count].tolist())
+        }
+
+    def _delete(self, ids: Iterable[int]) -> int:
+        deleted = 0
+        for vector_id in ids:
+            row = self._rows.pop(int(vector_id), None)
+            if row is not None:
+                self.ids[row] = _DELETED
+                deleted += 1
+        return deleted
+
+    def _reserve(self, rows: int):
+        if rows > self.capacity:
+            self.flush()
+            self._open(max(rows, 2 * self.capacity))
+
+    def _open(self, capacity: int):
+        """Map the data files at capacity rows, growing them if needed."""
+        self.capacity = capacity
+        self._maps = [
+            self._map("vectors.f32", np.float32, (capacity, self.dim)),
+            self._map("ids.i64", np.int64, (capacity,)),
+            self._map("lists.i32", np.int32, (capacity,)),
+        ]
+        # Plain ndarray views of the same memory skip np.memmap's per-slice
+        # overhead, which dominates small IVF list scans.
+        self.vectors, self.ids, self.lists = (np.asarray(m) for m in self._maps)
+
+    def _map(self, name: str, dtype, shape: tuple) -> np.memmap:
+        filename = os.path.join(self.path, name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(filename, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(filename, dtype=dtype, mode="r+", shape=shape)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(os.path.join(self.path, "meta.json"), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _commit(self):
+        """Flush the data files, then publish the new row count."""
+        self._offsets = None
+        self.flush()
+        filename = os.path.join(self.path, "meta.json")
+        with open(filename + ".tmp", "w") as f:
+            json.dump(
+                {
+                    "dim": self.dim,
+                    "count": self.count,
+                    "capacity": self.capacity,
+                    "trained": self.centroids is not None,
+                    "trained_rows": self.trained_rows,
+                },
+                f,
+            )
+        os.replace(filename + ".tmp", filename)
+
+
+async def sync_index(
+    index: VectorIndex, db, table: str, batch_size: int = 10_000
+) -> Tuple[int, int]:
+    """Mirror the embeddings of a Postgres table into index.
+
+    Postgres stays the source of truth: ids missing from the table are
+    deleted and ids missing from the index are fetched in batches. Rows are
+    assumed immutable once embedded, which holds for chunks (re-indexing
+    replaces them) and communities (changed memberships get new rows).
+    Returns (added, deleted).
+    """
+    remote = set(await db.get_embedding_ids(table))
+    local = index.id_set()
+    deleted = index.delete(local - remote)
+    missing = sorted(remote - local)
+    added = 0
+    for start in range(0, len(missing), batch_size):
+        rows = await db.get_embeddings(table, missing[start : start + batch_size])
+        if rows:
+            added += index.add(
+                [r["id"] for r in rows],
+                np.stack([np.asarray(r["embedding"], dtype=np.float32) for r in rows]),
+            )
+    if len(index) >= index.ivf_threshold and len(index) > 2 * index.trained_rows:
+        index.train()
+    if added or deleted:
+        logger.info(f"Synced {table} index: {added} added, {deleted} deleted")
+    return added, deleted
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, largest first."""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
@@ -1,15 +1,45 @@
+-- Current schema for creating a fresh database (e.g. the docker init script).
+-- Existing databases are upgraded by graphrag_extender/migrations instead;
+-- nothing here drops data.
+
 CREATE EXTENSION IF NOT EXISTS vector;
 
-DROP TABLE IF EXISTS communities, chunk_entities, edges, nodes, chunks, documents CASCADE;
+CREATE TABLE IF NOT EXISTS documents ( id SERIAL PRIMARY KEY, path TEXT NOT NULL UNIQUE, content_hash TEXT, size BIGINT, mtime DOUBLE PRECISION, processed BOOLEAN DEFAULT FALSE );
+
+CREATE TABLE IF NOT EXISTS chunks ( id SERIAL PRIMARY KEY, text TEXT NOT NULL, embedding VECTOR(1536), document_id INTEGER REFERENCES documents(id) );
+
+CREATE TABLE IF NOT EXISTS nodes ( id SERIAL PRIMARY KEY, name TEXT NOT NULL UNIQUE, type TEXT );
+
+CREATE TABLE IF NOT EXISTS edges ( id SERIAL PRIMARY KEY, source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT, weight FLOAT );
+
+CREATE TABLE IF NOT EXISTS chunk_entities ( chunk_id INTEGER REFERENCES chunks(id), entity_id INTEGER REFERENCES nodes(id), PRIMARY KEY (chunk_id, entity_id) );
+
+CREATE TABLE IF NOT EXISTS chunk_relationships ( chunk_id INTEGER REFERENCES chunks(id), source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT NOT NULL, PRIMARY KEY (chunk_id, source_id, target_id, relationship) );
+
+CREATE TABLE IF NOT EXISTS communities ( id SERIAL PRIMARY KEY, nodes INTEGER[], summary TEXT, summary_embedding VECTOR(1536), level INTEGER NOT NULL DEFAULT 0, parent_id INTEGER REFERENCES communities(id), membership_hash TEXT UNIQUE );
+
+CREATE TABLE IF NOT EXISTS dirty_nodes ( node_id INTEGER PRIMARY KEY REFERENCES nodes(id) );
+
+CREATE TABLE IF NOT EXISTS graph_versions ( name TEXT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0 );
+
+INSERT INTO graph_versions (name) VALUES ('edges'), ('communities') ON CONFLICT DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS chunks_embedding_hnsw ON chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS communities_summary_embedding_hnsw ON communities USING hnsw (summary_embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS edges_source_id_idx ON edges (source_id);
+
+CREATE INDEX IF NOT EXISTS edges_target_id_idx ON edges (target_id);
 
-CREATE TABLE documents ( id SERIAL PRIMARY KEY, path TEXT NOT NULL, processed BOOLEAN DEFAULT FALSE );
+CREATE INDEX IF NOT EXISTS edges_source_id_weight_idx ON edges (source_id, weight DESC NULLS LAST);
 
-CREATE TABLE chunks ( id SERIAL PRIMARY KEY, text TEXT NOT NULL, embedding VECTOR(1536), document_id INTEGER REFERENCES documents(id) );
+CREATE INDEX IF NOT EXISTS edges_target_id_weight_idx ON edges (target_id, weight DESC NULLS LAST);
 
-CREATE TABLE nodes ( id SERIAL PRIMARY KEY, name TEXT NOT NULL UNIQUE, type TEXT );
+CREATE INDEX IF NOT EXISTS chunk_entities_entity_id_idx ON chunk_entities (entity_id);
 
-CREATE TABLE edges ( id SERIAL PRIMARY KEY, source_id INTEGER REFERENCES nodes(id), target_id INTEGER REFERENCES nodes(id), relationship TEXT, weight FLOAT );
+CREATE INDEX IF NOT EXISTS chunk_relationships_source_id_idx ON chunk_relationships (source_id);
 
-CREATE TABLE chunk_entities ( chunk_id INTEGER REFERENCES chunks(id), entity_id INTEGER REFERENCES nodes(id), PRIMARY KEY (chunk_id, entity_id) );
+CREATE INDEX IF NOT EXISTS chunks_document_id_idx ON chunks (document_id);
 
-CREATE TABLE communities ( id SERIAL PRIMARY KEY, nodes INTEGER[], summary TEXT, summary_embedding VECTOR(1536) );
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS communities_parent_id_idx ON communities (parent_id);
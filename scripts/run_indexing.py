@@ -15,6 +15,7 @@ logger = logging.getLogger(__name__)
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from graphrag_extender.extender import GraphExtender
+from graphrag_extender.migrations import migrate
 from src.utils import load_config
 
 
@@ -36,10 +37,13 @@ async def validate_schema(conn_string: str):
                 "chunk_entities",
                 "communities",
                 "documents",
+                "chunk_relationships",
+                "dirty_nodes",
+                "graph_versions",
             }
             if not required.issubset(table_names):
                 missing = required - table_names
-                logger.error(f"Missing database tables: {missing}. Run schema.sql.")
+                logger.error(f"Missing database tables: {missing}. Run migrations.")
                 raise ValueError(f"Missing database tables: {missing}")
             ext = await conn.fetchval(
                 "SELECT extname FROM pg_extension WHERE extname = 'vector'"
@@ -58,22 +62,6 @@ async def validate_schema(conn_string: str):
             await pool.close()
 
 
-async def clear_communities(conn_string: str):
-    """Clear the communities table to avoid duplicate key errors."""
-    pool = None
-    try:
-        pool = await asyncpg.create_pool(conn_string)
-        async with pool.acquire() as conn:
-            await conn.execute("TRUNCATE communities RESTART IDENTITY")
-            logger.info("Cleared communities table")
-    except Exception as e:
-        logger.error(f"Failed to clear communities table: {str(e)}")
-        raise
-    finally:
-        if pool:
-            await pool.close()
-
-
 async def main() -> None:
     try:
         logger.info("Loading configuration")
@@ -104,11 +92,12 @@ async def main() -> None:
                 )
                 logger.info(f"Using fallback IP: {container_ip}")
 
-        logger.info("Validating database schema")
-        await validate_schema(conn_string)
+        if config.get("storage", {}).get("backend", "postgres") == "postgres":
+            logger.info("Applying database migrations")
+            await migrate(conn_string)
 
-        logger.info("Clearing communities table")
-        await clear_communities(conn_string)
+            logger.info("Validating database schema")
+            await validate_schema(conn_string)
 
         input_dir = config["paths"]["input_dir"]
         if not os.path.exists(input_dir):
@@ -117,8 +106,11 @@ async def main() -> None:
         logger.info(f"Input directory: {input_dir}")
 
         extender = GraphExtender(config)
-        await extender.initialize()
-        await extender.extend_graph(input_dir)
+        try:
+            await extender.initialize()
+            await extender.extend_graph(input_dir)
+        finally:
+            await extender.close()
         logger.info("Graph update complete")
 
     except Exception as e:
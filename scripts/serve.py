@@ -0,0 +1,60 @@
+import logging
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.embeddings import Embeddings
+from graphrag_extender.storage import create_storage
+from src.llm_client import LLMClient
+from src.query_engine import QueryEngine
+from src.query_service import SERVICE, QueryService, create_app
+from src.utils import load_config
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def query_resources(config: dict):
+    """cleanup_ctx that opens the pools once at startup and closes them last."""
+
+    async def resources(app: web.Application):
+        db = create_storage(config)
+        llm_client = LLMClient.from_config(config)
+        embeddings = Embeddings(config)
+        await db.initialize()
+        try:
+            engine = QueryEngine(db, llm_client, embeddings, config)
+            await engine.sync_indexes()
+            app[SERVICE] = QueryService(engine, config)
+            logger.info("Query service ready")
+            yield
+        finally:
+            await llm_client.close()
+            embeddings.close()
+            await db.close()
+
+    return resources
+
+
+def main():
+    config = load_config("configs/settings.yaml")
+    settings = config.get("service", {})
+    app = create_app()
+    app.cleanup_ctx.append(query_resources(config))
+    # On SIGINT/SIGTERM the server stops accepting connections, lets
+    # in-flight queries finish for up to shutdown_timeout seconds and then
+    # runs the cleanup above.
+    web.run_app(
+        app,
+        host=settings.get("host", "0.0.0.0"),
+        port=settings.get("port", 8080),
+        shutdown_timeout=settings.get("shutdown_timeout", 30.0),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.graph_version import GraphVersion
+
+logger = logging.getLogger(__name__)
+
+# (query type, entity or None)
+Scope = Tuple[str, Optional[str]]
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case, punctuation and spacing folded, so trivial rewordings match."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", question.casefold())).strip()
+
+
+@dataclass
+class _Entry:
+    answer: str
+    # Unit-length question embedding, or None for exact-match only.
+    embedding: Optional[np.ndarray]
+    expires: float
+
+
+class AnswerCache:
+    """Semantic response cache for QueryEngine answers.
+
+    Lookups try the normalised question text first and then the nearest
+    cached question embedding in the same scope, accepting it at cosine
+    similarity ``similarity_threshold`` or above. Entries expire after
+    ``ttl`` seconds, the least recently used are evicted beyond
+    ``max_entries``, and everything is dropped when the graph or community
+    version changes.
+    """
+
+    def __init__(self, db, config: Optional[dict] = None):
+        settings = (config or {}).get("answer_cache", {})
+        self.enabled = settings.get("enabled", True)
+        self.max_entries = settings.get("max_entries", 10_000)
+        self.ttl = settings.get("ttl", 3600.0)
+        self.similarity_threshold = settings.get("similarity_threshold", 0.95)
+        self.graph_version = GraphVersion(
+            db, ["edges", "communities"], settings.get("version_ttl", 1.0)
+        )
+        self.version: Optional[tuple] = None
+        self._entries: "OrderedDict[Tuple[Scope, str], _Entry]" = OrderedDict()
+        # Scope -> (keys, stacked unit embeddings), rebuilt when the scope changes.
+        self._matrices: Dict[Scope, Tuple[list, np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, scope: Scope, question: str) -> Optional[str]:
+        """Answer cached for exactly this (normalised) question, if any."""
+        if not self.enabled:
+            return None
+        await self._check_version()
+        entry = self._lookup((scope, normalize_question(question)))
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry.answer
+
+    async def get_similar(
+        self, scope: Scope, embedding: Sequence[float]
+    ) -> Optional[str]:
+        """Answer of the most similar cached question, if similar enough."""
+        if not self.enabled:
+            return None
+        await self._check_version()
+        keys, matrix = self._matrix(scope)
+        if not keys:
+            self.misses += 1
+            return None
+        similarity = matrix @ _unit(embedding)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.similarity_threshold:
+            self.misses += 1
+            return None
+        entry = self._lookup(keys[best])
+        if entry is None:
+            self.misses += 1
+            return None
+        logger.debug(f"Answer cache hit at similarity {similarity[best]:.3f}")
+        self.hits += 1
+        return entry.answer
+
+    async def put(
+        self,
+        scope: Scope,
+        question: str,
+        answer: str,
+        embedding: Optional[Sequence[float]] = None,
+    ):
+        if not self.enabled:
+            return
+        await self._check_version()
+        key = (scope, normalize_question(question))
+        self._entries[key] = _Entry(
+            answer,
+            None if embedding is None else _unit(embedding),
+            time.monotonic() + self.ttl,
+        )
+        self._entries.move_to_end(key)
+        self._matrices.pop(scope, None)
+        while len(self._entries) > self.max_entries:
+            (evicted_scope, _), _ = self._entries.popitem(last=False)
+            self._matrices.pop(evicted_scope, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._matrices.clear()
+
+    def _lookup(self, key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            del self._entries[key]
+            self._matrices.pop(key[0], None)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _matrix(self, scope: Scope) -> Tuple[list, np.ndarray]:
+        cached = self._matrices.get(scope)
+        if cached is None:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if key[0] == scope and entry.embedding is not None
+            ]
+            matrix = (
+                np.stack([self._entries[key].embedding for key in keys])
+                if keys
+                else np.zeros((0, 0), dtype=np.float32)
+            )
+            cached = self._matrices[scope] = (keys, matrix)
+        return cached
+
+    async def _check_version(self):
+        version = await self.graph_version.current()
+        if version != self.version:
+            if self._entries:
+                logger.info(
+                    f"Graph version {self.version} -> {version}, clearing {len(self._entries)} cached answers"
+                )
+            self.clear()
+            self.version = version
+
+
+def _unit(embedding: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), np.finfo(np.float32).tiny)
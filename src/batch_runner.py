@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Set
+
+import numpy as np
+
+from src.llm_client import track_usage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchReport:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    total_tokens: int = 0
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def throughput(self) -> float:
+        """Queries completed per second."""
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Latency percentile in seconds over this run's queries."""
+        return float(np.percentile(self.latencies, q)) if self.latencies else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.completed} queries ({self.failed} failed, {self.skipped} already done) "
+            f"in {self.elapsed:.1f}s: {self.throughput:.2f} q/s, "
+            f"p50 {self.percentile(50) * 1000:.0f}ms, "
+            f"p95 {self.percentile(95) * 1000:.0f}ms, "
+            f"p99 {self.percentile(99) * 1000:.0f}ms, "
+            f"{self.total_tokens} LLM tokens"
+        )
+
+
+class BatchRunner:
+    """Answers the questions of a JSONL file through a bounded worker pool.
+
+    Input lines hold ``question`` plus optional ``id`` (default: line number),
+    ``entity`` and ``type`` (``local`` when an entity is given, else
+    ``global``). Results are appended to the output JSONL as they complete,
+    and ids already answered there are skipped, so an interrupted run
+    resumes where it stopped.
+    """
+
+    def __init__(self, engine, config: Optional[dict] = None):
+        self.engine = engine
+        settings = (config or {}).get("batch", {})
+        self.concurrency = settings.get("concurrency", 16)
+
+    async def run(self, input_path: str, output_path: str) -> BatchReport:
+        report = BatchReport()
+        done = completed_ids(output_path)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.perf_counter()
+
+        with open(output_path, "a", encoding="utf-8") as output:
+            if output.tell() and not _ends_with_newline(output_path):
+                # Finish a line cut short by an interrupted run.
+                output.write("\n")
+
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    record = await self._answer(item)
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    if "error" in record:
+                        report.failed += 1
+                    else:
+                        report.completed += 1
+                        report.latencies.append(record["latency_ms"] / 1000)
+                        report.total_tokens += record["total_tokens"]
+
+            async def produce():
+                for item in read_questions(input_path):
+                    if item["id"] in done:
+                        report.skipped += 1
+                        continue
+                    await queue.put(item)
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+            # The bounded queue keeps the input streaming rather than loaded.
+            tasks = [asyncio.create_task(produce())] + [
+                asyncio.create_task(worker()) for _ in range(self.concurrency)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+        report.elapsed = time.perf_counter() - started
+        logger.info(f"Batch finished: {report.summary()}")
+        return report
+
+    async def _answer(self, item: dict) -> dict:
+        record = {k: item[k] for k in ("id", "type", "question", "entity") if k in item}
+        started = time.perf_counter()
+        with track_usage() as usage:
+            try:
+                # The answer_* variants raise, so failures are recorded as
+                # errors and retried on resume instead of saved as answers.
+                if item["type"] == "local":
+                    answer = await self.engine.answer_local(
+                        item["question"], item["entity"]
+                    )
+                else:
+                    answer = await self.engine.answer_global(item["question"])
+            except Exception as e:
+                logger.error(f"Batch query {item['id']} failed: {str(e)}")
+                record["error"] = str(e)
+                return record
+        record.update(
+            answer=answer,
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            total_tokens=usage.total_tokens,
+            llm_calls=usage.calls,
+        )
+        return record
+
+
+def read_questions(path: str) -> Iterator[dict]:
+    """Stream question records from a JSONL file, skipping malformed lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed line {number} of {path}")
+                continue
+            if not isinstance(item, dict) or not item.get("question"):
+                logger.warning(f"Skipping line {number} of {path}: no question")
+                continue
+            item.setdefault("id", number)
+            item.setdefault("type", "local" if item.get("entity") else "global")
+            if item["type"] == "local" and not item.get("entity"):
+                logger.warning(
+                    f"Skipping line {number} of {path}: local without entity"
+                )
+                continue
+            yield item
+
+
+def completed_ids(path: str) -> Set:
+    """Ids already answered in an output file; failed ones are retried."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "answer" in record:
+                done.add(record.get("id"))
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
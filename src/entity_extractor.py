@@ -1,23 +1,224 @@
+import asyncio
+import json
 import logging
+from typing import Iterable, List, Optional, Tuple
+
+from src.gazetteer import Gazetteer
+from src.rate_limiter import Priority
+from src.utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+EXTRACTION_PROMPT = """Extract named entities and the relationships between them from each numbered text chunk below.
+
+Respond with a single JSON object and nothing else, keyed by chunk number:
+{{"0": {{"entities": [{{"name": "...", "type": "..."}}], "relationships": [{{"source": "...", "target": "...", "type": "..."}}]}}, "1": ...}}
+
+Include every chunk number, using empty lists when a chunk has nothing to extract. Relationship sources and targets must be entity names from the same chunk.
+
+{chunks}"""
+
+
+class ExtractionError(ValueError):
+    """Raised when an LLM response cannot be parsed."""
+
+
+def parse_extraction_response(text: str, count: int) -> List[Optional[dict]]:
+    """Parse a batched extraction response into one result per chunk.
+
+    Tolerates markdown fences and prose around the JSON object. Chunks that
+    are missing or malformed come back as None so only they are retried.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ExtractionError("No JSON object in extraction response")
+    try:
+        payload = json.loads(text[start : end + 1])
+    except json.JSONDecodeError as e:
+        raise ExtractionError(f"Invalid JSON in extraction response: {e}") from e
+    if not isinstance(payload, dict):
+        raise ExtractionError("Extraction response is not a JSON object")
+    if isinstance(payload.get("chunks"), dict):
+        payload = payload["chunks"]
+    return [_parse_chunk_result(payload.get(str(i))) for i in range(count)]
+
+
+def _parse_chunk_result(result) -> Optional[dict]:
+    if not isinstance(result, dict):
+        return None
+    entities, relationships = (
+        result.get("entities", []),
+        result.get("relationships", []),
+    )
+    if not isinstance(entities, list) or not isinstance(relationships, list):
+        return None
+    names = {}
+    for entity in entities:
+        if isinstance(entity, dict) and isinstance(entity.get("name"), str):
+            name = entity["name"].strip()
+            if name and name not in names:
+                names[name] = {
+                    "name": name,
+                    "type": str(entity.get("type") or "Entity"),
+                }
+    edges = []
+    for relationship in relationships:
+        if not isinstance(relationship, dict):
+            continue
+        source = str(relationship.get("source") or "").strip()
+        target = str(relationship.get("target") or "").strip()
+        if source in names and target in names and source != target:
+            edges.append(
+                {
+                    "source": source,
+                    "target": target,
+                    "type": str(relationship.get("type") or "related_to"),
+                }
+            )
+    return {"entities": list(names.values()), "relationships": edges}
+
 
 class EntityExtractor:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, llm_client=None):
         self.config = config
+        settings = config.get("extraction", {})
+        self.mode = settings.get("mode", "rules")
+        self.load_from_db = settings.get("load_from_db", True)
+        self.gazetteer = None
+        if self.mode == "gazetteer":
+            self.gazetteer = Gazetteer(
+                merge_threshold=settings.get("merge_threshold", 1000),
+                overlapping=settings.get("overlapping", False),
+            )
+            if settings.get("gazetteer_path"):
+                self.gazetteer.load_file(settings["gazetteer_path"])
+        self.llm_client = llm_client
+        if self.mode == "llm" and llm_client is None:
+            raise ValueError("LLM extraction mode requires an LLM client")
+        self.max_prompt_tokens = settings.get("max_prompt_tokens", 3000)
+        self.max_chunks_per_call = settings.get("max_chunks_per_call", 8)
+        self.max_output_tokens = settings.get("max_output_tokens", 2048)
+        self.max_retries = settings.get("max_retries", 2)
+
+    async def load_known_entities(self, db):
+        """Seed the gazetteer with every node already in the graph."""
+        if self.gazetteer is None or not self.load_from_db:
+            return
+        nodes = await db.get_nodes()
+        self.gazetteer.add_many(
+            (node["name"], node["type"] or "Entity") for node in nodes
+        )
+        logger.info(f"Gazetteer loaded {len(self.gazetteer)} known entities")
+
+    def add_known_entities(self, entities: Iterable[Tuple[str, str]]):
+        """Make newly created nodes matchable in subsequent chunks."""
+        if self.gazetteer is not None:
+            self.gazetteer.add_many(entities)
 
     async def extract_entities(self, text: str) -> list:
-        """Extract entities from text (simplified for sample.txt text)."""
+        """Extract entities from text."""
+        if self.mode == "llm":
+            return (await self.extract_batch([text]))[0]["entities"]
         try:
-            # Simple rule-based entity extraction for sample.txt
-            entities = []
-            if "Rome" in text:
-                entities.append({"name": "Rome", "type": "Location"})
-            if "Venice" in text:
-                entities.append({"name": "Venice", "type": "Location"})
+            if self.gazetteer is not None:
+                entities = {}
+                for match in self.gazetteer.find(text):
+                    entities.setdefault(
+                        match.name, {"name": match.name, "type": match.type}
+                    )
+                entities = list(entities.values())
+            else:
+                entities = self._extract_with_rules(text)
             logger.debug(f"Extracted entities: {entities}")
             return entities
         except Exception as e:
             logger.error(f"Entity extraction failed: {str(e)}")
             return []
+
+    async def extract_batch(self, texts: List[str]) -> List[dict]:
+        """Extract entities and relationships for many chunks.
+
+        Returns one ``{"entities": [...], "relationships": [...]}`` per text.
+        In LLM mode chunks are packed into as few calls as the prompt budget
+        allows; the other modes have no relationships.
+        """
+        if self.mode != "llm":
+            return [
+                {"entities": await self.extract_entities(text), "relationships": []}
+                for text in texts
+            ]
+        results: List[Optional[dict]] = [None] * len(texts)
+        await asyncio.gather(
+            *(
+                self._extract_group(texts, group, results, self.max_retries)
+                for group in self._pack(texts)
+            )
+        )
+        return results
+
+    def _pack(self, texts: List[str]) -> List[List[int]]:
+        """Group chunk indices so each prompt stays within the token budget."""
+        groups, current, current_tokens = [], [], 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (
+                current_tokens + tokens > self.max_prompt_tokens
+                or len(current) >= self.max_chunks_per_call
+            ):
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _extract_group(
+        self, texts: List[str], group: List[int], results: list, retries: int
+    ):
+        chunks = "\n\n".join(f"### Chunk {n}\n{texts[i]}" for n, i in enumerate(group))
+        # Call failures propagate: the LLM client has already retried them, and
+        # swallowing one would mark the document processed without its graph.
+        response = await self.llm_client.generate(
+            EXTRACTION_PROMPT.format(chunks=chunks),
+            max_tokens=self.max_output_tokens,
+            priority=Priority.BACKGROUND,
+        )
+        try:
+            parsed = parse_extraction_response(response, len(group))
+        except ExtractionError as e:
+            logger.warning(f"Extraction failed for {len(group)} chunks: {str(e)}")
+            parsed = [None] * len(group)
+
+        failed = []
+        for i, result in zip(group, parsed):
+            if result is None:
+                failed.append(i)
+            else:
+                results[i] = result
+        if not failed:
+            return
+        if retries <= 0:
+            logger.error(f"Entity extraction failed for {len(failed)} chunks")
+            for i in failed:
+                results[i] = {"entities": [], "relationships": []}
+            return
+        # Smaller prompts are more likely to come back complete.
+        middle = (len(failed) + 1) // 2
+        halves = [failed[:middle], failed[middle:]] if len(failed) > 1 else [failed]
+        await asyncio.gather(
+            *(
+                self._extract_group(texts, half, results, retries - 1)
+                for half in halves
+                if half
+            )
+        )
+
+    def _extract_with_rules(self, text: str) -> list:
+        # Simple rule-based entity extraction for sample.txt
+        entities = []
+        if "Rome" in text:
+            entities.append({"name": "Rome", "type": "Location"})
+        if "Venice" in text:
+            entities.append({"name": "Venice", "type": "Location"})
+        return entities
@@ -0,0 +1,165 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def fold(text: str) -> str:
+    """Case-fold text without changing its length, so offsets stay valid."""
+    folded = text.casefold()
+    if len(folded) == len(text):
+        return folded
+    return "".join(
+        c.casefold() if len(c.casefold()) == 1 else c.lower()[:1] for c in text
+    )
+
+
+@dataclass(frozen=True)
+class Match:
+    start: int
+    end: int
+    name: str
+    type: str
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every key in one pass."""
+
+    def __init__(self, keys: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[int, ...]] = [()]
+        self.keys: List[str] = []
+        for key in keys:
+            self._insert(key)
+        self._link()
+
+    def _insert(self, key: str):
+        state = 0
+        for char in key:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            state = nxt
+        self.out[state] = self.out[state] + (len(self.keys),)
+        self.keys.append(key)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Yield (start, end, key) for every occurrence of every key."""
+        goto, fail, out, keys = self.goto, self.fail, self.out, self.keys
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                key = keys[index]
+                yield i + 1 - len(key), i + 1, key
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class Gazetteer:
+    """Dictionary of known entity names matched with Aho-Corasick automata.
+
+    Names are matched case-insensitively and only on word boundaries. New names
+    go into a small secondary automaton, rebuilt lazily by the next ``find``
+    after any addition; its cost is bounded by the number of recent names, not
+    the dictionary size. Once the recent names outgrow ``merge_threshold`` and
+    a tenth of the main automaton, the full dictionary is rebuilt into the
+    main one, so full rebuilds are amortised over geometrically growing
+    batches of additions.
+    """
+
+    def __init__(self, merge_threshold: int = 1000, overlapping: bool = False):
+        self.merge_threshold = merge_threshold
+        self.overlapping = overlapping
+        self.entries: Dict[str, Tuple[str, str]] = {}
+        self._main = AhoCorasick(())
+        self._recent: Dict[str, Tuple[str, str]] = {}
+        self._recent_automaton = AhoCorasick(())
+        self._recent_dirty = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, name: str, type: str):
+        self.add_many([(name, type)])
+
+    def add_many(self, entities: Iterable[Tuple[str, str]]):
+        for name, type in entities:
+            key = fold(name.strip())
+            if not key:
+                continue
+            if key not in self.entries:
+                self._recent[key] = (name, type)
+                self._recent_dirty = True
+            self.entries[key] = (name, type)
+        if len(self._recent) > max(self.merge_threshold, len(self._main) // 10):
+            self.rebuild()
+
+    def load_file(self, path: str, default_type: str = "Entity"):
+        """Load one ``name<TAB>type`` entry per line; the type is optional."""
+        with open(path, "r", encoding="utf-8") as f:
+            entries = []
+            for line in f:
+                name, _, type = line.rstrip("\n").partition("\t")
+                if name.strip():
+                    entries.append((name.strip(), type.strip() or default_type))
+        self.add_many(entries)
+        logger.info(f"Loaded {len(entries)} gazetteer entries from {path}")
+
+    def rebuild(self):
+        """Fold recent additions into the main automaton."""
+        self._main = AhoCorasick(self.entries)
+        self._recent = {}
+        self._recent_automaton = AhoCorasick(())
+        self._recent_dirty = False
+        logger.debug(f"Rebuilt gazetteer automaton with {len(self._main)} names")
+
+    def find(self, text: str) -> List[Match]:
+        """Find known entities in text, leftmost-longest unless overlapping."""
+        if self._recent_dirty:
+            self._recent_automaton = AhoCorasick(self._recent)
+            self._recent_dirty = False
+        folded = fold(text)
+        candidates = []
+        for automaton in (self._main, self._recent_automaton):
+            for start, end, key in automaton.iter_matches(folded):
+                if _on_word_boundary(text, start, end):
+                    candidates.append((start, -end, key))
+        candidates.sort()
+        matches, covered = [], 0
+        for start, neg_end, key in candidates:
+            if not self.overlapping and start < covered:
+                continue
+            name, type = self.entries[key]
+            matches.append(Match(start, -neg_end, name, type))
+            covered = max(covered, -neg_end)
+        return matches
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (
+        end == len(text) or not text[end].isalnum()
+    )
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from src.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+MAP_PROMPT = """Answer the question using only the community summaries below. Then rate from 0 to 100 how helpful your answer is for the question; use 0 if the summaries are not relevant.
+
+Reply in exactly this form:
+SCORE: <0-100>
+ANSWER: <answer>
+
+Community summaries:
+{summaries}
+
+Question: {question}"""
+
+REDUCE_PROMPT = """The partial answers below were written from different parts of a knowledge graph and are ordered from most to least helpful. Combine them into one complete answer to the question, keeping every distinct point and dropping repetition.
+
+{answers}
+
+Question: {question}"""
+
+_SCORE = re.compile(r"SCORE:\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_ANSWER = re.compile(r"ANSWER:\s*(.*)", re.IGNORECASE | re.DOTALL)
+
+
+class GlobalSearchError(RuntimeError):
+    """Raised when every map call failed, so no summary was read at all."""
+
+
+@dataclass
+class PartialAnswer:
+    score: float
+    answer: str
+
+
+class GlobalSearch:
+    """Map-reduce question answering over community summaries.
+
+    Summaries, most relevant first, are packed into batches of at most
+    ``batch_tokens``. Each batch is answered and scored by one LLM call (map),
+    at most ``max_concurrency`` at a time; once ``enough_partials`` partial
+    answers score ``high_score`` or more, the remaining batches are
+    abandoned. The best partials that fit in ``reduce_tokens`` are then
+    merged by a final call (reduce).
+    """
+
+    def __init__(self, llm_client, config: Optional[dict] = None):
+        self.llm_client = llm_client
+        settings = (config or {}).get("global_search", {})
+        self.batch_tokens = settings.get("batch_tokens", 3000)
+        self.reduce_tokens = settings.get("reduce_tokens", 6000)
+        self.max_answer_tokens = settings.get("max_answer_tokens", 512)
+        self.max_concurrency = settings.get("max_concurrency", 8)
+        self.min_score = settings.get("min_score", 20)
+        self.high_score = settings.get("high_score", 80)
+        self.enough_partials = settings.get("enough_partials", 8)
+
+    async def answer(self, question: str, summaries: Sequence[str]) -> Optional[str]:
+        """Answer from summaries (most relevant first), or None if none helped.
+
+        Raises GlobalSearchError when no map call succeeded.
+        """
+        batches = self.batch(summaries)
+        partials = await self.map(question, batches)
+        helpful = sorted(
+            (p for p in partials if p.score >= self.min_score),
+            key=lambda p: -p.score,
+        )
+        logger.debug(
+            f"Global search: {len(batches)} batches, {len(partials)} answered, {len(helpful)} helpful"
+        )
+        if not helpful:
+            return None
+        if len(helpful) == 1:
+            return helpful[0].answer
+        return await self.reduce(question, helpful)
+
+    def batch(self, summaries: Sequence[str]) -> List[List[str]]:
+        """Pack summaries in order into batches within the token budget."""
+        batches, current, tokens = [], [], 0
+        for summary in summaries:
+            size = estimate_tokens(summary)
+            if current and tokens + size > self.batch_tokens:
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(summary)
+            tokens += size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def map(self, question: str, batches: List[List[str]]) -> List[PartialAnswer]:
+        """Partial answers for batches, taken in order by a bounded worker pool.
+
+        Failed calls are skipped unless all of them failed.
+        """
+        partials: List[PartialAnswer] = []
+        failures: List[Exception] = []
+        answered = 0
+        pending = iter(batches)
+
+        def enough() -> bool:
+            return (
+                sum(p.score >= self.high_score for p in partials)
+                >= self.enough_partials
+            )
+
+        async def worker():
+            nonlocal answered
+            # Workers share one iterator, so earlier batches start first.
+            for batch in pending:
+                if enough():
+                    return
+                try:
+                    partial = await self._map_batch(question, batch)
+                except Exception as e:
+                    # One failed batch only costs recall; the others still answer.
+                    logger.error(f"Global search map call failed: {str(e)}")
+                    failures.append(e)
+                    continue
+                answered += 1
+                if partial is not None:
+                    partials.append(partial)
+
+        workers = {
+            asyncio.create_task(worker())
+            for _ in range(min(self.max_concurrency, len(batches)))
+        }
+        try:
+            while workers:
+                done, workers = await asyncio.wait(
+                    workers, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+                if enough():
+                    logger.debug("Global search stopped early on enough partials")
+                    break
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        if failures and not answered:
+            raise GlobalSearchError(
+                f"All {len(failures)} global search map calls failed"
+            ) from failures[-1]
+        return partials
+
+    async def reduce(self, question: str, partials: List[PartialAnswer]) -> str:
+        answers, tokens = [], 0
+        for i, partial in enumerate(partials, 1):
+            text = f"Answer {i} (helpfulness {partial.score:g}):\n{partial.answer}"
+            size = estimate_tokens(text)
+            if answers and tokens + size > self.reduce_tokens:
+                break
+            answers.append(text)
+            tokens += size
+        response = await self.llm_client.generate(
+            REDUCE_PROMPT.format(answers="\n\n".join(answers), question=question),
+            max_tokens=self.max_answer_tokens,
+        )
+        return response.strip()
+
+    async def _map_batch(
+        self, question: str, batch: List[str]
+    ) -> Optional[PartialAnswer]:
+        prompt = MAP_PROMPT.format(summaries="\n\n".join(batch), question=question)
+        response = await self.llm_client.generate(
+            prompt, max_tokens=self.max_answer_tokens
+        )
+        return parse_partial(response)
+
+
+def parse_partial(response: str) -> Optional[PartialAnswer]:
+    """Read a 'SCORE: n / ANSWER: text' reply; None if it has no answer."""
+    answer = _ANSWER.search(response or "")
+    if answer is None or not answer.group(1).strip():
+        return None
+    score = _SCORE.search(response)
+    return PartialAnswer(
+        min(float(score.group(1)), 100.0) if score else 0.0,
+        answer.group(1).strip(),
+    )
@@ -0,0 +1,29 @@
+import time
+from typing import Optional, Sequence, Tuple
+
+
+class GraphVersion:
+    """Current storage version counters, re-read at most every ``ttl`` seconds.
+
+    In-process caches compare ``await current()`` with the value they were
+    filled under and drop their entries when it moves.
+    """
+
+    def __init__(self, db, names: Sequence[str], ttl: float = 1.0):
+        self.db = db
+        self.names = tuple(names)
+        self.ttl = ttl
+        self._value: Optional[Tuple] = None
+        self._checked = float("-inf")
+
+    async def current(self) -> Tuple:
+        now = time.monotonic()
+        if now - self._checked >= self.ttl:
+            versions = await self.db.get_graph_versions()
+            self._value = tuple(versions.get(name) for name in self.names)
+            self._checked = now
+        return self._value
+
+    def expire(self):
+        """Re-read the counters on the next call."""
+        self._checked = float("-inf")
@@ -1,13 +1,73 @@
+import asyncio
+import contextvars
 import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
 
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+import aiohttp
+
+from src.rate_limiter import Priority, RateLimiter, parse_duration
+from src.utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class TokenUsage:
+    """Tokens spent by the generate() calls made under track_usage()."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    calls: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+_usage: contextvars.ContextVar[Optional[TokenUsage]] = contextvars.ContextVar(
+    "llm_token_usage", default=None
+)
+
+
+@contextmanager
+def track_usage() -> Iterator[TokenUsage]:
+    """Count LLM tokens spent inside the block, including by tasks it starts.
+
+    Tasks copy the context when created, so concurrent queries each tracked
+    in their own task never mix counts.
+    """
+    usage = TokenUsage()
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
 
 class LLMClient:
-    def __init__(self, api_key: str, endpoint: str, model_id: str):
+    def __init__(
+        self,
+        api_key: str,
+        endpoint: str,
+        model_id: str,
+        max_connections: int = 32,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 3,
+        rate_limiter: Optional[RateLimiter] = None,
+        rate_limit_timeout: float = 600.0,
+    ):
         self.api_key = api_key
         self.endpoint = endpoint
         self.model_id = model_id
@@ -15,26 +75,125 @@ class LLMClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        # With a limiter, 429s are retried until this many seconds after the
+        # first one rather than counting against max_retries.
+        self.rate_limit_timeout = rate_limit_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LLMClient":
+        settings = config["llm"]
+        return cls(
+            api_key=settings["api_key"],
+            endpoint=settings["endpoint"],
+            model_id=settings["model_id"],
+            max_connections=settings.get("max_connections", 32),
+            timeout=settings.get("timeout", 60.0),
+            connect_timeout=settings.get("connect_timeout", 10.0),
+            max_retries=settings.get("max_retries", 3),
+            rate_limiter=RateLimiter.shared(
+                "llm", config.get("rate_limits", {}).get("llm")
+            ),
+            rate_limit_timeout=settings.get("rate_limit_timeout", 600.0),
+        )
 
-    @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
-    async def generate(self, prompt: str) -> str:
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared keep-alive session, created on first use in the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections, keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=self.timeout
+            )
+        return self._session
+
+    async def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
         """Generate text using the Grok API."""
-        try:
-            data = {
-                "model": self.model_id,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 512,
-            }
-            response = requests.post(self.endpoint, headers=self.headers, json=data)
+        data = {
+            "model": self.model_id,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+        }
+        tokens = estimate_tokens(prompt) + max_tokens
+        attempt = 0
+        throttled_since = None
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(tokens, priority)
+            try:
+                result, headers = await self._post(data)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                limited = (
+                    getattr(e, "status", None) == 429 and self.rate_limiter is not None
+                )
+                if limited:
+                    throttled_since = throttled_since or time.monotonic()
+                    exhausted = (
+                        time.monotonic() - throttled_since >= self.rate_limit_timeout
+                    )
+                else:
+                    attempt += 1
+                    exhausted = attempt >= self.max_retries
+                if not _is_retryable(e) or exhausted:
+                    logger.error(f"Grok API call failed: {str(e)}")
+                    raise
+                delay = min(2.0**attempt, 10.0)
+                if limited:
+                    # The limiter pauses every caller until Retry-After.
+                    self.rate_limiter.on_rate_limited(e.headers)
+                    delay = 0.0
+                elif getattr(e, "status", None) == 429:
+                    delay = (
+                        parse_duration((e.headers or {}).get("retry-after")) or delay
+                    )
+                logger.warning(
+                    f"Grok API call failed (attempt {attempt}), retrying: {str(e)}"
+                )
+                await asyncio.sleep(delay)
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success(headers)
+
+        text = result["choices"][0]["message"]["content"]
+        if not isinstance(text, str):
+            logger.error(f"Invalid response format: {text}")
+            raise ValueError("Invalid response format")
+        usage = _usage.get()
+        if usage is not None:
+            # Servers that omit usage are counted by estimate.
+            reported = result.get("usage") or {}
+            usage.prompt_tokens += reported.get(
+                "prompt_tokens", estimate_tokens(prompt)
+            )
+            usage.completion_tokens += reported.get(
+                "completion_tokens", estimate_tokens(text)
+            )
+            usage.calls += 1
+        return text
+
+    async def _post(self, data: dict):
+        async with self.session.post(self.endpoint, json=data) as response:
             response.raise_for_status()
-            result = response.json()
-            text = result["choices"][0]["message"]["content"]
-            if not isinstance(text, str):
-                logger.error(f"Invalid response format: {text}")
-                raise ValueError("Invalid response format")
-            return text
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Grok API call failed: {str(e)}")
-            raise
+            return await response.json(), response.headers
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("LLM client session closed")
+
+    async def __aenter__(self) -> "LLMClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
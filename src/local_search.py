@@ -0,0 +1,197 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.graph_version import GraphVersion
+
+logger = logging.getLogger(__name__)
+
+
+class Neighbour(NamedTuple):
+    node_id: int
+    relationship: str
+    weight: float
+    # The stored direction, for typed relationships.
+    source_id: int
+    target_id: int
+
+
+@dataclass
+class Neighbourhood:
+    """The part of the graph around an entity that local_query puts in its prompt."""
+
+    entity_id: int
+    # Node id -> relevance, 1.0 for the entity itself.
+    scores: Dict[int, float]
+    # (source_id, target_id, relationship, weight), most relevant first, each
+    # undirected relationship once.
+    relationships: List[Tuple[int, int, str, float]] = field(default_factory=list)
+    names: Dict[int, str] = field(default_factory=dict)
+    # (id, text, mentions) rows of the chunks the relationships came from.
+    chunks: list = field(default_factory=list)
+
+
+class AdjacencyCache:
+    """In-process LRU of each node's heaviest incident edges.
+
+    Entries hold at most ``fanout`` neighbours, heaviest first. The whole
+    cache is dropped when the storage's 'edges' version moves, which is
+    checked at most every ``version_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        db,
+        fanout: int = 32,
+        max_nodes: int = 100_000,
+        version_ttl: float = 1.0,
+    ):
+        self.db = db
+        self.fanout = fanout
+        self.max_nodes = max_nodes
+        self.graph_version = GraphVersion(db, ["edges"], version_ttl)
+        self.version: Optional[tuple] = None
+        self._entries: "OrderedDict[int, List[Neighbour]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def neighbours(self, node_ids: List[int]) -> Dict[int, List[Neighbour]]:
+        await self._check_version()
+        found = {}
+        missing = []
+        for node_id in node_ids:
+            entry = self._entries.get(node_id)
+            if entry is None:
+                missing.append(node_id)
+            else:
+                self._entries.move_to_end(node_id)
+                found[node_id] = entry
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            rows = await self.db.get_adjacency(missing, self.fanout)
+            loaded = {node_id: {} for node_id in missing}
+            for row in rows:
+                node_id = row["node_id"]
+                other = (
+                    row["target_id"]
+                    if row["source_id"] == node_id
+                    else row["source_id"]
+                )
+                # 'related' edges are stored once per direction; keep one.
+                key = (other, row["relationship"])
+                current = loaded[node_id].get(key)
+                if current is None or row["weight"] > current.weight:
+                    loaded[node_id][key] = Neighbour(
+                        other,
+                        row["relationship"],
+                        row["weight"],
+                        row["source_id"],
+                        row["target_id"],
+                    )
+            for node_id, edges in loaded.items():
+                entry = sorted(edges.values(), key=lambda n: (-n.weight, n.node_id))
+                found[node_id] = entry[: self.fanout]
+                self._entries[node_id] = found[node_id]
+            while len(self._entries) > self.max_nodes:
+                self._entries.popitem(last=False)
+        return found
+
+    async def _check_version(self):
+        version = await self.graph_version.current()
+        if version != self.version:
+            if self._entries:
+                logger.debug(
+                    f"Graph version {self.version} -> {version}, dropping {len(self._entries)} cached nodes"
+                )
+            self._entries.clear()
+            self.version = version
+
+    def invalidate(self):
+        """Drop every entry and re-read the version on the next lookup."""
+        self._entries.clear()
+        self.graph_version.expire()
+
+
+class LocalSearch:
+    """k-hop neighbourhood retrieval with weight-ranked beam pruning.
+
+    From the entity, each hop follows the ``fanout`` heaviest edges of every
+    frontier node and keeps the ``beam_width`` best new nodes, scoring a node
+    by the best path to it: the product of edge weights normalised by each
+    node's heaviest edge. Hub entities therefore cost the same as any other.
+    """
+
+    def __init__(self, db, config: Optional[dict] = None):
+        self.db = db
+        settings = (config or {}).get("local_search", {})
+        self.hops = settings.get("hops", 2)
+        self.beam_width = settings.get("beam_width", 16)
+        self.max_relationships = settings.get("max_relationships", 40)
+        self.max_chunks = settings.get("max_chunks", 5)
+        self.adjacency = AdjacencyCache(
+            db,
+            fanout=settings.get("fanout", 32),
+            max_nodes=settings.get("cache_nodes", 100_000),
+            version_ttl=settings.get("version_ttl", 1.0),
+        )
+
+    async def search(self, entity: str) -> Optional[Neighbourhood]:
+        """The neighbourhood of the named entity, or None if there is none."""
+        entity_id = (await self.db.get_node_ids([entity])).get(entity)
+        if entity_id is None:
+            return None
+        scores = {entity_id: 1.0}
+        # (low id, high id, relationship) -> (score, relationship row)
+        edges: Dict[Tuple[int, int, str], Tuple[float, tuple]] = {}
+        frontier = [entity_id]
+        for _ in range(self.hops):
+            adjacency = await self.adjacency.neighbours(frontier)
+            candidates: Dict[int, float] = {}
+            for node_id in frontier:
+                neighbours = adjacency.get(node_id, [])
+                if not neighbours:
+                    continue
+                heaviest = neighbours[0].weight or 1.0
+                for n in neighbours:
+                    score = scores[node_id] * n.weight / heaviest
+                    key = (
+                        min(node_id, n.node_id),
+                        max(node_id, n.node_id),
+                        n.relationship,
+                    )
+                    if key not in edges or score > edges[key][0]:
+                        row = (n.source_id, n.target_id, n.relationship, n.weight)
+                        edges[key] = (score, row)
+                    if n.node_id not in scores and score > candidates.get(
+                        n.node_id, 0.0
+                    ):
+                        candidates[n.node_id] = score
+            frontier = sorted(candidates, key=lambda i: (-candidates[i], i))
+            frontier = frontier[: self.beam_width]
+            if not frontier:
+                break
+            scores.update((node_id, candidates[node_id]) for node_id in frontier)
+
+        # Edges into pruned candidates are dropped with them.
+        ranked = sorted(
+            (
+                (score, row)
+                for (low, high, _), (score, row) in edges.items()
+                if low in scores and high in scores
+            ),
+            key=lambda item: -item[0],
+        )
+        relationships = [row for _, row in ranked[: self.max_relationships]]
+        node_ids = sorted(scores, key=lambda i: (-scores[i], i))
+        names = await self.db.get_node_names(node_ids)
+        chunks = (
+            await self.db.get_entity_chunks(node_ids, self.max_chunks)
+            if self.max_chunks
+            else []
+        )
+        return Neighbourhood(entity_id, scores, relationships, names, chunks)
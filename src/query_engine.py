@@ -1,84 +1,214 @@
+import asyncio
 import logging
 import os
-import sys
+from typing import List, Optional
+
+from tenacity import retry, stop_after_attempt, wait_exponential
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from graphrag_extender.db import Database
 from graphrag_extender.embeddings import Embeddings
-from llm_client import LLMClient
+from graphrag_extender.storage import Storage
+from graphrag_extender.vector_index import VectorIndex, sync_index
+from src.answer_cache import AnswerCache
+from src.global_search import GlobalSearch
+from src.graph_version import GraphVersion
+from src.llm_client import LLMClient
+from src.local_search import LocalSearch
 
 logger = logging.getLogger(__name__)
 
 
 class QueryEngine:
-    def __init__(self, db: Database, llm_client: LLMClient, embedder: Embeddings):
+    def __init__(
+        self,
+        db: Storage,
+        llm_client: LLMClient,
+        embeddings: Embeddings,
+        config: Optional[dict] = None,
+    ):
         self.db = db
         self.llm_client = llm_client
-        self.embedder = embedder
+        self.embeddings = embeddings
+        self.vector_search = (config or {}).get("vector_search", {})
+        self.local_search = LocalSearch(db, config)
+        self.answer_cache = AnswerCache(db, config)
+        # top_k answers from the nearest few summaries in one call; map_reduce
+        # answers from up to max_communities of them with GlobalSearch.
+        global_settings = (config or {}).get("global_search", {})
+        self.global_mode = global_settings.get("mode", "top_k")
+        self.max_communities = global_settings.get("max_communities", 1000)
+        self.global_search = GlobalSearch(llm_client, config)
+        # With the local backend, community search runs in-process against a
+        # memory-mapped mirror of communities.summary_embedding.
+        self.community_index = None
+        if self.vector_search.get("backend", "postgres") == "local":
+            self.community_index = VectorIndex(
+                os.path.join(
+                    self.vector_search.get("index_dir", "data/index"), "communities"
+                ),
+                dim=self.vector_search.get("dim", 1536),
+                ivf_threshold=self.vector_search.get("ivf_threshold", 50_000),
+                nprobe=self.vector_search.get("nprobe", 8),
+            )
+            # A long-lived engine resyncs whenever communities are rewritten.
+            self.community_version = GraphVersion(
+                db, ["communities"], self.vector_search.get("version_ttl", 1.0)
+            )
+            self._synced_version = None
+            self._sync_lock = asyncio.Lock()
 
-    async def global_query(self, question: str) -> str:
-        """Answer a global question using community summaries."""
+    async def sync_indexes(self):
+        """Bring the local vector index up to date with Postgres."""
+        if self.community_index is None:
+            return
+        async with self._sync_lock:
+            self.community_version.expire()
+            await self._sync_community_index()
+
+    async def _check_community_index(self):
+        if await self.community_version.current() == self._synced_version:
+            return
+        async with self._sync_lock:
+            # Another query may have synced while this one waited.
+            if await self.community_version.current() != self._synced_version:
+                await self._sync_community_index()
+
+    async def _sync_community_index(self):
+        # Read before syncing, so changes made meanwhile trigger another.
+        version = await self.community_version.current()
+        await sync_index(self.community_index, self.db, "communities")
+        self._synced_version = version
+
+    @retry(
+        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def generate_embedding(self, text: str) -> list:
         try:
-            question_embedding = await self.embedder.generate_embedding(question)
-            with self.db.get_conn() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        SELECT id, summary
-                        FROM communities
-                        ORDER BY summary_embedding <-> %s
-                        LIMIT 3
-                        """,
-                        (question_embedding,),
-                    )
-                    communities = cur.fetchall()
-
-            if not communities:
-                return "No relevant communities found."
+            embedding = await self.embeddings.generate_embedding(text)
+            if not isinstance(embedding, list) or not all(
+                isinstance(x, float) for x in embedding
+            ):
+                logger.error(f"Invalid embedding format: {embedding}")
+                raise ValueError("Invalid embedding format")
+            return embedding
+        except Exception as e:
+            logger.error(f"Embedding generation failed: {str(e)}")
+            raise
 
-            context = "\n".join(c["summary"] for c in communities)
-            prompt = f"Based on these summaries:\n{context}\nAnswer: {question}"
-            response = await self.llm_client.generate(prompt)
-            return response.strip()
+    async def search_communities(
+        self, embedding: list, limit: Optional[int] = None
+    ) -> List[dict]:
+        """The limit (default top_k) communities nearest to embedding, nearest first."""
+        limit = limit or self.vector_search.get("top_k", 3)
+        if self.community_index is None:
+            ef_search = self.vector_search.get("ef_search")
+            if ef_search is not None and ef_search < limit:
+                # HNSW returns at most ef_search rows (pgvector caps it at 1000).
+                ef_search = min(limit, 1000)
+            return await self.db.search_communities(
+                embedding,
+                limit=limit,
+                ef_search=ef_search,
+                probes=self.vector_search.get("probes"),
+            )
+        await self._check_community_index()
+        hits = self.community_index.search(embedding, limit)
+        summaries = await self.db.get_community_summaries([i for i, _ in hits])
+        # Communities deleted since the last sync are skipped.
+        return [
+            {"id": i, "summary": summaries[i], "distance": 1.0 - score}
+            for i, score in hits
+            if i in summaries
+        ]
 
+    async def global_query(self, question: str) -> str:
+        try:
+            return await self.answer_global(question)
         except Exception as e:
             logger.error(f"Global query failed: {str(e)}")
             return "Error processing global query."
 
-    async def local_query(self, question: str, entity: str) -> str:
-        """Answer a local question about a specific entity."""
-        try:
-            with self.db.get_conn() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT id FROM nodes WHERE name = %s", (entity,))
-                    result = cur.fetchone()
-                    if not result:
-                        return f"Entity {entity} not found."
-                    entity_id = result["id"]
-
-                    cur.execute(
-                        """
-                        SELECT n1.name AS source, n2.name AS target, e.relationship, e.weight
-                        FROM edges e
-                        JOIN nodes n1 ON e.source_id = n1.id
-                        JOIN nodes n2 ON e.target_id = n2.id
-                        WHERE e.source_id = %s OR e.target_id = %s
-                        """,
-                        (entity_id, entity_id),
-                    )
-                    relationships = cur.fetchall()
-
-            if not relationships:
-                return f"No relationships found for {entity}."
-
-            context = "\n".join(
-                f"{r['source']} is {r['relationship']} to {r['target']} (weight: {r['weight']})"
-                for r in relationships
+    async def answer_global(self, question: str) -> str:
+        """global_query without the error handling: failures raise."""
+        scope = ("global", None)
+        cached = await self.answer_cache.get(scope, question)
+        if cached is not None:
+            return cached
+        question_embedding = await self.generate_embedding(question)
+        cached = await self.answer_cache.get_similar(scope, question_embedding)
+        if cached is not None:
+            return cached
+
+        if self.global_mode == "map_reduce":
+            communities = await self.search_communities(
+                question_embedding, self.max_communities
+            )
+        else:
+            communities = await self.search_communities(question_embedding)
+
+        if not communities:
+            return "No relevant communities found."
+
+        if self.global_mode == "map_reduce":
+            response = await self.global_search.answer(
+                question, [c["summary"] for c in communities]
             )
-            prompt = f"Based on these relationships:\n{context}\nAnswer: {question}"
+            if response is None:
+                return "No relevant communities found."
+        else:
+            context = "\n".join(c["summary"] for c in communities)
+            prompt = f"Based on these summaries:\n{context}\nAnswer: {question}"
             response = await self.llm_client.generate(prompt)
-            return response.strip()
+        if not response:
+            return "No response generated."
+        answer = response.strip()
+        await self.answer_cache.put(scope, question, answer, question_embedding)
+        return answer
 
+    async def local_query(self, question: str, entity: str) -> str:
+        try:
+            return await self.answer_local(question, entity)
         except Exception as e:
             logger.error(f"Local query failed: {str(e)}")
             return "Error processing local query."
+
+    async def answer_local(self, question: str, entity: str) -> str:
+        """local_query without the error handling: failures raise."""
+        scope = ("local", entity)
+        cached = await self.answer_cache.get(scope, question)
+        if cached is not None:
+            return cached
+        # The search itself needs no embedding; it only serves the cache,
+        # so one failed attempt just skips the semantic lookup.
+        question_embedding = None
+        if self.answer_cache.enabled and self.embeddings is not None:
+            try:
+                question_embedding = await self.embeddings.generate_embedding(question)
+            except Exception as e:
+                logger.warning(f"Question embedding failed: {str(e)}")
+        if question_embedding is not None:
+            cached = await self.answer_cache.get_similar(scope, question_embedding)
+            if cached is not None:
+                return cached
+
+        neighbourhood = await self.local_search.search(entity)
+        if neighbourhood is None:
+            return f"Entity {entity} not found."
+
+        if not neighbourhood.relationships:
+            return f"No relationships found for {entity}."
+
+        names = neighbourhood.names
+        context = "\n".join(
+            f"{names[source]} is {relationship} to {names[target]} (weight: {weight})"
+            for source, target, relationship, weight in neighbourhood.relationships
+        )
+        if neighbourhood.chunks:
+            sources = "\n\n".join(c["text"] for c in neighbourhood.chunks)
+            context += f"\n\nSource passages:\n{sources}"
+        prompt = f"Based on these relationships:\n{context}\nAnswer: {question}"
+        response = await self.llm_client.generate(prompt)
+        if not response:
+            return "No response generated."
+        answer = response.strip()
+        await self.answer_cache.put(scope, question, answer, question_embedding)
+        return answer
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from aiohttp import web
+
+from src.answer_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+class Coalescer:
+    """Runs identical concurrent requests as one call and shares its result."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(call())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A client that disconnects must not cancel the call for the others.
+        return await asyncio.shield(future)
+
+
+class QueryService:
+    """A warm QueryEngine behind request coalescing and a concurrency limit."""
+
+    def __init__(self, engine, config: Optional[dict] = None):
+        self.engine = engine
+        settings = (config or {}).get("service", {})
+        self.semaphore = asyncio.Semaphore(settings.get("max_concurrency", 16))
+        self.coalescer = Coalescer()
+
+    async def global_query(self, question: str) -> str:
+        return await self.coalescer.run(
+            ("global", normalize_question(question)),
+            lambda: self._limited(self.engine.global_query(question)),
+        )
+
+    async def local_query(self, question: str, entity: str) -> str:
+        return await self.coalescer.run(
+            ("local", entity, normalize_question(question)),
+            lambda: self._limited(self.engine.local_query(question, entity)),
+        )
+
+    def stats(self) -> dict:
+        cache = self.engine.answer_cache
+        return {
+            "inflight": len(self.coalescer),
+            "calls": self.coalescer.calls,
+            "coalesced": self.coalescer.coalesced,
+            "answer_cache": {
+                "size": len(cache),
+                "hits": cache.hits,
+                "misses": cache.misses,
+            },
+        }
+
+    async def _limited(self, query: Awaitable[str]) -> str:
+        async with self.semaphore:
+            return await query
+
+
+SERVICE = web.AppKey("service", QueryService)
+
+
+def create_app(service: Optional[QueryService] = None) -> web.Application:
+    """HTTP routes over the QueryService stored under app[SERVICE].
+
+    POST /query/global {"question"} and POST /query/local {"question",
+    "entity"} answer {"answer"}; GET /health reports service counters.
+    """
+    app = web.Application()
+    if service is not None:
+        app[SERVICE] = service
+    app.router.add_post("/query/global", _global_query)
+    app.router.add_post("/query/local", _local_query)
+    app.router.add_get("/health", _health)
+    return app
+
+
+async def _global_query(request: web.Request) -> web.Response:
+    body = await _json_fields(request, "question")
+    answer = await request.app[SERVICE].global_query(body["question"])
+    return web.json_response({"answer": answer})
+
+
+async def _local_query(request: web.Request) -> web.Response:
+    body = await _json_fields(request, "question", "entity")
+    answer = await request.app[SERVICE].local_query(body["question"], body["entity"])
+    return web.json_response({"answer": answer})
+
+
+async def _health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", **request.app[SERVICE].stats()})
+
+
+async def _json_fields(request: web.Request, *fields: str) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(reason="Body must be a JSON object")
+    for field in fields:
+        if not isinstance(body.get(field), str) or not body[field].strip():
+            raise web.HTTPBadRequest(reason=f"Missing string field: {field}")
+    return body
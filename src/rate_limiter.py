@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+import time
+import weakref
+from enum import IntEnum
+from typing import ClassVar, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse '20', '1.5', '6m0s' or '250ms' style header values into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(self.max_rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (0 when it is available now).
+
+        A request larger than the burst capacity waits for a full bucket.
+        """
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        """Charge the full amount; any excess is debt the next caller waits off."""
+        self.level -= amount
+
+    def drain_to(self, remaining: float):
+        """Align the bucket with the provider's reported remaining budget."""
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Priority scheduler enforcing request and token budgets with AIMD backoff.
+
+    Callers ``await acquire()`` before each request and report the outcome with
+    ``on_success`` or ``on_rate_limited``. A 429 halves the sending rate and
+    pauses everyone for the provider's Retry-After; each success then adds back
+    a small fraction of the configured rate.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        min_rate_fraction: float = 0.1,
+        increase_fraction: float = 0.02,
+        default_pause: float = 1.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = (
+            TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        )
+        self.min_rate_fraction = min_rate_fraction
+        self.increase_fraction = increase_fraction
+        self.default_pause = default_pause
+        self.rate_fraction = 1.0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+
+    # Limiters hold asyncio state, so each event loop gets its own registry.
+    _shared: ClassVar[
+        "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, RateLimiter]]"
+    ] = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict]) -> Optional["RateLimiter"]:
+        if not settings:
+            return None
+        return cls(**settings)
+
+    @classmethod
+    def shared(cls, name: str, settings: Optional[dict]) -> Optional["RateLimiter"]:
+        """Return the running loop's limiter for a provider, creating it once.
+
+        Called with no loop running, a new unshared limiter is returned.
+        """
+        if not settings:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return cls.from_config(settings)
+        limiters = cls._shared.setdefault(loop, {})
+        if name not in limiters:
+            limiters[name] = cls.from_config(settings)
+        return limiters[name]
+
+    async def acquire(
+        self, tokens: float = 1, priority: Priority = Priority.BACKGROUND
+    ):
+        """Wait until this request may be sent, serving higher priorities first."""
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._queue, entry)
+        self._notify()
+        try:
+            while True:
+                delay = None
+                if self._queue[0] == entry:
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        if self.tokens is not None:
+                            self.tokens.take(tokens)
+                        self._notify()
+                        return
+                changed = self._event()
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._notify()
+            raise
+
+    def on_success(self, headers: Optional[Mapping[str, str]] = None):
+        """Additively restore the rate and honour any exhausted-budget headers."""
+        if self.rate_fraction < 1.0:
+            self._set_rate(self.rate_fraction + self.increase_fraction)
+        if headers:
+            self._apply_headers(headers)
+
+    def on_rate_limited(self, headers: Optional[Mapping[str, str]] = None):
+        """Multiplicatively back off and pause until the provider's Retry-After."""
+        now = time.monotonic()
+        self.throttled += 1
+        # Requests that were already in flight report the same 429; only the
+        # first one in a burst should cut the rate.
+        if now - self._last_decrease > 1.0:
+            self._last_decrease = now
+            self._set_rate(self.rate_fraction / 2)
+        retry_after = None
+        if headers:
+            retry_after = parse_duration(headers.get("retry-after"))
+            self._apply_headers(headers)
+        self._pause(retry_after or self.default_pause)
+        logger.warning(
+            f"Rate limited; sending at {self.rate_fraction:.0%} of budget, "
+            f"paused for {max(self.paused_until - now, 0):.1f}s"
+        )
+
+    def _apply_headers(self, headers: Mapping[str, str]):
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if bucket is None or remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            bucket.drain_to(remaining)
+            if remaining <= 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                self._pause(reset or self.default_pause)
+
+    def _set_rate(self, fraction: float):
+        self.rate_fraction = min(1.0, max(self.min_rate_fraction, fraction))
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(time.monotonic())
+                bucket.rate = bucket.max_rate * self.rate_fraction
+        self._notify()
+
+    def _pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self._notify()
+
+    def _delay(self, tokens: float) -> float:
+        now = time.monotonic()
+        delay = max(self.paused_until - now, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def _event(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _notify(self):
+        """Wake every waiter so the queue head re-evaluates its delay."""
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
@@ -1,8 +1,120 @@
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+from src.rate_limiter import Priority
+from src.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Write a concise summary of the community of entities below: what it is about, its key entities and how they relate.
+
+{description}"""
+
+MERGE_PROMPT = """The following are summaries of parts of one community of entities. Merge them into a single concise summary of the whole community.
+
+{summaries}"""
+
+
 class Summarizer:
-    def __init__(self, llm_client):
+    """LLM community summaries, run concurrently under a limit.
+
+    Communities whose description exceeds ``max_input_tokens`` are split into
+    parts that are summarised separately and then merged (map-reduce), so no
+    prompt outgrows the model's context window.
+    """
+
+    def __init__(self, llm_client, config: Optional[dict] = None):
         self.llm_client = llm_client
+        settings = (config or {}).get("summarization", {})
+        self.max_input_tokens = settings.get("max_input_tokens", 3000)
+        self.max_summary_tokens = settings.get("max_summary_tokens", 300)
+        self.semaphore = asyncio.Semaphore(settings.get("max_concurrency", 8))
+
+    async def summarize_community(
+        self, community_nodes: list, graph: Sequence[Tuple] = ()
+    ) -> str:
+        """Summarise entity names (or (name, type) pairs) and their relationships.
+
+        ``graph`` holds (source, target, relationship, weight) tuples between
+        members of the community.
+        """
+        lines = [
+            f"- {node[0]} ({node[1]})" if isinstance(node, tuple) else f"- {node}"
+            for node in community_nodes
+        ]
+        lines += [
+            f"- {source} -[{relationship}]-> {target} (weight {weight:g})"
+            for source, target, relationship, weight in graph
+        ]
+        parts = self._split(lines)
+        if len(parts) == 1:
+            return await self._generate(
+                SUMMARY_PROMPT.format(description="\n".join(parts[0]))
+            )
+        logger.debug(f"Summarising large community in {len(parts)} parts")
+        summaries = await asyncio.gather(
+            *(
+                self._generate(SUMMARY_PROMPT.format(description="\n".join(part)))
+                for part in parts
+            )
+        )
+        return await self._merge(list(summaries))
+
+    async def summarize_many(
+        self, communities: Sequence[Tuple[list, Sequence[Tuple]]]
+    ) -> List[str]:
+        """Summarise (nodes, relationships) pairs concurrently, in order."""
+        return list(
+            await asyncio.gather(
+                *(
+                    self.summarize_community(nodes, relationships)
+                    for nodes, relationships in communities
+                )
+            )
+        )
+
+    async def _merge(self, summaries: List[str]) -> str:
+        while len(summaries) > 1:
+            groups = self._split(summaries, minimum=2)
+            summaries = list(
+                await asyncio.gather(
+                    *(
+                        self._generate(
+                            MERGE_PROMPT.format(summaries="\n\n".join(group))
+                        )
+                        for group in groups
+                    )
+                )
+            )
+        return summaries[0]
+
+    def _split(self, items: List[str], minimum: int = 1) -> List[List[str]]:
+        """Group items so each group fits in the input budget.
+
+        Every group holds at least ``minimum`` items so repeated merging
+        always makes progress.
+        """
+        groups, current, tokens = [], [], 0
+        for item in items:
+            size = estimate_tokens(item)
+            if len(current) >= minimum and tokens + size > self.max_input_tokens:
+                groups.append(current)
+                current, tokens = [], 0
+            current.append(item)
+            tokens += size
+        if current:
+            if groups and len(current) < minimum:
+                groups[-1].extend(current)
+            else:
+                groups.append(current)
+        return groups
 
-    async def summarize_community(self, community_nodes: list, graph) -> str:
-        nodes_str = ", ".join(community_nodes)
-        prompt = f"Summarize the community: {nodes_str}"
-        return await self.llm_client.generate(prompt)
+    async def _generate(self, prompt: str) -> str:
+        async with self.semaphore:
+            summary = await self.llm_client.generate(
+                prompt,
+                max_tokens=self.max_summary_tokens,
+                priority=Priority.BACKGROUND,
+            )
+        return summary.strip()
@@ -1,9 +1,19 @@
 import logging
-from typing import List
+from dataclasses import dataclass
+from typing import Iterator, List
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class TextChunk:
+    text: str
+    start: int
+    end: int
+    byte_start: int
+    byte_end: int
+
+
 class TextChunker:
     def __init__(self, config: dict):
         self.chunk_size = config.get("chunk_size", 512)
@@ -29,3 +39,38 @@ class TextChunker:
         except Exception as e:
             logger.error(f"Error chunking text: {str(e)}")
             return [text]
+
+    def iter_file_chunks(
+        self, path: str, buffer_size: int = 1 << 20
+    ) -> Iterator[TextChunk]:
+        """Stream chunks of a UTF-8 file with their character and byte offsets.
+
+        Produces the same windows as chunk_text on the whole file while only
+        holding about ``buffer_size + chunk_size`` characters in memory. Newlines
+        are not translated, so offsets index directly into the file.
+        """
+        step = self.chunk_size - self.overlap
+        buffer, pos, start, byte_start = "", 0, 0, 0
+        eof = False
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            while True:
+                if not eof and len(buffer) - pos < self.chunk_size:
+                    block = f.read(buffer_size)
+                    if block:
+                        buffer = buffer[pos:] + block
+                        pos = 0
+                        continue
+                    eof = True
+                if pos >= len(buffer):
+                    break
+                text = buffer[pos : pos + self.chunk_size]
+                yield TextChunk(
+                    text,
+                    start,
+                    start + len(text),
+                    byte_start,
+                    byte_start + len(text.encode("utf-8")),
+                )
+                byte_start += len(buffer[pos : pos + step].encode("utf-8"))
+                pos += step
+                start += step
@@ -14,3 +14,8 @@ def load_config(file_path: str) -> dict:
     except Exception as e:
         logger.error(f"Failed to load config {file_path}: {str(e)}")
         raise
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for request budgeting."""
+    return len(text) // 4 + 1
@@ -0,0 +1,111 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.sqlite_storage import SQLiteStorage
+from src.answer_cache import AnswerCache, normalize_question
+from src.query_engine import QueryEngine
+
+GLOBAL = ("global", None)
+
+
+class FakeEmbeddings:
+    cache = None
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_embedding(self, text):
+        self.calls += 1
+        # Questions about themes point one way, everything else another.
+        return [1.0, 0.1] if "theme" in text.lower() else [0.0, 1.0]
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+async def open_storage():
+    db = SQLiteStorage(":memory:")
+    await db.initialize()
+    return db
+
+
+def cache_for(db, **settings):
+    return AnswerCache(db, {"answer_cache": {"version_ttl": 0, **settings}})
+
+
+def test_normalize_question_folds_case_punctuation_and_spacing():
+    assert normalize_question("  What are the MAIN themes?? ") == (
+        "what are the main themes"
+    )
+
+
+@pytest.mark.asyncio
+async def test_exact_and_semantic_hits_stay_within_scope():
+    db = await open_storage()
+    try:
+        cache = cache_for(db, similarity_threshold=0.9)
+        await cache.put(GLOBAL, "What are the themes?", "Rivers.", [1.0, 0.0])
+        assert await cache.get(GLOBAL, "what are the themes") == "Rivers."
+        assert await cache.get(("local", "Rome"), "What are the themes?") is None
+        assert await cache.get_similar(GLOBAL, [0.99, 0.05]) == "Rivers."
+        assert await cache.get_similar(GLOBAL, [0.5, 0.5]) is None
+        assert await cache.get_similar(("local", "Rome"), [1.0, 0.0]) is None
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_are_evicted_and_follow_the_graph_version():
+    db = await open_storage()
+    try:
+        expired = cache_for(db, ttl=0)
+        await expired.put(GLOBAL, "q", "a", [1.0, 0.0])
+        assert await expired.get(GLOBAL, "q") is None
+        assert await expired.get_similar(GLOBAL, [1.0, 0.0]) is None
+
+        cache = cache_for(db, max_entries=2)
+        await cache.put(GLOBAL, "one", "1")
+        await cache.put(GLOBAL, "two", "2")
+        assert await cache.get(GLOBAL, "one") == "1"
+        await cache.put(GLOBAL, "three", "3")
+        assert await cache.get(GLOBAL, "two") is None
+        assert await cache.get(GLOBAL, "one") == "1"
+
+        ids = await db.add_nodes([("a", "X"), ("b", "X")])
+        await db.add_edges([(ids["a"], ids["b"], "related", 1.0)])
+        assert await cache.get(GLOBAL, "one") is None and len(cache) == 0
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_global_query_reuses_answers_for_reworded_questions():
+    db = await open_storage()
+    try:
+        ids = await db.add_nodes([("Rome", "Location")])
+        await db.upsert_communities(
+            [("h", [ids["Rome"]], 0, None, "Rome is old.", [1.0, 0.0])]
+        )
+        embeddings, llm = FakeEmbeddings(), FakeLLM()
+        engine = QueryEngine(
+            db, llm, embeddings, {"answer_cache": {"similarity_threshold": 0.9}}
+        )
+        assert await engine.global_query("What are the main themes?") == "answer 1"
+        # Exact after normalisation: no embedding, no completion.
+        assert await engine.global_query("what are the main THEMES") == "answer 1"
+        assert embeddings.calls == 1
+        # Reworded: one embedding, still no completion.
+        assert await engine.global_query("Which themes stand out?") == "answer 1"
+        assert (embeddings.calls, llm.calls) == (2, 1)
+        assert await engine.global_query("Who lives here?") == "answer 2"
+    finally:
+        await db.close()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.sqlite_storage import SQLiteStorage
+from src.batch_runner import BatchRunner, read_questions
+from src.query_engine import QueryEngine
+
+
+class FakeEngine:
+    def __init__(self):
+        self.asked = []
+        self.active = 0
+        self.peak = 0
+
+    async def _answer(self, text):
+        self.asked.append(text)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return text.upper()
+
+    async def answer_global(self, question):
+        return await self._answer(question)
+
+    async def answer_local(self, question, entity):
+        if entity == "boom":
+            raise RuntimeError("engine failure")
+        return await self._answer(f"{entity}: {question}")
+
+
+def write_questions(path, count):
+    lines = [
+        json.dumps({"id": f"q{i}", "question": f"question {i}"}) for i in range(count)
+    ]
+    lines.insert(3, "not json")
+    lines.append(json.dumps({"question": "about rome", "entity": "Rome"}))
+    lines.append(json.dumps({"id": "bad", "question": "x", "entity": "boom"}))
+    path.write_text("\n".join(lines) + "\n")
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+
+def test_read_questions_defaults_ids_and_types(tmp_path):
+    path = tmp_path / "in.jsonl"
+    write_questions(path, 2)
+    items = list(read_questions(str(path)))
+    assert [i["id"] for i in items] == ["q0", "q1", 4, "bad"]
+    assert [i["type"] for i in items] == ["global", "global", "local", "local"]
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_concurrently_and_resumes_from_its_output(tmp_path):
+    questions, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_questions(questions, 30)
+    engine = FakeEngine()
+    runner = BatchRunner(engine, {"batch": {"concurrency": 4}})
+
+    report = await runner.run(str(questions), str(output))
+    records = read_output(output)
+    assert (report.completed, report.failed, report.skipped) == (31, 1, 0)
+    assert 1 < engine.peak <= 4
+    answered = {r["id"]: r for r in records if "answer" in r}
+    assert answered["q7"]["answer"] == "QUESTION 7"
+    assert answered[32]["answer"] == "ROME: ABOUT ROME"
+    assert all(r["latency_ms"] >= 10 for r in answered.values())
+    assert report.percentile(50) <= report.percentile(99) and report.throughput > 0
+
+    # Simulate a crash: keep ten records and half of the next line.
+    lines = output.read_text().splitlines()
+    output.write_text("\n".join(lines[:10]) + "\n" + lines[10][:15])
+    engine.asked.clear()
+    report = await runner.run(str(questions), str(output))
+    assert report.skipped == 10 and report.completed == 21
+    assert len(engine.asked) == 21
+    records = read_output_lenient(output)
+    ids = [r["id"] for r in records if "answer" in r]
+    assert len(ids) == len(set(ids)) == 31
+
+
+def read_output_lenient(path):
+    records = []
+    for line in path.read_text().splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass
+    return records
+
+
+class FailingLLM:
+    def __init__(self):
+        self.down = True
+
+    async def generate(self, prompt, **kwargs):
+        if self.down:
+            raise ConnectionError("LLM unavailable")
+        return "Rome is old."
+
+
+class FakeEmbeddings:
+    async def generate_embedding(self, text):
+        return [1.0, 0.0]
+
+
+@pytest.mark.asyncio
+async def test_engine_failures_are_recorded_as_errors_and_retried(tmp_path):
+    questions, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    questions.write_text(json.dumps({"id": "q", "question": "What is old?"}) + "\n")
+    db = SQLiteStorage(":memory:")
+    await db.initialize()
+    try:
+        ids = await db.add_nodes([("Rome", "Location")])
+        await db.upsert_communities(
+            [("h", [ids["Rome"]], 0, None, "Rome is old.", [1.0, 0.0])]
+        )
+        llm = FailingLLM()
+        runner = BatchRunner(QueryEngine(db, llm, FakeEmbeddings()))
+        report = await runner.run(str(questions), str(output))
+        assert (report.completed, report.failed, report.latencies) == (0, 1, [])
+        assert "LLM unavailable" in read_output(output)[0]["error"]
+
+        llm.down = False
+        report = await runner.run(str(questions), str(output))
+        assert (report.completed, report.skipped) == (1, 0)
+        assert read_output(output)[-1]["answer"] == "Rome is old."
+    finally:
+        await db.close()
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.communities import detect_communities
+from graphrag_extender.graph_store import CSRGraph
+
+
+def graph(nodes, edges):
+    return CSRGraph.from_records(nodes, edges)
+
+
+def two_cliques():
+    """Two 5-cliques joined by one weak edge, stored once per direction."""
+    nodes = [{"id": i, "name": f"n{i}"} for i in range(10, 20)]
+    edges = []
+    for group in (range(10, 15), range(15, 20)):
+        for a in group:
+            for b in group:
+                if a != b:
+                    edges.append({"source_id": a, "target_id": b, "weight": 2.0})
+    edges.append({"source_id": 14, "target_id": 15, "weight": 0.5})
+    edges.append({"source_id": 15, "target_id": 14, "weight": 0.5})
+    return nodes, edges
+
+
+@pytest.mark.parametrize("engine", ["leiden", "networkx"])
+def test_engines_find_planted_communities(engine):
+    nodes, edges = two_cliques()
+    communities = detect_communities(graph(nodes, edges), {"engine": engine, "seed": 1})
+    assert sorted(c.nodes for c in communities) == [
+        list(range(10, 15)),
+        list(range(15, 20)),
+    ]
+    assert all(c.level == 0 and c.parent is None for c in communities)
+
+
+def test_leiden_is_deterministic_with_seed():
+    nodes, edges = two_cliques()
+    settings = {"engine": "leiden", "seed": 7, "resolution": 3.0}
+    first = detect_communities(graph(nodes, edges), settings)
+    second = detect_communities(graph(nodes, edges), settings)
+    assert [c.nodes for c in first] == [c.nodes for c in second]
+
+
+def test_hierarchical_levels_point_to_parents():
+    nodes, edges = two_cliques()
+    # A tiny top-level resolution merges everything; the next level splits it.
+    settings = {
+        "engine": "leiden",
+        "seed": 1,
+        "resolution": [0.01, 1.0],
+        "levels": 3,
+        "min_split_size": 4,
+    }
+    communities = detect_communities(graph(nodes, edges), settings)
+    assert [c.level for c in communities] == [0, 1, 1]
+    assert communities[0].nodes == list(range(10, 20))
+    assert sorted(c.nodes for c in communities[1:]) == [
+        list(range(10, 15)),
+        list(range(15, 20)),
+    ]
+    assert all(c.parent == 0 for c in communities[1:])
+
+
+def test_edgeless_graph_is_one_community():
+    nodes = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+    assert [c.nodes for c in detect_communities(graph(nodes, []), {})] == [[1, 2]]
+
+
+def test_seeded_partition_places_new_node():
+    nodes, edges = two_cliques()
+    nodes.append({"id": 99, "name": "new"})
+    for target in (10, 11, 12):
+        edges.append({"source_id": 99, "target_id": target, "weight": 2.0})
+    previous = {node_id: 0 if node_id < 15 else 1 for node_id in range(10, 20)}
+    communities = detect_communities(graph(nodes, edges), {"seed": 1}, previous)
+    assert sorted(c.nodes for c in communities) == [
+        [10, 11, 12, 13, 14, 99],
+        list(range(15, 20)),
+    ]
@@ -0,0 +1,79 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.embedding_cache import EmbeddingCache
+from graphrag_extender.embeddings import Embeddings
+
+
+def test_round_trip_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path)
+    cache.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many("m", ["b", "c", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert cache.stats.memory_hits == 2 and cache.stats.misses == 1
+    cache.close()
+
+    reopened = EmbeddingCache(path)
+    assert reopened.get_many("m", ["a"]) == [[1.0, 2.0]]
+    assert reopened.get_many("other-model", ["a"]) == [None]
+    assert reopened.stats.disk_hits == 1
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), memory_items=2)
+    cache.put_many("m", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+    assert len(cache._memory) == 2
+    assert cache.get_many("m", ["a"]) == [[1.0]]
+    assert cache.stats.disk_hits == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    # Each 4-dimensional float32 vector takes 16 bytes.
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), memory_items=0, max_bytes=40)
+    cache.put_many("m", ["old"], [[0.0] * 4])
+    cache.put_many("m", ["mid"], [[1.0] * 4])
+    cache.get_many("m", ["old"])
+    cache.put_many("m", ["new"], [[2.0] * 4])
+    assert cache.get_many("m", ["old", "mid", "new"])[1] is None
+    assert cache.stats.evictions == 1
+
+
+class CountingEmbeddingsAPI:
+    def __init__(self):
+        self.inputs = []
+
+    async def create(self, input, model, encoding_format):
+        self.inputs.extend(input)
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[float(len(t))])
+                for i, t in enumerate(input)
+            ]
+        )
+
+
+@pytest.mark.asyncio
+async def test_embeddings_only_requests_uncached_texts(tmp_path):
+    config = {
+        "embeddings": {
+            "api_key": "test",
+            "cache": {"path": str(tmp_path / "cache.sqlite")},
+        }
+    }
+    embedder = Embeddings(config)
+    api = CountingEmbeddingsAPI()
+    embedder.client = SimpleNamespace(embeddings=api)
+
+    assert await embedder.generate_embeddings(["aa", "b", "aa"]) == [
+        [2.0],
+        [1.0],
+        [2.0],
+    ]
+    assert await embedder.generate_embedding("aa") == [2.0]
+    assert await embedder.generate_embeddings(["ccc", "b"]) == [[3.0], [1.0]]
+    assert api.inputs == ["aa", "b", "ccc"]
+    embedder.close()
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APIConnectionError, APIStatusError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.embeddings import Embeddings
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, input, model, encoding_format):
+        self.requests.append(input)
+        # Return items out of order to check that results are re-sorted.
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture
+def embeddings():
+    config = {"embeddings": {"api_key": "test", "batch_size": 3}}
+    embedder = Embeddings(config)
+    embedder.client = SimpleNamespace(embeddings=FakeEmbeddingsAPI())
+    return embedder
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_preserves_order(embeddings):
+    texts = ["a" * n for n in range(1, 8)]
+    vectors = await embeddings.generate_embeddings(texts)
+    assert vectors == [[float(n)] for n in range(1, 8)]
+    assert [len(r) for r in embeddings.client.embeddings.requests] == [3, 3, 1]
+
+
+def test_pack_respects_token_budget(embeddings):
+    embeddings.max_batch_tokens = 10
+    batches = embeddings._pack(["x" * 20, "x" * 20, "x" * 4])
+    assert [[i for i, _ in b] for b in batches] == [[0], [1, 2]]
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_with_a_rate_limiter(monkeypatch):
+    config = {
+        "embeddings": {"api_key": "test"},
+        "rate_limits": {"embeddings": {"requests_per_minute": 6000}},
+    }
+    embedder = Embeddings(config)
+    api = FakeEmbeddingsAPI()
+    failures = [
+        APIConnectionError(request=httpx.Request("POST", "http://test")),
+        APIStatusError(
+            "unavailable",
+            response=httpx.Response(503, request=httpx.Request("POST", "http://test")),
+            body=None,
+        ),
+    ]
+
+    async def create(**kwargs):
+        if failures:
+            raise failures.pop(0)
+        return await api.create(**kwargs)
+
+    async def no_sleep(delay):
+        pass
+
+    embedder.client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    assert await embedder.generate_embeddings(["ab"]) == [[2.0]]
+    assert not failures
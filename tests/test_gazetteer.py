@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.entity_extractor import EntityExtractor
+from src.gazetteer import Gazetteer
+
+
+def names(matches):
+    return [(m.name, m.start, m.end) for m in matches]
+
+
+def test_matches_case_insensitively_on_word_boundaries():
+    gazetteer = Gazetteer()
+    gazetteer.add_many([("Rome", "Location"), ("Ada", "Person")])
+    text = "ROME, not Romes; Ada met ada in Canada."
+    assert names(gazetteer.find(text)) == [
+        ("Rome", 0, 4),
+        ("Ada", 17, 20),
+        ("Ada", 25, 28),
+    ]
+
+
+def test_prefers_leftmost_longest_match():
+    gazetteer = Gazetteer()
+    gazetteer.add_many(
+        [("New York", "Location"), ("New York City", "Location"), ("York", "Location")]
+    )
+    matches = gazetteer.find("I love New York City.")
+    assert names(matches) == [("New York City", 7, 20)]
+
+    gazetteer.overlapping = True
+    assert [m.name for m in gazetteer.find("I love New York City.")] == [
+        "New York City",
+        "New York",
+        "York",
+    ]
+
+
+def test_incremental_additions_are_found_before_and_after_merge():
+    gazetteer = Gazetteer(merge_threshold=2)
+    gazetteer.add("Venice", "Location")
+    assert [m.name for m in gazetteer.find("to venice")] == ["Venice"]
+    gazetteer.add_many([("Milan", "Location"), ("Turin", "Location")])
+    # Crossing the threshold merges the recent names into the main automaton.
+    assert len(gazetteer._main) == 3 and not gazetteer._recent
+    gazetteer.add("Genoa", "Location")
+    assert [m.name for m in gazetteer.find("Genoa, Milan, Turin, Venice")] == [
+        "Genoa",
+        "Milan",
+        "Turin",
+        "Venice",
+    ]
+
+
+def test_load_file(tmp_path):
+    path = tmp_path / "names.tsv"
+    path.write_text("Ada Lovelace\tPerson\nLondon\n\n", encoding="utf-8")
+    gazetteer = Gazetteer()
+    gazetteer.load_file(str(path))
+    assert [(m.name, m.type) for m in gazetteer.find("Ada Lovelace in London")] == [
+        ("Ada Lovelace", "Person"),
+        ("London", "Entity"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_extractor_gazetteer_mode():
+    extractor = EntityExtractor({"extraction": {"mode": "gazetteer"}})
+    extractor.add_known_entities([("Rome", "Location"), ("Caesar", "Person")])
+    entities = await extractor.extract_entities("Caesar left Rome; Caesar returned.")
+    assert entities == [
+        {"name": "Caesar", "type": "Person"},
+        {"name": "Rome", "type": "Location"},
+    ]
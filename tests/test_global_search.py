@@ -0,0 +1,90 @@
+import asyncio
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.global_search import (
+    GlobalSearch,
+    GlobalSearchError,
+    PartialAnswer,
+    parse_partial,
+)
+
+
+class FakeLLM:
+    """Scores each map batch by the number in its first summary."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, prompt, max_tokens=512, **kwargs):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if "partial answers" in prompt:
+                return "merged"
+            score = re.search(r"summary (\d+)", prompt).group(1)
+            if score == self.fail_on:
+                raise RuntimeError("boom")
+            return f"SCORE: {score}\nANSWER: from {score}"
+        finally:
+            self.active -= 1
+
+
+def search(llm, **settings):
+    return GlobalSearch(llm, {"global_search": settings})
+
+
+def test_parse_partial():
+    assert parse_partial("SCORE: 75\nANSWER: Rome.") == PartialAnswer(75.0, "Rome.")
+    assert parse_partial("ANSWER: no score") == PartialAnswer(0.0, "no score")
+    assert parse_partial("I don't know") is None
+
+
+def test_batches_keep_order_within_the_token_budget():
+    summaries = [f"summary {i} " + "word " * 40 for i in range(10)]
+    batches = search(None, batch_tokens=120).batch(summaries)
+    assert [s for batch in batches for s in batch] == summaries
+    assert len(batches) > 1 and all(len(batch) >= 1 for batch in batches)
+    assert len(search(None).batch(["x " * 5000])) == 1
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_filters_weak_partials_and_tolerates_failures():
+    llm = FakeLLM(fail_on="50")
+    engine = search(llm, batch_tokens=1, max_concurrency=3, min_score=20)
+    summaries = [f"summary {score}" for score in (10, 90, 50, 60)]
+    assert await engine.answer("q", summaries) == "merged"
+    reduce_prompt = llm.prompts[-1]
+    assert "from 10" not in reduce_prompt
+    assert reduce_prompt.index("from 90") < reduce_prompt.index("from 60")
+    assert llm.peak <= 3
+
+    # A single helpful partial is the answer; no helpful one gives None.
+    assert await search(FakeLLM(), batch_tokens=1).answer("q", ["summary 70"]) == (
+        "from 70"
+    )
+    assert await search(FakeLLM(), batch_tokens=1).answer("q", ["summary 5"]) is None
+
+    # When every map call fails that is an error, not an unhelpful graph.
+    with pytest.raises(GlobalSearchError):
+        await search(FakeLLM(fail_on="50"), batch_tokens=1).answer(
+            "q", ["summary 50", "summary 50"]
+        )
+
+
+@pytest.mark.asyncio
+async def test_map_stops_early_once_enough_partials_score_high():
+    llm = FakeLLM()
+    engine = search(llm, batch_tokens=1, max_concurrency=2, enough_partials=2)
+    partials = await engine.map("q", [[f"summary {90 + i % 5}"] for i in range(20)])
+    assert 2 <= len(partials) < 20
+    assert len(llm.prompts) <= 4 and llm.peak <= 2
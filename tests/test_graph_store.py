@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.graph_store import CSRGraph
+
+
+def make_graph():
+    # Edges are stored once per direction, plus a duplicate, a self loop and
+    # an edge to an unknown node.
+    return CSRGraph.from_edges(
+        node_ids=[40, 10, 30, 20],
+        sources=[10, 20, 20, 30, 10, 10, 30, 30],
+        targets=[20, 10, 30, 20, 30, 10, 99, 20],
+        weights=[1.0, 1.0, 2.0, 2.0, 0.5, 7.0, 3.0, 4.0],
+    )
+
+
+def test_edges_are_interned_deduplicated_and_undirected():
+    graph = make_graph()
+    assert graph.node_ids.tolist() == [10, 20, 30, 40]
+    assert graph.node_count == 4 and graph.edge_count == 3
+    neighbours, weights = graph.neighbours(20)
+    assert neighbours.tolist() == [10, 30]
+    # Duplicates keep the largest weight.
+    assert weights.tolist() == [1.0, 4.0]
+    assert graph.degree(40) == 0
+    assert graph.degrees().tolist() == [2, 2, 2, 0]
+
+
+def test_subgraph_keeps_only_internal_edges():
+    sub = make_graph().subgraph([20, 30, 40, 1234])
+    assert sub.node_ids.tolist() == [20, 30, 40]
+    assert sub.edge_count == 1
+    assert sub.neighbours(30)[0].tolist() == [20]
+
+
+def test_to_igraph_matches_csr():
+    graph = make_graph()
+    ig_graph = graph.to_igraph()
+    assert ig_graph.vcount() == 4
+    edges = sorted(
+        (int(graph.node_ids[a]), int(graph.node_ids[b]), w)
+        for (a, b), w in zip(ig_graph.get_edgelist(), ig_graph.es["weight"])
+    )
+    assert edges == [(10, 20, 1.0), (10, 30, 0.5), (20, 30, 4.0)]
+
+
+def test_large_graph_memory_is_compact():
+    rng = np.random.default_rng(0)
+    sources = rng.integers(0, 100_000, 1_000_000)
+    targets = rng.integers(0, 100_000, 1_000_000)
+    graph = CSRGraph.from_edges(
+        np.arange(100_000), sources, targets, np.ones(1_000_000)
+    )
+    assert graph.edge_count > 990_000
+    # Two int32 + float32 entries per edge plus offsets.
+    assert graph.nbytes < 20 * graph.edge_count
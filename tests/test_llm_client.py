@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.llm_client import LLMClient, track_usage
+from src.rate_limiter import RateLimiter
+
+
+async def start_server(handler):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1/chat/completions"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_generate_calls_overlap():
+    async def handler(request):
+        body = await request.json()
+        await asyncio.sleep(0.2)
+        content = body["messages"][0]["content"].upper()
+        return web.json_response({"choices": [{"message": {"content": content}}]})
+
+    runner, endpoint = await start_server(handler)
+    try:
+        async with LLMClient("test", endpoint, "model") as client:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(client.generate(p) for p in "abcde"))
+            elapsed = time.perf_counter() - started
+        assert results == list("ABCDE")
+        assert elapsed < 0.6
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        return web.json_response({"error": "bad request"}, status=400)
+
+    runner, endpoint = await start_server(handler)
+    try:
+        async with LLMClient("test", endpoint, "model") as client:
+            with pytest.raises(aiohttp.ClientResponseError):
+                await client.generate("hello")
+        assert len(calls) == 1
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried_through_the_limiter():
+    calls = []
+
+    async def handler(request):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            return web.json_response({}, status=429, headers={"retry-after": "0.2"})
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+
+    runner, endpoint = await start_server(handler)
+    limiter = RateLimiter(requests_per_minute=6000)
+    try:
+        # 429s have their own time budget and do not use up max_retries.
+        async with LLMClient(
+            "test", endpoint, "model", max_retries=1, rate_limiter=limiter
+        ) as client:
+            assert await client.generate("hello") == "ok"
+        assert len(calls) == 2
+        assert calls[1] - calls[0] >= 0.2
+        assert limiter.throttled == 1
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_track_usage_counts_per_task():
+    async def handler(request):
+        body = await request.json()
+        await asyncio.sleep(0.05)
+        content = body["messages"][0]["content"]
+        return web.json_response(
+            {
+                "choices": [{"message": {"content": content}}],
+                "usage": {"prompt_tokens": len(content), "completion_tokens": 1},
+            }
+        )
+
+    async def query(client, prompts):
+        with track_usage() as usage:
+            await asyncio.gather(*(client.generate(p) for p in prompts))
+        return usage
+
+    runner, endpoint = await start_server(handler)
+    try:
+        async with LLMClient("test", endpoint, "model") as client:
+            short, long = await asyncio.gather(
+                query(client, ["a", "b"]), query(client, ["abcd"])
+            )
+            # Outside track_usage nothing is counted.
+            await client.generate("untracked")
+        assert (short.prompt_tokens, short.completion_tokens, short.calls) == (2, 2, 2)
+        assert (long.total_tokens, long.calls) == (5, 1)
+    finally:
+        await runner.cleanup()
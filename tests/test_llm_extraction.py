@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.entity_extractor import EntityExtractor, parse_extraction_response
+
+
+class FakeLLM:
+    """Answers extraction prompts, optionally dropping or garbling chunks."""
+
+    def __init__(self, drop=(), garble_first=False):
+        self.prompts = []
+        self.drop = set(drop)
+        self.garble_first = garble_first
+
+    async def generate(self, prompt, max_tokens=512, priority=None):
+        self.prompts.append(prompt)
+        if self.garble_first and len(self.prompts) == 1:
+            return "Sorry, here is the result: {not json"
+        chunks = re.findall(r"### Chunk (\d+)\n(.*?)(?=\n\n### Chunk|\Z)", prompt, re.S)
+        result = {}
+        for number, text in chunks:
+            if text in self.drop and len(chunks) > 1:
+                continue
+            names = re.findall(r"[A-Z][a-z]+", text)
+            result[number] = {
+                "entities": [{"name": n, "type": "Thing"} for n in names],
+                "relationships": [
+                    {"source": a, "target": b, "type": "before"}
+                    for a, b in zip(names, names[1:])
+                ],
+            }
+        return "```json\n" + json.dumps(result) + "\n```"
+
+
+def make_extractor(llm, **settings):
+    extraction = {"mode": "llm", "max_chunks_per_call": 4, **settings}
+    return EntityExtractor({"extraction": extraction}, llm_client=llm)
+
+
+def test_parse_tolerates_fences_and_drops_dangling_relationships():
+    response = 'Result:\n```json\n{"0": {"entities": [{"name": "Rome", "type": "Location"}], "relationships": [{"source": "Rome", "target": "Paris", "type": "near"}]}, "1": "oops"}\n```'
+    parsed = parse_extraction_response(response, 3)
+    assert parsed[0] == {
+        "entities": [{"name": "Rome", "type": "Location"}],
+        "relationships": [],
+    }
+    assert parsed[1] is None and parsed[2] is None
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_packed_into_few_calls():
+    llm = FakeLLM()
+    extractor = make_extractor(llm)
+    texts = [f"Alpha met Beta{i}" if i % 2 else "Alpha met Gamma" for i in range(10)]
+    results = await extractor.extract_batch(texts)
+    assert len(llm.prompts) == 3
+    assert results[0]["entities"] == [
+        {"name": "Alpha", "type": "Thing"},
+        {"name": "Gamma", "type": "Thing"},
+    ]
+    assert results[0]["relationships"] == [
+        {"source": "Alpha", "target": "Gamma", "type": "before"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_limits_chunks_per_call():
+    llm = FakeLLM()
+    extractor = make_extractor(llm, max_prompt_tokens=30)
+    await extractor.extract_batch(["Word " * 20] * 4)
+    assert len(llm.prompts) == 4
+
+
+@pytest.mark.asyncio
+async def test_only_failed_chunks_are_retried():
+    llm = FakeLLM(drop={"Delta here"})
+    extractor = make_extractor(llm)
+    texts = ["Alpha here", "Beta here", "Gamma here", "Delta here"]
+    results = await extractor.extract_batch(texts)
+    assert [r["entities"][0]["name"] for r in results] == [
+        "Alpha",
+        "Beta",
+        "Gamma",
+        "Delta",
+    ]
+    assert len(llm.prompts) == 2
+    assert "Alpha" not in llm.prompts[1] and "Delta here" in llm.prompts[1]
+
+
+@pytest.mark.asyncio
+async def test_unparseable_response_is_split_and_retried():
+    llm = FakeLLM(garble_first=True)
+    extractor = make_extractor(llm)
+    results = await extractor.extract_batch(["Alpha", "Beta", "Gamma", "Delta"])
+    assert all(r["entities"] for r in results)
+    # One garbled call for the batch, then one call per half.
+    assert len(llm.prompts) == 3
+
+
+@pytest.mark.asyncio
+async def test_call_failures_propagate_instead_of_emptying_chunks():
+    class DownLLM:
+        async def generate(self, prompt, max_tokens=512, priority=None):
+            raise ConnectionError("LLM unavailable")
+
+    extractor = make_extractor(DownLLM())
+    with pytest.raises(ConnectionError):
+        await extractor.extract_batch(["Alpha", "Beta"])
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.sqlite_storage import SQLiteStorage
+from src.local_search import LocalSearch
+from src.query_engine import QueryEngine
+
+SETTINGS = {"hops": 2, "beam_width": 3, "fanout": 4, "version_ttl": 0}
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return " answer "
+
+
+async def hub_graph():
+    """A hub linked to 50 spokes (weight = spoke number), stored both ways,
+    plus a typed edge from the heaviest spoke to a leaf."""
+    db = SQLiteStorage(":memory:")
+    await db.initialize()
+    ids = await db.add_nodes(
+        [("hub", "X"), ("leaf", "X")] + [(f"s{i}", "X") for i in range(1, 51)]
+    )
+    rows = []
+    for i in range(1, 51):
+        rows.append((ids["hub"], ids[f"s{i}"], "related", float(i)))
+        rows.append((ids[f"s{i}"], ids["hub"], "related", float(i)))
+    rows.append((ids["s50"], ids["leaf"], "works_with", 10.0))
+    await db.add_edges(rows)
+    return db, ids
+
+
+@pytest.mark.asyncio
+async def test_beam_search_prunes_hubs_and_dedupes_directions():
+    db, ids = await hub_graph()
+    try:
+        search = LocalSearch(db, {"local_search": SETTINGS})
+        neighbourhood = await search.search("hub")
+        assert neighbourhood.entity_id == ids["hub"]
+        names = neighbourhood.names
+        edges = [(names[s], names[t], r) for s, t, r, _ in neighbourhood.relationships]
+        pairs = [frozenset((s, t)) for s, t, _ in edges]
+        assert len(pairs) == len(set(pairs))
+        # Three heaviest spokes survive the beam; the leaf is two hops out.
+        assert set(names.values()) == {"hub", "s50", "s49", "s48", "leaf"}
+        assert edges[0][2] == "related" and {"hub", "s50"} == set(edges[0][:2])
+        assert ("s50", "leaf", "works_with") in edges
+        assert await search.search("nobody") is None
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_adjacency_cache_is_dropped_when_edges_change():
+    db, ids = await hub_graph()
+    try:
+        search = LocalSearch(db, {"local_search": SETTINGS})
+        await search.search("hub")
+        misses = search.adjacency.misses
+        await search.search("hub")
+        assert search.adjacency.misses == misses and search.adjacency.hits
+
+        await db.add_edges([(ids["hub"], ids["leaf"], "related", 100.0)])
+        neighbourhood = await search.search("hub")
+        assert search.adjacency.misses > misses
+        assert neighbourhood.relationships[0][:2] == (ids["hub"], ids["leaf"])
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_local_query_prompt_has_each_relationship_once_and_sources():
+    db, ids = await hub_graph()
+    try:
+        doc_id = await db.upsert_document("doc.txt", "h", 1, 0.0)
+        (chunk_id,) = await db.add_chunks([("The hub meets s50.", [0.0, 1.0], doc_id)])
+        await db.link_chunk_entities([(chunk_id, ids["hub"]), (chunk_id, ids["s50"])])
+        llm = FakeLLM()
+        engine = QueryEngine(db, llm, None, {"local_search": SETTINGS})
+
+        assert await engine.local_query("What is the hub?", "hub") == "answer"
+        prompt = llm.prompts[0]
+        assert prompt.count("hub is related to s50") == 1
+        assert "s50 is related to hub" not in prompt
+        assert "The hub meets s50." in prompt
+        assert await engine.local_query("?", "nobody") == "Entity nobody not found."
+    finally:
+        await db.close()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.migrations import load_migrations
+
+
+def test_bundled_migrations_are_ordered_and_non_destructive():
+    migrations = load_migrations()
+    assert [m.version for m in migrations] == list(range(1, len(migrations) + 1))
+    for migration in migrations:
+        assert "DROP TABLE" not in migration.sql.upper()
+
+
+def test_concurrent_index_migration_runs_statement_by_statement():
+    indexes = {m.name: m for m in load_migrations()}["indexes"]
+    assert not indexes.transactional
+    statements = indexes.statements()
+    assert all(s.startswith("CREATE INDEX CONCURRENTLY") for s in statements)
+    assert any("USING hnsw (summary_embedding" in s for s in statements)
+
+
+def test_load_migrations_skips_other_files_and_rejects_duplicates(tmp_path):
+    (tmp_path / "0002_second.sql").write_text("SELECT 2;")
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "notes.txt").write_text("ignored")
+    migrations = load_migrations(str(tmp_path))
+    assert [(m.version, m.name) for m in migrations] == [(1, "first"), (2, "second")]
+    assert migrations[0].transactional
+
+    (tmp_path / "0002_again.sql").write_text("SELECT 3;")
+    with pytest.raises(ValueError):
+        load_migrations(str(tmp_path))
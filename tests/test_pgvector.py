@@ -0,0 +1,25 @@
+import array
+import os
+import struct
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.pgvector import decode_vector, encode_vector
+
+
+def test_encode_matches_pgvector_wire_format():
+    data = encode_vector([1.0, -2.5])
+    assert data == struct.pack(">HHff", 2, 0, 1.0, -2.5)
+
+
+def test_round_trip():
+    values = [0.1, 0.2, -0.3, 4.0]
+    decoded = decode_vector(encode_vector(values))
+    assert isinstance(decoded, array.array)
+    assert decoded.tolist() == array.array("f", values).tolist()
+
+
+def test_encode_does_not_mutate_float32_array():
+    values = array.array("f", [1.0, 2.0])
+    encode_vector(values)
+    assert values.tolist() == [1.0, 2.0]
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.query_service import Coalescer, QueryService, create_app
+
+
+class FakeCache:
+    hits = misses = 0
+
+    def __len__(self):
+        return 0
+
+
+class SlowEngine:
+    def __init__(self):
+        self.answer_cache = FakeCache()
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def global_query(self, question):
+        self.calls.append(question)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return f"global: {question}"
+
+    async def local_query(self, question, entity):
+        self.calls.append((question, entity))
+        return f"{entity}: {question}"
+
+
+@pytest.mark.asyncio
+async def test_coalescer_shares_one_call_and_survives_cancelled_waiters():
+    coalescer = Coalescer()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.ensure_future(coalescer.run("k", call))
+    second = asyncio.ensure_future(coalescer.run("k", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+    assert len(calls) == 1 and coalescer.coalesced == 1 and len(coalescer) == 0
+    assert await coalescer.run("k", call) == "done" and len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_service_coalesces_identical_requests_and_limits_concurrency():
+    engine = SlowEngine()
+    service = QueryService(engine, {"service": {"max_concurrency": 2}})
+    async with TestClient(TestServer(create_app(service))) as client:
+        questions = ["What are the themes?", "what are the themes"] * 3 + [
+            f"Question {i}?" for i in range(4)
+        ]
+        responses = await asyncio.gather(
+            *(client.post("/query/global", json={"question": q}) for q in questions)
+        )
+        answers = [(await r.json())["answer"] for r in responses]
+        assert answers[1] == "global: What are the themes?"
+        assert len(engine.calls) == 5 and engine.peak <= 2
+
+        response = await client.post(
+            "/query/local", json={"question": "What is Rome?", "entity": "Rome"}
+        )
+        assert (await response.json())["answer"] == "Rome: What is Rome?"
+
+        response = await client.post("/query/local", json={"question": "x"})
+        assert response.status == 400
+        response = await client.post("/query/global", data="not json")
+        assert response.status == 400
+
+        health = await (await client.get("/health")).json()
+        assert health["status"] == "ok" and health["coalesced"] == 5
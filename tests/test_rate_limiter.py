@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.rate_limiter import Priority, RateLimiter, parse_duration
+
+
+def test_parse_duration():
+    assert parse_duration("20") == 20.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("250ms") == 0.25
+    assert parse_duration(None) is None
+    assert parse_duration("soon") is None
+
+
+@pytest.mark.asyncio
+async def test_request_budget_paces_calls():
+    # 600 rpm with a 0.1s burst allows one request now and one every 0.1s.
+    limiter = RateLimiter(requests_per_minute=600, burst_seconds=0.1)
+    started = time.perf_counter()
+    for _ in range(4):
+        await limiter.acquire()
+    assert time.perf_counter() - started >= 0.25
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_jump_the_queue():
+    limiter = RateLimiter(requests_per_minute=600, burst_seconds=0.1)
+    await limiter.acquire()  # Empty the bucket so the others have to queue.
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(priority=priority)
+        order.append(name)
+
+    background = [
+        asyncio.create_task(call(f"bg{i}", Priority.BACKGROUND)) for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("query", Priority.INTERACTIVE))
+    await asyncio.gather(*background, interactive)
+    assert order[0] == "query"
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_backs_off_then_recovers():
+    limiter = RateLimiter(
+        requests_per_minute=6000, increase_fraction=0.25, default_pause=0.05
+    )
+    limiter.on_rate_limited({"retry-after": "0.1"})
+    assert limiter.rate_fraction == 0.5
+    assert limiter.requests.rate == pytest.approx(50.0)
+    started = time.perf_counter()
+    await limiter.acquire()
+    assert time.perf_counter() - started >= 0.09
+
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate_fraction == 1.0
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_header_pauses():
+    limiter = RateLimiter(requests_per_minute=6000)
+    limiter.on_success(
+        {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "100ms"}
+    )
+    started = time.perf_counter()
+    await limiter.acquire()
+    assert time.perf_counter() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_requests_larger_than_the_burst_are_charged_in_full():
+    # 60,000 tpm with a 0.1s burst holds 100 tokens and refills 1000 a second.
+    limiter = RateLimiter(
+        requests_per_minute=60_000, tokens_per_minute=60_000, burst_seconds=0.1
+    )
+    started = time.perf_counter()
+    await limiter.acquire(300)
+    assert time.perf_counter() - started < 0.05
+    # The 300-token call left a 200-token debt: 0.2s plus 0.1s for this one.
+    await limiter.acquire(100)
+    assert time.perf_counter() - started >= 0.28
+
+
+def test_shared_limiters_are_per_event_loop():
+    settings = {"requests_per_minute": 60}
+
+    async def pair():
+        return RateLimiter.shared("test", settings), RateLimiter.shared(
+            "test", settings
+        )
+
+    first, same = asyncio.run(pair())
+    second, _ = asyncio.run(pair())
+    assert first is same and first is not second
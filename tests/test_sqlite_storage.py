@@ -0,0 +1,133 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.extender import GraphExtender
+from graphrag_extender.sqlite_storage import SQLiteStorage
+from graphrag_extender.storage import create_storage
+
+
+class FakeEmbeddings:
+    """Deterministic pseudo-random vectors, so no API is needed."""
+
+    cache = None
+
+    def vector(self, text):
+        rng = random.Random(text)
+        return [rng.random() for _ in range(8)]
+
+    async def generate_embedding(self, text):
+        return self.vector(text)
+
+    async def generate_embeddings(self, texts):
+        return [self.vector(text) for text in texts]
+
+    def close(self):
+        pass
+
+
+def make_extender(path):
+    config = {
+        "storage": {"backend": "sqlite", "path": path},
+        "embeddings": {"api_key": "test"},
+        "extraction": {"mode": "rules"},
+        "summarization": {"mode": "template"},
+        "chunk_size": 200,
+        "chunk_overlap": 20,
+    }
+    extender = GraphExtender(config)
+    extender.embeddings = FakeEmbeddings()
+    return extender
+
+
+@pytest.mark.asyncio
+async def test_index_and_reindex_end_to_end(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    (input_dir / "a.txt").write_text("Rome and Venice are old. " * 20)
+    (input_dir / "b.txt").write_text("Venice is near Rome. " * 20)
+
+    extender = make_extender(str(tmp_path / "graph.sqlite"))
+    assert isinstance(extender.db, SQLiteStorage)
+    await extender.initialize()
+    try:
+        await extender.extend_graph(str(input_dir))
+        nodes, edges = await extender.db.load_graph()
+        assert {node["name"] for node in nodes} == {"Rome", "Venice"}
+        assert len(edges) == 2 and edges[0]["weight"] == edges[1]["weight"]
+        weight = edges[0]["weight"]
+        communities = await extender.db.get_communities()
+        assert communities and all(c["membership_hash"] for c in communities)
+        assert not await extender.db.get_dirty_nodes()
+
+        # Editing one document replaces its chunks and the edges they implied.
+        (input_dir / "b.txt").write_text("Venice is quiet. " * 20)
+        await extender.extend_graph(str(input_dir))
+        nodes, edges = await extender.db.load_graph()
+        assert len(edges) == 2 and 0 < edges[0]["weight"] < weight
+        assert not await extender.db.get_unprocessed_documents()
+
+        top = await extender.db.search_communities(FakeEmbeddings().vector("x"), 1)
+        assert len(top) == 1 and top[0]["summary"].startswith("Community with nodes")
+
+        # Communities from before membership hashes are rebuilt once, even
+        # though no node is dirty.
+        extender.db.conn.execute(
+            "INSERT INTO communities (nodes, summary) VALUES ('[1]', 'legacy')"
+        )
+        await extender.update_communities()
+        communities = await extender.db.get_communities()
+        assert communities and all(c["membership_hash"] for c in communities)
+    finally:
+        await extender.close()
+
+
+@pytest.mark.asyncio
+async def test_upsert_communities_keeps_unchanged_rows_and_links_parents():
+    db = create_storage({"storage": {"backend": "sqlite", "path": ":memory:"}})
+    await db.initialize()
+    try:
+        ids = await db.add_nodes([("a", "X"), ("b", "X"), ("c", "X")])
+        a, b, c = ids["a"], ids["b"], ids["c"]
+        rows = [
+            ("top", [a, b, c], 0, None, "all", [1.0, 0.0]),
+            ("left", [a, b], 1, "top", "ab", [0.0, 1.0]),
+        ]
+        assert await db.upsert_communities(rows) == (2, 0)
+        first = {r["membership_hash"]: r for r in await db.get_communities()}
+        assert first["left"]["parent_id"] == first["top"]["id"]
+
+        # Unchanged communities pass no summary and keep theirs.
+        rows = [("top", [a, b, c], 0, None, None, None)]
+        async with db.transaction() as conn:
+            assert await db.upsert_communities(rows, conn=conn) == (0, 1)
+        summaries = await db.get_community_summaries([first["top"]["id"]])
+        assert summaries == {first["top"]["id"]: "all"}
+        assert await db.get_community_hashes(["top", "left"]) == {"top"}
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_search_communities_caches_the_matrix_until_communities_change():
+    db = create_storage({"storage": {"backend": "sqlite", "path": ":memory:"}})
+    await db.initialize()
+    try:
+        ids = await db.add_nodes([("a", "X")])
+        await db.upsert_communities([("old", [ids["a"]], 0, None, "old", [1.0, 0.0])])
+        assert [c["summary"] for c in await db.search_communities([1.0, 0.0])] == [
+            "old"
+        ]
+        cached = db._community_matrix
+        await db.search_communities([0.0, 1.0])
+        assert db._community_matrix is cached
+
+        await db.upsert_communities([("new", [ids["a"]], 0, None, "new", [0.0, 1.0])])
+        top = await db.search_communities([0.0, 1.0])
+        assert [c["summary"] for c in top] == ["new"]
+        assert top[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+    finally:
+        await db.close()
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.summarizer import MERGE_PROMPT, SUMMARY_PROMPT, Summarizer
+from src.utils import estimate_tokens
+
+
+class FakeLLM:
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, prompt, max_tokens=512, priority=None):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return f"summary {len(self.prompts)}"
+
+
+@pytest.mark.asyncio
+async def test_summaries_run_concurrently_under_limit():
+    llm = FakeLLM(delay=0.02)
+    summarizer = Summarizer(llm, {"summarization": {"max_concurrency": 3}})
+    communities = [([f"Entity{i}", f"Other{i}"], []) for i in range(10)]
+    summaries = await summarizer.summarize_many(communities)
+    assert len(summaries) == 10 and len(llm.prompts) == 10
+    assert llm.peak == 3
+
+
+@pytest.mark.asyncio
+async def test_small_community_uses_one_prompt():
+    llm = FakeLLM()
+    summarizer = Summarizer(llm)
+    summary = await summarizer.summarize_community(
+        [("Rome", "Location"), ("Venice", "Location")],
+        [("Rome", "Venice", "related", 2.5)],
+    )
+    assert summary == "summary 1"
+    assert "- Rome (Location)" in llm.prompts[0]
+    assert "- Rome -[related]-> Venice (weight 2.5)" in llm.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_large_community_is_map_reduced_within_budget():
+    llm = FakeLLM()
+    budget = 200
+    summarizer = Summarizer(llm, {"summarization": {"max_input_tokens": budget}})
+    nodes = [(f"A fairly long entity name number {i}", "Thing") for i in range(200)]
+    summary = await summarizer.summarize_community(nodes)
+    merges = [p for p in llm.prompts if p.startswith("The following are summaries")]
+    assert len(llm.prompts) > 2 and merges
+    assert summary == f"summary {len(llm.prompts)}"
+    # Every node appears in exactly one map prompt.
+    assert sum(p.count("(Thing)") for p in llm.prompts) == 200
+    overhead = max(estimate_tokens(SUMMARY_PROMPT), estimate_tokens(MERGE_PROMPT))
+    assert all(estimate_tokens(p) <= budget + overhead for p in llm.prompts)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.text_chunker import TextChunker
+
+TEXT = "Rome is historic.\r\nVenice — città sull'acqua. 漢字 " * 40
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    return str(path)
+
+
+@pytest.mark.parametrize("buffer_size", [1, 7, 64, 1 << 20])
+def test_streaming_matches_in_memory_chunking(text_file, buffer_size):
+    chunker = TextChunker({"chunk_size": 50, "chunk_overlap": 10})
+    chunks = list(chunker.iter_file_chunks(text_file, buffer_size))
+    assert [c.text for c in chunks] == chunker.chunk_text(TEXT)
+
+
+def test_streaming_offsets_index_into_file(text_file):
+    chunker = TextChunker({"chunk_size": 50, "chunk_overlap": 10})
+    data = open(text_file, "rb").read()
+    for chunk in chunker.iter_file_chunks(text_file, buffer_size=16):
+        assert TEXT[chunk.start : chunk.end] == chunk.text
+        assert data[chunk.byte_start : chunk.byte_end].decode("utf-8") == chunk.text
+
+
+def test_streaming_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+    assert list(TextChunker({}).iter_file_chunks(str(path))) == []
@@ -0,0 +1,100 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from graphrag_extender.sqlite_storage import SQLiteStorage
+from graphrag_extender.vector_index import VectorIndex
+from src.query_engine import QueryEngine
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def exact_top(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k]
+
+
+def test_exact_search_matches_numpy_across_blocks(tmp_path):
+    vectors = random_vectors(500)
+    index = VectorIndex(str(tmp_path), dim=16, block_rows=64)
+    index.add(range(1000, 1500), vectors)
+    queries = random_vectors(4, seed=1)
+    for query, hits in zip(queries, index.search_batch(queries, k=5)):
+        assert [i - 1000 for i, _ in hits] == exact_top(vectors, query, 5).tolist()
+        assert [score for _, score in hits] == sorted(
+            (score for _, score in hits), reverse=True
+        )
+
+
+def test_index_persists_grows_and_deletes(tmp_path):
+    vectors = random_vectors(3000)
+    index = VectorIndex(str(tmp_path), dim=16)
+    index.add(range(3000), vectors)
+    assert index.capacity >= 3000
+    index.delete(range(0, 3000, 2))
+    # Replacing an id moves it to a new row.
+    index.add([1], vectors[0])
+    del index
+
+    reopened = VectorIndex(str(tmp_path), dim=16)
+    assert len(reopened) == 1500
+    assert 2 not in reopened and 1 in reopened
+    assert reopened.search(vectors[0], k=1)[0][0] == 1
+    # Half the rows were tombstones and got compacted; only the row replaced
+    # afterwards is left behind.
+    assert reopened.count == 1501
+
+
+def test_ivf_search_has_high_recall_on_clustered_data(tmp_path):
+    rng = np.random.default_rng(2)
+    centres = rng.normal(size=(20, 16))
+    vectors = (
+        np.repeat(centres, 100, axis=0) + 0.1 * rng.normal(size=(2000, 16))
+    ).astype(np.float32)
+    index = VectorIndex(str(tmp_path), dim=16, ivf_threshold=1000, nprobe=4)
+    index.add(range(2000), vectors)
+    index.train(nlist=20)
+    # Vectors added after training are assigned to their nearest list.
+    index.add([5000], centres[3].astype(np.float32))
+
+    found = 0
+    queries = vectors[::100] + 0.05
+    for query in queries:
+        hits = {i for i, _ in index.search(query, k=10)}
+        found += len(hits & set(exact_top(vectors, query, 10).tolist()))
+    assert found / (10 * len(queries)) > 0.9
+    assert index.search(centres[3], k=1)[0][0] == 5000
+
+
+@pytest.mark.asyncio
+async def test_query_engine_resyncs_when_communities_change(tmp_path):
+    db = SQLiteStorage(":memory:")
+    await db.initialize()
+    try:
+        ids = await db.add_nodes([("Rome", "Location")])
+        await db.upsert_communities(
+            [("old", [ids["Rome"]], 0, None, "Old.", [1.0, 0.0])]
+        )
+        settings = {"backend": "local", "index_dir": str(tmp_path), "dim": 2}
+        engine = QueryEngine(
+            db, None, None, {"vector_search": {**settings, "version_ttl": 0}}
+        )
+        await engine.sync_indexes()
+        assert [c["summary"] for c in await engine.search_communities([1.0, 0.0])] == [
+            "Old."
+        ]
+
+        # A rebuild replaces the community without the engine being told.
+        await db.upsert_communities(
+            [("new", [ids["Rome"]], 0, None, "New.", [0.0, 1.0])]
+        )
+        assert [c["summary"] for c in await engine.search_communities([1.0, 0.0])] == [
+            "New."
+        ]
+    finally:
+        await db.close()